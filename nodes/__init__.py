@@ -27,6 +27,9 @@ from .persona_advanced import NODE_DISPLAY_NAME_MAPPINGS as PERSONA_ADVANCED_DIS
 from .persona_knowledge import NODE_CLASS_MAPPINGS as PERSONA_KNOWLEDGE_MAPPINGS
 from .persona_knowledge import NODE_DISPLAY_NAME_MAPPINGS as PERSONA_KNOWLEDGE_DISPLAY
 
+from .persona_pipeline import NODE_CLASS_MAPPINGS as PERSONA_PIPELINE_MAPPINGS
+from .persona_pipeline import NODE_DISPLAY_NAME_MAPPINGS as PERSONA_PIPELINE_DISPLAY
+
 # Combine all persona node mappings
 PERSONA_NODE_CLASS_MAPPINGS = {}
 PERSONA_NODE_DISPLAY_NAME_MAPPINGS = {}
@@ -39,7 +42,8 @@ for mappings in [
     PERSONA_QUALITY_MAPPINGS,
     PERSONA_ENHANCE_MAPPINGS,
     PERSONA_ADVANCED_MAPPINGS,
-    PERSONA_KNOWLEDGE_MAPPINGS
+    PERSONA_KNOWLEDGE_MAPPINGS,
+    PERSONA_PIPELINE_MAPPINGS
 ]:
     PERSONA_NODE_CLASS_MAPPINGS.update(mappings)
 
@@ -51,7 +55,8 @@ for display_mappings in [
     PERSONA_QUALITY_DISPLAY,
     PERSONA_ENHANCE_DISPLAY,
     PERSONA_ADVANCED_DISPLAY,
-    PERSONA_KNOWLEDGE_DISPLAY
+    PERSONA_KNOWLEDGE_DISPLAY,
+    PERSONA_PIPELINE_DISPLAY
 ]:
     PERSONA_NODE_DISPLAY_NAME_MAPPINGS.update(display_mappings)
 
@@ -1,8 +1,10 @@
 """Content calendar management node"""
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 # Use relative imports
-from ..utils.llm_client import LLMClient
+from ..utils.llm_client import get_llm_client
 from ..utils.calendar_manager import CalendarManager as CalendarManagerUtil
+from ..utils.calendar_store import CALENDAR_BACKENDS
 
 
 class CalendarManager:
@@ -61,6 +63,18 @@ class CalendarManager:
                     "multiline": True,
                     "placeholder": "⭐ Directly edit calendar generation prompt (leave empty for auto-generation)"
                 }),
+                "storage_backend": (list(CALENDAR_BACKENDS), {
+                    "default": "json"
+                }),
+                "generation_mode": (["single", "weekly_shards"], {
+                    "default": "single"
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 8,
+                    "step": 1
+                }),
             }
         }
 
@@ -71,7 +85,8 @@ class CalendarManager:
     DESCRIPTION = "Manage content calendar for persona (default: 15 days, use day_offset for batch generation)"
 
     def manage_calendar(self, persona, api_key, api_base, model,
-                        days_to_generate=15, day_offset=0, max_tokens=10000, force_regenerate=False, temperature=0.7, calendar_prompt_override=""):
+                        days_to_generate=15, day_offset=0, max_tokens=10000, force_regenerate=False, temperature=0.7, calendar_prompt_override="",
+                        storage_backend="json", generation_mode="single", max_concurrency=4):
         """
         Manage content calendar
 
@@ -86,6 +101,10 @@ class CalendarManager:
             force_regenerate: Force regeneration
             temperature: Temperature parameter
             calendar_prompt_override: Directly override calendar generation prompt
+            storage_backend: Calendar storage, "json" (one file per month) or "sqlite" (one row per day)
+            generation_mode: "single" (one completion for the window) or "weekly_shards"
+                             (one completion per week, generated concurrently)
+            max_concurrency: Maximum concurrent shard requests in weekly_shards mode
 
         Returns:
             (today_plan, calendar_status, full_calendar, calendar_prompt, system_prompt, user_prompt, is_batch_mode)
@@ -94,7 +113,7 @@ class CalendarManager:
         from datetime import datetime, timedelta
 
         # Initialize calendar manager
-        cal_manager = CalendarManagerUtil()
+        cal_manager = CalendarManagerUtil(backend=storage_backend)
 
         # Get persona name
         persona_name = persona["data"].get("name", "Unknown")
@@ -112,14 +131,23 @@ class CalendarManager:
         system_prompt = ""
         user_prompt = ""
 
+        # Pick up calendars previously saved as JSON when switching to the database
+        if storage_backend != "json" and not force_regenerate:
+            window_months = sorted({date[:7] for date in cal_manager.window_dates(target_date_str, days_to_generate)})
+            for window_month in window_months:
+                if not cal_manager.calendar_exists(persona_name, window_month) and \
+                        cal_manager.import_json_calendars(persona_name, window_month):
+                    print(f"[CalendarManager] Imported JSON calendar into {storage_backend}: {persona_name} {window_month}")
+
         # Check if calendar generation is needed
         need_generate = force_regenerate or not cal_manager.calendar_exists(persona_name, year_month)
 
         if need_generate:
-            # Generate new calendar
+            # Generate new calendar (forced regeneration bypasses the response cache)
             status, calendar_prompt, system_prompt, user_prompt = self._generate_calendar(
                 cal_manager, persona, persona_name, year_month,
-                api_key, api_base, model, temperature, days_to_generate, max_tokens, calendar_prompt_override, target_date_str
+                api_key, api_base, model, temperature, days_to_generate, max_tokens, calendar_prompt_override, target_date_str,
+                use_cache=not force_regenerate, generation_mode=generation_mode, max_concurrency=max_concurrency
             )
         else:
             status = f"✓ Using existing calendar: {year_month}"
@@ -131,9 +159,9 @@ class CalendarManager:
         target_plan = cal_manager.get_today_plan(persona_name, target_date_str)
 
         if target_plan is None:
-            # If no plan for target date (possibly cross-month), try generating
+            # If no plan for target date, generate only the missing days and merge them in
             if not need_generate:
-                status, calendar_prompt, system_prompt, user_prompt = self._generate_calendar(
+                status, calendar_prompt, system_prompt, user_prompt = self._fill_calendar_gaps(
                     cal_manager, persona, persona_name, year_month,
                     api_key, api_base, model, temperature, days_to_generate, max_tokens, calendar_prompt_override, target_date_str
                 )
@@ -159,8 +187,37 @@ class CalendarManager:
 
         return (target_plan, status, full_calendar, calendar_prompt, system_prompt, user_prompt, is_batch_mode)
 
+    SYSTEM_PROMPT = "You are a professional social media operations expert skilled at planning content calendars.\n\nImportant requirements:\n1. Must output valid JSON format\n2. All strings must use English double quotes \", not Chinese quotes " "\n3. All fields must be complete, cannot omit any\n4. Output must be complete JSON object, cannot be truncated\n5. Don't add any explanatory text before or after JSON, output JSON directly"
+
+    # Output budget per planned day when topping up a calendar (one day is ~250 tokens of JSON)
+    TOKENS_PER_DAY = 400
+    MIN_FILL_TOKENS = 1000
+
+    # Days per shard in weekly_shards mode
+    SHARD_DAYS = 7
+
+    def _request_calendar(self, cal_manager, persona_name, year_month, api_key, api_base, model,
+                          temperature, user_prompt, max_tokens, use_cache):
+        """Run one calendar completion and parse it"""
+        llm = get_llm_client(api_key, api_base, model, cache=True, coalesce=True)
+
+        messages = [
+            {
+                "role": "system",
+                "content": self.SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": user_prompt
+            }
+        ]
+
+        response = llm.generate(messages, temperature=temperature, max_tokens=max_tokens, use_cache=use_cache)
+        return cal_manager.parse_calendar_response(response, persona_name, year_month)
+
     def _generate_calendar(self, cal_manager, persona, persona_name, year_month,
-                           api_key, api_base, model, temperature, days_to_generate, max_tokens, calendar_prompt_override="", target_date_str=None):
+                           api_key, api_base, model, temperature, days_to_generate, max_tokens, calendar_prompt_override="", target_date_str=None,
+                           use_cache=True, generation_mode="single", max_concurrency=4):
         """
         Generate calendar
 
@@ -169,13 +226,24 @@ class CalendarManager:
             max_tokens: Maximum tokens
             calendar_prompt_override: Directly override prompt
             target_date_str: Target date (format YYYY-MM-DD), used as start date for calendar generation
+            use_cache: Whether an identical cached completion may be reused
+            generation_mode: "single" or "weekly_shards" (ignored when the prompt is overridden)
+            max_concurrency: Maximum concurrent shard requests
 
         Returns:
             (status message, full prompt, system prompt, user prompt)
         """
+        if generation_mode == "weekly_shards" and target_date_str and days_to_generate > self.SHARD_DAYS:
+            if calendar_prompt_override.strip():
+                print("[CalendarManager] Prompt override can't be sharded, generating the window in one request")
+            else:
+                return self._generate_sharded(
+                    cal_manager, persona, persona_name, year_month, api_key, api_base, model,
+                    temperature, days_to_generate, max_tokens, target_date_str, use_cache, max_concurrency
+                )
+
         try:
-            # Define system prompt
-            system_prompt = "You are a professional social media operations expert skilled at planning content calendars.\n\nImportant requirements:\n1. Must output valid JSON format\n2. All strings must use English double quotes \", not Chinese quotes " "\n3. All fields must be complete, cannot omit any\n4. Output must be complete JSON object, cannot be truncated\n5. Don't add any explanatory text before or after JSON, output JSON directly"
+            system_prompt = self.SYSTEM_PROMPT
 
             # Build user prompt
             user_prompt = cal_manager.generate_calendar_prompt(persona, year_month, days_to_generate, start_date=target_date_str)
@@ -184,36 +252,161 @@ class CalendarManager:
             if calendar_prompt_override.strip():
                 user_prompt = calendar_prompt_override
 
-            # Call LLM
-            llm = LLMClient(api_key, api_base, model)
-
-            messages = [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ]
-
-            response = llm.generate(messages, temperature=temperature, max_tokens=max_tokens)
-
-            # Parse and save calendar
-            calendar_data = cal_manager.parse_calendar_response(response, persona_name, year_month)
-
-            if cal_manager.save_calendar(persona_name, year_month, calendar_data):
-                days_count = len(calendar_data["calendar"])
-                # Return full prompt (for backward compatibility)
-                full_prompt = f"System:\n{system_prompt}\n\nUser:\n{user_prompt}"
-                return (f"✓ Successfully generated calendar for {year_month} ({days_count} days)", full_prompt, system_prompt, user_prompt)
-            else:
-                raise RuntimeError("Failed to save calendar")
+            # Parse and save calendar (a window crossing a month boundary is split into month partitions)
+            calendar_data = self._request_calendar(
+                cal_manager, persona_name, year_month, api_key, api_base, model,
+                temperature, user_prompt, max_tokens, use_cache
+            )
+
+            # Only the requested window is overwritten; extra dates the model returned
+            # must not replace days already planned in neighbouring partitions
+            window = set(cal_manager.planning_window(year_month, days_to_generate, target_date_str))
+            calendar_dict = {date: plan for date, plan in calendar_data["calendar"].items() if date in window}
+            dropped = sorted(set(calendar_data["calendar"]) - window)
+            if dropped:
+                print(f"[CalendarManager] Ignoring {len(dropped)} days outside the requested window: {', '.join(dropped)}")
+            saved_months = cal_manager.save_calendar_days(persona_name, calendar_dict, overwrite=True)
+
+            days_count = len(calendar_dict)
+            # Return full prompt (for backward compatibility)
+            full_prompt = f"System:\n{system_prompt}\n\nUser:\n{user_prompt}"
+            return (f"✓ Successfully generated calendar for {', '.join(saved_months) or year_month} ({days_count} days)", full_prompt, system_prompt, user_prompt)
 
         except Exception as e:
             raise RuntimeError(f"Failed to generate calendar: {str(e)}")
 
+    def _generate_sharded(self, cal_manager, persona, persona_name, year_month, api_key, api_base, model,
+                          temperature, days_to_generate, max_tokens, target_date_str, use_cache, max_concurrency):
+        """
+        Generate the window as week shards in parallel
+
+        Topic types for the whole window are planned locally first; every shard gets its
+        assigned types plus the previous shard's plan (or the days already planned before
+        the window) for continuity, so shards don't have to wait for each other. The merged
+        result is realigned with the plan and any days a shard dropped are filled afterwards.
+
+        Returns:
+            (status message, full prompt, system prompt, user prompt)
+        """
+        try:
+            dates = cal_manager.window_dates(target_date_str, days_to_generate)
+            before = cal_manager.load_window(
+                persona_name, (datetime.strptime(dates[0], "%Y-%m-%d") - timedelta(days=self.SHARD_DAYS)).strftime("%Y-%m-%d"),
+                self.SHARD_DAYS
+            )
+            topic_plan = cal_manager.plan_topic_types(
+                dates, previous=[plan.get("topic_type") for _, plan in sorted(before.items())]
+            )
+            shards = cal_manager.split_into_shards(dates, self.SHARD_DAYS)
+
+            prompts = []
+            previous = before
+            for shard in shards:
+                prompts.append(cal_manager.generate_calendar_prompt(
+                    persona, shard[0][:7], len(shard), start_date=shard[0], existing_plans=previous,
+                    topic_plan={date: topic_plan[date] for date in shard}
+                ))
+                previous = {date: {"weekday": datetime.strptime(date, "%Y-%m-%d").strftime("%A"),
+                                   "topic_type": topic_plan[date]} for date in shard}
+
+            def generate(index):
+                shard = shards[index]
+                shard_tokens = min(max_tokens, max(self.MIN_FILL_TOKENS, len(shard) * self.TOKENS_PER_DAY))
+                try:
+                    days = self._request_calendar(
+                        cal_manager, persona_name, year_month, api_key, api_base, model,
+                        temperature, prompts[index], shard_tokens, use_cache
+                    )["calendar"]
+                except Exception as e:
+                    print(f"[CalendarManager] ⚠️  Shard {shard[0]} ~ {shard[-1]} failed: {str(e)}")
+                    return {}
+                return {date: plan for date, plan in days.items() if date in shard}
+
+            print(f"[CalendarManager] Generating {len(dates)} days as {len(shards)} shards "
+                  f"(max concurrency: {max_concurrency})")
+            workers = max(1, min(max_concurrency, len(shards)))
+            calendar_dict = {}
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calendar-shard") as executor:
+                for days in executor.map(generate, range(len(shards))):
+                    calendar_dict.update(days)
+
+            if not calendar_dict:
+                raise RuntimeError("All calendar shards failed")
+
+            adjusted = cal_manager.reconcile_topic_types(calendar_dict, topic_plan)
+            if adjusted:
+                print(f"[CalendarManager] Realigned topic_type on {len(adjusted)} days: {', '.join(adjusted)}")
+            saved_months = cal_manager.save_calendar_days(persona_name, calendar_dict, overwrite=True)
+
+            status = f"✓ Successfully generated calendar for {', '.join(saved_months)} ({len(calendar_dict)} days, {len(shards)} shards)"
+            if len(calendar_dict) < len(dates):
+                status = self._fill_calendar_gaps(
+                    cal_manager, persona, persona_name, year_month, api_key, api_base, model,
+                    temperature, days_to_generate, max_tokens, target_date_str=target_date_str
+                )[0] + f" after {len(shards)} shards"
+
+            system_prompt = self.SYSTEM_PROMPT
+            user_prompt = "\n\n---\n\n".join(prompts)
+            full_prompt = f"System:\n{system_prompt}\n\nUser:\n{user_prompt}"
+            return (status, full_prompt, system_prompt, user_prompt)
+
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate calendar: {str(e)}")
+
+    def _fill_calendar_gaps(self, cal_manager, persona, persona_name, year_month,
+                            api_key, api_base, model, temperature, days_to_generate, max_tokens,
+                            calendar_prompt_override="", target_date_str=None):
+        """
+        Generate only the days missing from an existing calendar and merge them in
+
+        The prompt covers the span from the first to the last missing date in the window
+        (target date + days_to_generate, may cross into the next month) and lists the
+        already planned days for continuity; planned days are never overwritten.
+        The request never reads or writes the response cache.
+
+        Returns:
+            (status message, full prompt, system prompt, user prompt)
+        """
+        try:
+            missing = cal_manager.find_missing_dates(persona_name, target_date_str, days_to_generate)
+            if not missing:
+                return (f"✓ Using existing calendar: {year_month}", "", "", "")
+
+            existing_plans = {}
+            for missing_month in sorted({date[:7] for date in missing}):
+                calendar_data = cal_manager.load_calendar(persona_name, missing_month)
+                if calendar_data:
+                    existing_plans.update(calendar_data.get("calendar", {}))
+
+            span = (datetime.strptime(missing[-1], "%Y-%m-%d") - datetime.strptime(missing[0], "%Y-%m-%d")).days + 1
+            system_prompt = self.SYSTEM_PROMPT
+            user_prompt = cal_manager.generate_calendar_prompt(
+                persona, year_month, span, start_date=missing[0],
+                existing_plans=existing_plans
+            )
+            if calendar_prompt_override.strip():
+                user_prompt = calendar_prompt_override
+
+            # A cached response could be the one that lacked these dates, so bypass the cache
+            fill_tokens = min(max_tokens, max(self.MIN_FILL_TOKENS, span * self.TOKENS_PER_DAY))
+            new_days = self._request_calendar(
+                cal_manager, persona_name, year_month, api_key, api_base, model,
+                temperature, user_prompt, fill_tokens, use_cache=False
+            )["calendar"]
+
+            missing_dates = set(missing)
+            new_days = {date: plan for date, plan in new_days.items() if date in missing_dates}
+            saved_months = cal_manager.save_calendar_days(persona_name, new_days)
+
+            filled = len(new_days)
+            print(f"[CalendarManager] Filled {filled}/{len(missing)} missing days "
+                  f"({missing[0]} ~ {missing[-1]}, max_tokens={fill_tokens})")
+            full_prompt = f"System:\n{system_prompt}\n\nUser:\n{user_prompt}"
+            return (f"✓ Filled {filled} missing days in {', '.join(saved_months) or year_month} calendar", full_prompt, system_prompt, user_prompt)
+
+        except Exception as e:
+            raise RuntimeError(f"Failed to fill calendar gaps: {str(e)}")
+
 
 # Node registration
 NODE_CLASS_MAPPINGS = {
@@ -4,10 +4,11 @@ Persona Advanced Generation Nodes - Phase 3
 """
 
 import json
-import requests
 import copy
 import random
 
+from ..utils.llm_client import chat_completion, strip_code_fence
+
 
 class PersonaSocialGenerator:
     """
@@ -275,44 +276,13 @@ Generate the social network JSON now:"""
 
     def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model, temperature):
         """调用LLM"""
-        url = f"{api_base.rstrip('/')}/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": temperature,
-            "max_tokens": 8000
-        }
-
-        response = requests.post(url, headers=headers, json=data, timeout=240)
-        response.raise_for_status()
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
-
-        return content
+        return chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                               temperature=temperature, max_tokens=8000, timeout=240)
 
     def _parse_and_validate(self, content):
         """解析并验证JSON"""
         # 清理markdown
-        content = content.strip()
-        if content.startswith('```'):
-            lines = content.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content = '\n'.join(lines)
-
-        content = content.strip()
+        content = strip_code_fence(content)
 
         try:
             social_data = json.loads(content)
@@ -631,44 +601,13 @@ Generate the authenticity JSON now:"""
 
     def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model, temperature):
         """调用LLM"""
-        url = f"{api_base.rstrip('/')}/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": temperature,
-            "max_tokens": 6000
-        }
-
-        response = requests.post(url, headers=headers, json=data, timeout=180)
-        response.raise_for_status()
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
-
-        return content
+        return chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                               temperature=temperature, max_tokens=6000, timeout=180)
 
     def _parse_and_validate(self, content):
         """解析并验证JSON"""
         # 清理markdown
-        content = content.strip()
-        if content.startswith('```'):
-            lines = content.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content = '\n'.join(lines)
-
-        content = content.strip()
+        content = strip_code_fence(content)
 
         try:
             authenticity = json.loads(content)
@@ -0,0 +1,302 @@
+"""
+Persona Batch Factory
+批量人设工厂 - 对图片目录批量执行 图片分析 → 人设流水线 → 视觉档案 → 保存
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from ..utils.job_ledger import JobLedger
+from ..utils.stage_checkpoint import get_default_checkpoint_store, prompt_version
+from .persona_input import PersonaImageInput, find_images
+from .persona_io import PersonaSaver
+from .persona_pipeline import build_persona_graph
+from .persona_quality import PersonaVisualProfileExtractor
+
+
+# 项目根目录
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认账本目录（每个图片目录一个账本）
+DEFAULT_LEDGER_DIR = os.path.join(REPO_DIR, "cache", "persona_batch")
+
+
+class PersonaBatchFactory:
+    """
+    批量人设生成
+
+    - asyncio 工作池，concurrency 控制同时处理的图片数
+    - 每张图片内部再按阶段依赖图并发（见 persona_pipeline）
+    - JobLedger 持久化每张图片的状态，中断后重新运行会跳过已完成的图片
+    - 定期输出进度、吞吐量与预计剩余时间
+    """
+
+    def __init__(self, image_dir, api_key, api_base="https://www.dmxapi.cn/v1", model="gpt-4.1",
+                 vision_model="gpt-4.1", concurrency=4, nsfw_level="high",
+                 persona_type="attractive-woman", age=23, location="United States",
+                 temperature=0.85, num_tweets=14, num_entries=6, stage_parallel=5,
+                 ledger_path=None, retry_failed=True, report_interval=30.0,
+                 use_checkpoints=True, force_stages=()):
+        """
+        Args:
+            image_dir: 图片目录（包含子目录，输出保持相同的相对路径）
+            concurrency: 同时处理的图片数
+            stage_parallel: 单张图片内同时执行的阶段数
+            ledger_path: 账本路径，默认 cache/persona_batch/<目录名>.json
+            retry_failed: 是否重新执行上次失败的图片
+            report_interval: 进度报告间隔（秒）
+            use_checkpoints: 是否按阶段保存检查点（失败重跑时从最后一个有效阶段继续）
+            force_stages: 忽略检查点强制重跑的阶段（vision / core / tweets / ... / visual_profile）
+        """
+        self.image_dir = os.path.abspath(image_dir)
+        self.api_key = api_key
+        self.api_base = api_base
+        self.model = model
+        self.vision_model = vision_model
+        self.concurrency = concurrency
+        self.nsfw_level = nsfw_level
+        self.persona_type = persona_type
+        self.age = age
+        self.location = location
+        self.temperature = temperature
+        self.num_tweets = num_tweets
+        self.num_entries = num_entries
+        self.stage_parallel = stage_parallel
+        self.retry_failed = retry_failed
+        self.report_interval = report_interval
+        self.checkpoints = get_default_checkpoint_store() if use_checkpoints else None
+        self.force_stages = set(force_stages)
+
+        if ledger_path is None:
+            ledger_name = os.path.basename(self.image_dir.rstrip(os.sep)) or "images"
+            ledger_path = os.path.join(DEFAULT_LEDGER_DIR, f"{ledger_name}.json")
+        self.ledger = JobLedger(ledger_path)
+
+        self._started_at = None
+        self._completed = 0
+        self._failed = 0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def discover(self):
+        """查找目录下所有图片（相对路径，排序）"""
+        return find_images(self.image_dir)
+
+    @staticmethod
+    def output_filename(image_rel):
+        """输出文件名（相对 personas/，与旧脚本一致: <图片名>_persona.json）"""
+        stem = os.path.splitext(os.path.basename(image_rel))[0]
+        subdir = os.path.dirname(image_rel)
+        return os.path.join(subdir, f"{stem}_persona.json") if subdir else f"{stem}_persona.json"
+
+    @staticmethod
+    def personas_dir():
+        """PersonaSaver 的输出目录"""
+        return os.path.join(REPO_DIR, "personas")
+
+    def _is_finished(self, image_rel, job):
+        """账本已完成且输出文件仍存在，或旧脚本已生成过输出"""
+        output_path = os.path.join(self.personas_dir(), self.output_filename(image_rel))
+        if job.get("status") == JobLedger.DONE:
+            return os.path.exists(job.get("output", output_path))
+        return os.path.exists(output_path)
+
+    def plan(self):
+        """
+        计算待处理图片
+
+        Returns:
+            (待处理列表, 跳过数量)
+        """
+        images = self.discover()
+        self.ledger.recover_interrupted()
+        self.ledger.register(images)
+
+        todo = []
+        skipped = 0
+        for image_rel in images:
+            if self._is_finished(image_rel, self.ledger.get(image_rel)):
+                skipped += 1
+                continue
+            if self.ledger.status(image_rel) == JobLedger.FAILED and not self.retry_failed:
+                skipped += 1
+                continue
+            todo.append(image_rel)
+        return todo, skipped
+
+    def status(self):
+        """
+        只读统计进度（不登记任务、不修改或写回账本，批量任务运行中也可调用）
+
+        Returns:
+            {"total", "finished", "remaining", "running", "failed"}
+        """
+        jobs = JobLedger.read(self.ledger.path)
+        images = self.discover()
+        finished = sum(1 for image_rel in images if self._is_finished(image_rel, jobs.get(image_rel, {})))
+        statuses = [jobs.get(image_rel, {}).get("status") for image_rel in images]
+        return {
+            "total": len(images),
+            "finished": finished,
+            "remaining": len(images) - finished,
+            "running": statuses.count(JobLedger.RUNNING),
+            "failed": statuses.count(JobLedger.FAILED),
+        }
+
+    def run(self):
+        """同步入口"""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """
+        执行批量生成
+
+        Returns:
+            统计字典 {"total", "skipped", "completed", "failed", "elapsed"}
+        """
+        todo, skipped = self.plan()
+        self._total = len(todo)
+        self._completed = 0
+        self._failed = 0
+        self._started_at = time.time()
+
+        print(f"\n{'='*70}")
+        print(f"🏭 PersonaBatchFactory: {len(todo)} to generate, {skipped} skipped")
+        print(f"   Images: {self.image_dir}")
+        print(f"   Ledger: {self.ledger.path}")
+        print(f"   Concurrency: {self.concurrency} images × {self.stage_parallel} stages")
+        print(f"{'='*70}\n")
+
+        if todo:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            loop = asyncio.get_running_loop()
+
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="persona-batch") as executor:
+                async def worker(image_rel):
+                    async with semaphore:
+                        await loop.run_in_executor(executor, self._process, image_rel)
+
+                reporter = asyncio.create_task(self._report_periodically())
+                try:
+                    await asyncio.gather(*(worker(image_rel) for image_rel in todo))
+                finally:
+                    reporter.cancel()
+
+        elapsed = time.time() - self._started_at
+        summary = {
+            "total": len(todo) + skipped,
+            "skipped": skipped,
+            "completed": self._completed,
+            "failed": self._failed,
+            "elapsed": round(elapsed, 1),
+        }
+
+        print(f"\n{'='*70}")
+        print(f"🎉 Batch finished: {self._completed} done, {self._failed} failed, {skipped} skipped "
+              f"in {elapsed / 60:.1f} min")
+        for image_rel in self.ledger.keys_with_status(JobLedger.FAILED):
+            print(f"   ❌ {image_rel}: {self.ledger.get(image_rel).get('error')}")
+        print(f"{'='*70}\n")
+
+        return summary
+
+    def _process(self, image_rel):
+        """处理单张图片（在线程池中执行），失败记入账本而不中断整批"""
+        start = time.time()
+        self.ledger.start(image_rel)
+        try:
+            output_path = self.generate_one(image_rel)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            self.ledger.fail(image_rel, str(e), duration=round(time.time() - start, 1))
+            print(f"❌ [Batch] {image_rel}: {e}")
+        else:
+            with self._lock:
+                self._completed += 1
+            self.ledger.finish(image_rel, output=output_path, duration=round(time.time() - start, 1))
+            print(f"✅ [Batch] {image_rel} → {output_path}")
+        print(self.progress_line())
+
+    def generate_one(self, image_rel):
+        """
+        单张图片的完整流程
+
+        Returns:
+            保存的人设文件路径
+        """
+        image_path = os.path.join(self.image_dir, image_rel)
+        with Image.open(image_path) as img:
+            pil_image = img.convert("RGB")
+
+        def analyze():
+            return list(PersonaImageInput().analyze_pil_image(
+                pil_image, "", self.age, self.persona_type, self.nsfw_level,
+                self.api_key, self.api_base, self.vision_model, self.location,
+                raise_on_error=True
+            ))
+
+        if self.checkpoints is None:
+            appearance_analysis, base_params_json, _ = analyze()
+        else:
+            # 图片分析结果带随机成分，复用检查点才能让下游阶段的 key 在重跑时保持一致
+            with open(image_path, 'rb') as f:
+                image_hash = hashlib.sha256(f.read()).hexdigest()
+            appearance_analysis, base_params_json, _ = self.checkpoints.memoize("vision", {
+                "image": image_hash,
+                "age": self.age,
+                "persona_type": self.persona_type,
+                "nsfw_level": self.nsfw_level,
+                "location": self.location,
+                "model": self.vision_model,
+                "prompt_version": prompt_version(PersonaImageInput),
+            }, analyze, force="vision" in self.force_stages)
+
+        graph = build_persona_graph(
+            appearance_analysis, base_params_json, self.api_key, self.api_base, self.model,
+            temperature=self.temperature, num_tweets=self.num_tweets, num_entries=self.num_entries,
+            max_parallel=self.stage_parallel, checkpoints=self.checkpoints
+        )
+        graph.add("visual_profile", lambda r: PersonaVisualProfileExtractor().extract_visual_profile(
+            r["merge"], self.api_key, self.api_base, self.model)[0], deps=["merge"],
+            checkpoint_inputs=lambda r: {
+                "upstream": {"merge": r["merge"]},
+                "model": self.model,
+                "prompt_version": prompt_version(PersonaVisualProfileExtractor),
+            })
+        results = graph.run(force=self.force_stages - {"vision"})
+        print(graph.timing_report())
+
+        persona = json.loads(results["merge"])
+        persona['data']['visual_profile'] = json.loads(results["visual_profile"])
+
+        filename = self.output_filename(image_rel)
+        os.makedirs(os.path.dirname(os.path.join(self.personas_dir(), filename)), exist_ok=True)
+        filepath, _ = PersonaSaver().save_persona(json.dumps(persona, ensure_ascii=False), filename)
+        return filepath
+
+    def progress_line(self):
+        """进度 / 吞吐量 / 预计剩余时间"""
+        done = self._completed + self._failed
+        elapsed = time.time() - self._started_at
+        rate = done / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = self._total - done
+        if done and remaining:
+            eta = f"{elapsed / done * remaining / 60:.1f} min"
+        else:
+            eta = "-"
+        return (f"📊 [Batch] {done}/{self._total} "
+                f"({self._completed} ok, {self._failed} failed) | "
+                f"{rate:.2f} img/min | elapsed {elapsed / 60:.1f} min | ETA {eta}")
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print(self.progress_line())
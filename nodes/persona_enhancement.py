@@ -4,8 +4,10 @@ Scene hint增强和推文重新生成节点
 """
 
 import json
-import requests
 import copy
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.llm_client import chat_completion, strip_code_fence
 
 
 class SceneHintEnhancer:
@@ -15,6 +17,13 @@ class SceneHintEnhancer:
     使用visual_profile确保一致性
     """
 
+    # 各增强级别的目标字数
+    TARGET_WORDS = {
+        'light': (60, 90),
+        'medium': (80, 120),
+        'detailed': (100, 150)
+    }
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -76,11 +85,7 @@ class SceneHintEnhancer:
         tags = data.get('tags', [])
 
         # 目标字数
-        target_words = {
-            'light': (60, 90),
-            'medium': (80, 120),
-            'detailed': (100, 150)
-        }.get(enhancement_level, (100, 150))
+        target_words = self.TARGET_WORDS.get(enhancement_level, (100, 150))
 
         # 构建prompt
         system_prompt = self._get_system_prompt()
@@ -136,6 +141,22 @@ Output ONLY the enhanced scene description, nothing else."""
     def _get_user_prompt(self, simple_hint, visual_profile, appearance, tags, target_words):
         """用户提示词"""
 
+        return f"""Enhance this simple scene description into a detailed 80-150 word paragraph:
+
+SIMPLE DESCRIPTION:
+"{simple_hint}"
+
+{self._get_style_context(visual_profile, tags)}
+
+TARGET: {target_words[0]}-{target_words[1]} words
+
+{self._get_requirements()}
+
+Now enhance the simple description above:"""
+
+    def _get_style_context(self, visual_profile, tags):
+        """人设视觉风格上下文（单条与批量提示词共用）"""
+
         # 从visual_profile提取关键信息
         common_outfits = visual_profile.get('common_outfits', [])
         common_props = visual_profile.get('common_props', [])
@@ -152,22 +173,18 @@ Output ONLY the enhanced scene description, nothing else."""
         if 'artist' in ' '.join(tags).lower():
             style_indicators.append("Artistic, aesthetic focus")
 
-        return f"""Enhance this simple scene description into a detailed 80-150 word paragraph:
-
-SIMPLE DESCRIPTION:
-"{simple_hint}"
-
-CHARACTER'S VISUAL STYLE:
+        return f"""CHARACTER'S VISUAL STYLE:
 Common Outfits: {', '.join(common_outfits[:3]) if common_outfits else 'casual, comfortable'}
 Common Props: {', '.join(common_props[:5]) if common_props else 'phone, everyday items'}
 Favorite Colors: {', '.join(colors[:5]) if colors else 'varied'}
 Typical Lighting: {', '.join(lighting[:2]) if lighting else 'natural, warm lighting'}
 Typical Poses: {', '.join(poses[:3]) if poses else 'natural, relaxed poses'}
-Style Notes: {'; '.join(style_indicators) if style_indicators else 'attractive, confident'}
+Style Notes: {'; '.join(style_indicators) if style_indicators else 'attractive, confident'}"""
 
-TARGET: {target_words[0]}-{target_words[1]} words
+    def _get_requirements(self):
+        """写作要求与示例（单条与批量提示词共用）"""
 
-REQUIREMENTS:
+        return """REQUIREMENTS:
 1. Write as a NATURAL PARAGRAPH (not bullet points)
 2. Include:
    - Specific time/location (e.g., "Late evening in her apartment bedroom")
@@ -183,40 +200,218 @@ REQUIREMENTS:
 5. Use attractive language emphasizing appeal
 
 EXAMPLE QUALITY:
-"Late evening in her apartment bedroom, soft warm lighting from bedside lamp casting gentle shadows, woman sitting on edge of unmade bed wearing oversized grey t-shirt that slips off one shoulder revealing bare skin underneath, black lace panties barely visible, legs crossed casually, one hand playing with the hem of the shirt, expression playful and inviting with slight knowing smile, intimate close-up shot with blurred background, cozy and sensual atmosphere"
-
-Now enhance the simple description above:"""
+"Late evening in her apartment bedroom, soft warm lighting from bedside lamp casting gentle shadows, woman sitting on edge of unmade bed wearing oversized grey t-shirt that slips off one shoulder revealing bare skin underneath, black lace panties barely visible, legs crossed casually, one hand playing with the hem of the shirt, expression playful and inviting with slight knowing smile, intimate close-up shot with blurred background, cozy and sensual atmosphere\""""
 
     def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model):
         """调用LLM"""
-        url = f"{api_base.rstrip('/')}/chat/completions"
+        content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                  temperature=0.8, max_tokens=500, timeout=60).strip()
+
+        # 移除可能的引号
+        if content.startswith('"') and content.endswith('"'):
+            content = content[1:-1]
+
+        return content
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
 
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": 0.8,
-            "max_tokens": 500
+class SceneHintBatchEnhancer(SceneHintEnhancer):
+    """
+    Scene Hint批量增强节点
+    一次请求增强多条scene_hint，人设视觉风格上下文只发送一次；
+    超过 hints_per_request 时分多次请求并发执行，结果保持输入顺序
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "simple_scene_hints": ("STRING", {
+                    "default": "bedroom selfie\ngym mirror pic",
+                    "multiline": True,
+                    "placeholder": "每行一条简单描述，或JSON字符串数组"
+                }),
+                "persona_json": ("STRING", {
+                    "forceInput": True
+                }),
+                "enhancement_level": (["light", "medium", "detailed"], {
+                    "default": "detailed"
+                }),
+                "api_key": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "OpenAI/Claude API key"
+                }),
+                "api_base": ("STRING", {
+                    "default": "https://www.dmxapi.cn/v1",
+                    "multiline": False
+                }),
+                "model": ("STRING", {
+                    "default": "gpt-4.1",
+                    "multiline": False
+                })
+            },
+            "optional": {
+                "hints_per_request": ("INT", {
+                    "default": 10,
+                    "min": 1,
+                    "max": 30,
+                    "step": 1
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 16,
+                    "step": 1
+                })
+            }
         }
 
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("enhanced_scene_hints_json", "report")
+    FUNCTION = "enhance_scene_hints"
+    CATEGORY = "twitterchat/persona"
 
-        result = response.json()
-        content = result['choices'][0]['message']['content'].strip()
+    def enhance_scene_hints(self, simple_scene_hints, persona_json, enhancement_level,
+                            api_key, api_base, model, hints_per_request=10, max_concurrency=4):
+        """
+        批量增强scene hint
+        """
 
-        # 移除可能的引号
-        if content.startswith('"') and content.endswith('"'):
-            content = content[1:-1]
+        print(f"\n{'='*70}")
+        print(f"✨ SceneHintBatchEnhancer: Enhancing scene hints")
+        print(f"{'='*70}")
 
-        return content
+        hints = self._parse_hints(simple_scene_hints)
+        if not hints:
+            raise Exception("No scene hints provided")
+
+        # 解析persona
+        try:
+            persona = json.loads(persona_json)
+        except json.JSONDecodeError as e:
+            raise Exception(f"JSON parsing failed: {str(e)}")
+
+        chunks = [hints[i:i + hints_per_request] for i in range(0, len(hints), hints_per_request)]
+        print(f"Hints: {len(hints)} ({len(chunks)} requests, max concurrency {max_concurrency})")
+        print(f"Enhancement level: {enhancement_level}")
+        print(f"\n🤖 Calling LLM...")
+
+        enhanced = self.enhance_hint_list(hints, persona.get('data', {}), enhancement_level,
+                                          api_key, api_base, model, hints_per_request, max_concurrency)
+
+        failed = [i for i, hint in enumerate(enhanced) if hint is None]
+        enhanced = [hint if hint is not None else hints[i] for i, hint in enumerate(enhanced)]
+        word_counts = [len(hint.split()) for i, hint in enumerate(enhanced) if i not in failed]
+        avg_words = sum(word_counts) / len(word_counts) if word_counts else 0
+
+        report = f"""✅ Scene Hint Batch Enhancement Complete
+
+Enhanced: {len(hints) - len(failed)}/{len(hints)} hints in {len(chunks)} requests
+Average length: {avg_words:.1f} words"""
+        if failed:
+            report += f"\nFailed (kept original): {failed}"
+
+        print(f"\n{report}")
+        print(f"{'='*70}\n")
+
+        return (json.dumps(enhanced, ensure_ascii=False, indent=2), report)
+
+    @staticmethod
+    def _parse_hints(simple_scene_hints):
+        """支持JSON字符串数组或每行一条"""
+        text = simple_scene_hints.strip()
+        if text.startswith('['):
+            try:
+                hints = json.loads(text)
+                if isinstance(hints, list):
+                    return [str(hint).strip() for hint in hints if str(hint).strip()]
+            except json.JSONDecodeError:
+                pass
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    def enhance_hint_list(self, hints, persona_data, enhancement_level, api_key, api_base, model,
+                          hints_per_request=10, max_concurrency=4):
+        """
+        增强多条scene hint
+
+        Returns:
+            与输入顺序一致的列表，失败的位置为 None
+        """
+
+        visual_profile = persona_data.get('visual_profile', {})
+        appearance = persona_data.get('appearance', {})
+        tags = persona_data.get('tags', [])
+        target_words = self.TARGET_WORDS.get(enhancement_level, (100, 150))
+        llm = (api_key, api_base, model)
+
+        def enhance_chunk(chunk):
+            try:
+                results = self._enhance_batch(chunk, visual_profile, tags, target_words, *llm)
+            except Exception as e:
+                print(f"   ⚠️  Batch of {len(chunk)} failed: {str(e)}")
+                results = [None] * len(chunk)
+
+            # 批量结果缺失的条目逐条补发
+            for i, hint in enumerate(chunk):
+                if results[i] is None:
+                    try:
+                        results[i] = self._call_llm(
+                            self._get_system_prompt(),
+                            self._get_user_prompt(hint, visual_profile, appearance, tags, target_words),
+                            *llm
+                        )
+                    except Exception as e:
+                        print(f"   ✗ Hint '{hint[:40]}' failed: {str(e)}")
+            return results
+
+        chunks = [hints[i:i + hints_per_request] for i in range(0, len(hints), hints_per_request)]
+        workers = max(1, min(max_concurrency, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scene-hint") as executor:
+            return [hint for results in executor.map(enhance_chunk, chunks) for hint in results]
+
+    def _enhance_batch(self, chunk, visual_profile, tags, target_words, api_key, api_base, model):
+        """
+        一次请求增强多条
+
+        Returns:
+            与 chunk 等长的列表，返回内容缺失或为空的位置为 None
+        """
+
+        if len(chunk) == 1:
+            return [None]
+
+        system_prompt = self._get_system_prompt().replace(
+            "Output ONLY the enhanced scene description, nothing else.",
+            "Output ONLY a JSON array of the enhanced descriptions (one string per input, same order), nothing else."
+        )
+        simple_list = "\n".join(f"{i}. \"{hint}\"" for i, hint in enumerate(chunk, 1))
+        user_prompt = f"""Enhance each of these {len(chunk)} simple scene descriptions into its own detailed paragraph:
+
+SIMPLE DESCRIPTIONS:
+{simple_list}
+
+{self._get_style_context(visual_profile, tags)}
+
+TARGET: {target_words[0]}-{target_words[1]} words each
+
+{self._get_requirements()}
+
+Vary settings, outfits and lighting between descriptions while staying within her visual style.
+Return a JSON array of exactly {len(chunk)} strings, in the same order as the simple descriptions above:"""
+
+        content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                  temperature=0.8, max_tokens=min(400 * len(chunk), 12000), timeout=180)
+        enhanced = json.loads(strip_code_fence(content))
+        if not isinstance(enhanced, list):
+            raise Exception("Response is not a JSON array")
+        if len(enhanced) != len(chunk):
+            print(f"   ⚠️  Expected {len(chunk)} hints, got {len(enhanced)}")
+
+        results = []
+        for i in range(len(chunk)):
+            hint = enhanced[i] if i < len(enhanced) else None
+            results.append(hint.strip() if isinstance(hint, str) and hint.strip() else None)
+        return results
 
 
 class PersonaTweetRegenerate:
@@ -224,6 +419,10 @@ class PersonaTweetRegenerate:
     推文重新生成节点
     选择性地重新生成特定索引的推文，保持其他推文不变
     可以使用新的策略或保持原有策略
+
+    request_mode:
+    - concurrent: 每条推文一次请求，并发执行（max_concurrency 限制同时请求数）
+    - batched: 所有索引合并为一次结构化请求，缺失的索引自动逐条补发
     """
 
     @classmethod
@@ -264,6 +463,15 @@ class PersonaTweetRegenerate:
                 "strategy_json": ("STRING", {
                     "default": "",
                     "multiline": False
+                }),
+                "request_mode": (["concurrent", "batched"], {
+                    "default": "concurrent"
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 16,
+                    "step": 1
                 })
             }
         }
@@ -274,7 +482,8 @@ class PersonaTweetRegenerate:
     CATEGORY = "twitterchat/persona"
 
     def regenerate_tweets(self, persona_json, tweet_indices, regenerate_mode,
-                         api_key, api_base, model, temperature, strategy_json=""):
+                         api_key, api_base, model, temperature, strategy_json="",
+                         request_mode="concurrent", max_concurrency=4):
         """
         重新生成指定的推文
         """
@@ -307,19 +516,21 @@ class PersonaTweetRegenerate:
             raise Exception(f"Invalid indices (out of range): {invalid_indices}")
 
         print(f"📝 Regenerating {len(indices)} tweets: {indices}")
-        print(f"   Mode: {regenerate_mode}")
+        print(f"   Mode: {regenerate_mode} ({request_mode}, max concurrency {max_concurrency})")
         print(f"   Total tweets: {len(tweets)}")
 
         # 根据模式处理
         if regenerate_mode == "replace":
             updated_tweets, report = self._regenerate_full_tweets(
                 indices, tweets, data, strategy_json,
-                api_key, api_base, model, temperature
+                api_key, api_base, model, temperature,
+                request_mode, max_concurrency
             )
         else:  # enhance_scene_hint_only
             updated_tweets, report = self._enhance_scene_hints_only(
                 indices, tweets, data,
-                api_key, api_base, model
+                api_key, api_base, model,
+                request_mode, max_concurrency
             )
 
         # 更新persona
@@ -334,7 +545,8 @@ class PersonaTweetRegenerate:
         return (updated_json, report)
 
     def _regenerate_full_tweets(self, indices, original_tweets, persona_data, strategy_json,
-                               api_key, api_base, model, temperature):
+                               api_key, api_base, model, temperature,
+                               request_mode="concurrent", max_concurrency=4):
         """完全重新生成推文"""
 
         # 导入prompt
@@ -343,31 +555,22 @@ class PersonaTweetRegenerate:
         prompts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prompts')
         sys.path.insert(0, prompts_dir)
 
-        from tweet_generation_prompt import get_tweet_generation_system_prompt, get_tweet_generation_user_prompt
-
-        # 构建core_persona格式
-        core_persona = {
-            'data': persona_data
-        }
-
-        # 对于每个索引，生成新推文
-        updated_tweets = original_tweets.copy()
-        regenerated_count = 0
+        from tweet_generation_prompt import get_tweet_generation_system_prompt
 
-        for idx in indices:
-            old_tweet = original_tweets[idx]
-            old_type = old_tweet.get('type', 'lifestyle_mundane')
-            old_time = old_tweet.get('time_segment', 'afternoon')
+        system_prompt = get_tweet_generation_system_prompt()
+        name = persona_data.get('name', 'Character')
 
-            print(f"\n   Regenerating tweet {idx} ({old_type}, {old_time})...")
+        def slot(idx):
+            tweet = original_tweets[idx]
+            return tweet.get('type', 'lifestyle_mundane'), tweet.get('time_segment', 'afternoon')
 
-            # 生成1条同类型、同时段的新推文
-            system_prompt = get_tweet_generation_system_prompt()
+        def regenerate_one(idx):
+            old_type, old_time = slot(idx)
 
-            # 简化的user prompt，只生成1条
+            # 简化的user prompt，只生成1条同类型、同时段的新推文
             user_prompt = f"""Generate 1 tweet for this character matching these specifications:
 
-CHARACTER: {persona_data.get('name', 'Character')}
+CHARACTER: {name}
 REQUIRED TYPE: {old_type}
 REQUIRED TIME SEGMENT: {old_time}
 
@@ -375,81 +578,60 @@ Use the full persona details to generate an authentic tweet with detailed scene_
 
 Return JSON array with 1 tweet object."""
 
-            # 调用LLM
-            try:
-                url = f"{api_base.rstrip('/')}/chat/completions"
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}"
-                }
-                data_req = {
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": temperature,
-                    "max_tokens": 1500
-                }
-
-                response = requests.post(url, headers=headers, json=data_req, timeout=120)
-                response.raise_for_status()
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-
-                # 解析
-                content = content.strip()
-                if content.startswith('```'):
-                    lines = content.split('\n')
-                    if lines[0].startswith('```'):
-                        lines = lines[1:]
-                    if lines and lines[-1].strip() == '```':
-                        lines = lines[:-1]
-                    content = '\n'.join(lines)
-
-                new_tweets = json.loads(content.strip())
-                if isinstance(new_tweets, list) and len(new_tweets) > 0:
-                    updated_tweets[idx] = new_tweets[0]
-                    regenerated_count += 1
-                    print(f"      ✓ Regenerated successfully")
-                else:
-                    print(f"      ✗ Failed to parse new tweet")
+            content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                      temperature=temperature, max_tokens=1500, timeout=120)
+            new_tweets = json.loads(strip_code_fence(content))
+            if not isinstance(new_tweets, list) or len(new_tweets) == 0 or not isinstance(new_tweets[0], dict):
+                raise Exception("Failed to parse new tweet")
+            return new_tweets[0]
 
-            except Exception as e:
-                print(f"      ✗ Error: {str(e)}")
+        def regenerate_batch(batch):
+            slots = "\n".join(f'- "{idx}": type {slot(idx)[0]}, time segment {slot(idx)[1]}' for idx in batch)
+            user_prompt = f"""Generate {len(batch)} tweets for this character, one for each slot below:
 
-        report = f"""✅ Tweet Regeneration Complete
+CHARACTER: {name}
+SLOTS (id: required type and time segment):
+{slots}
 
-Regenerated: {regenerated_count}/{len(indices)} tweets
-Indices: {indices}
-Mode: Full replacement
-"""
+Use the full persona details to generate authentic tweets with detailed scene_hint (80-150 words each).
 
-        return updated_tweets, report
+Return a JSON object mapping each slot id to its tweet object, e.g. {{"{batch[0]}": {{...}}}}."""
 
-    def _enhance_scene_hints_only(self, indices, original_tweets, persona_data,
-                                  api_key, api_base, model):
-        """只增强scene_hint，保持推文文本不变"""
+            content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                      temperature=temperature, max_tokens=min(1500 * len(batch), 16000),
+                                      timeout=240)
+            return json.loads(strip_code_fence(content))
 
+        results = self._run_requests(indices, regenerate_one, regenerate_batch,
+                                     request_mode, max_concurrency, "Regenerating tweet")
         updated_tweets = original_tweets.copy()
-        enhanced_count = 0
+        for idx, (tweet, _) in results.items():
+            if tweet is not None:
+                updated_tweets[idx] = tweet
 
-        for idx in indices:
-            old_tweet = original_tweets[idx].copy()
-            old_scene_hint = old_tweet.get('scene_hint', '')
+        return updated_tweets, self._build_report("Tweet Regeneration", "Regenerated", "Full replacement",
+                                                  indices, results, request_mode)
 
-            print(f"\n   Enhancing scene_hint for tweet {idx}...")
+    def _enhance_scene_hints_only(self, indices, original_tweets, persona_data,
+                                  api_key, api_base, model,
+                                  request_mode="concurrent", max_concurrency=4):
+        """只增强scene_hint，保持推文文本不变"""
 
-            # 使用SceneHintEnhancer的逻辑
-            visual_profile = persona_data.get('visual_profile', {})
-            appearance = persona_data.get('appearance', {})
-            tags = persona_data.get('tags', [])
+        def with_hint(idx, enhanced):
+            # 移除引号
+            enhanced = enhanced.strip()
+            if enhanced.startswith('"') and enhanced.endswith('"'):
+                enhanced = enhanced[1:-1]
+            tweet = original_tweets[idx].copy()
+            tweet['scene_hint'] = enhanced
+            return tweet
 
+        def enhance_one(idx):
             # 构建简化的增强prompt
             system_prompt = """Enhance this scene description to 80-150 words. Keep it as a natural paragraph.
 Output ONLY the enhanced description."""
 
-            user_prompt = f"""Original: {old_scene_hint}
+            user_prompt = f"""Original: {original_tweets[idx].get('scene_hint', '')}
 
 Enhance to 80-150 words with specific details:
 - Outfit specifics
@@ -460,58 +642,121 @@ Enhance to 80-150 words with specific details:
 
 Enhanced description:"""
 
-            try:
-                url = f"{api_base.rstrip('/')}/chat/completions"
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}"
-                }
-                data_req = {
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.8,
-                    "max_tokens": 500
-                }
-
-                response = requests.post(url, headers=headers, json=data_req, timeout=60)
-                response.raise_for_status()
-                result = response.json()
-                enhanced = result['choices'][0]['message']['content'].strip()
-
-                # 移除引号
-                if enhanced.startswith('"') and enhanced.endswith('"'):
-                    enhanced = enhanced[1:-1]
-
-                old_tweet['scene_hint'] = enhanced
-                updated_tweets[idx] = old_tweet
-                enhanced_count += 1
-
-                word_count = len(enhanced.split())
-                print(f"      ✓ Enhanced ({word_count} words)")
+            enhanced = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                       temperature=0.8, max_tokens=500, timeout=60)
+            return with_hint(idx, enhanced)
 
-            except Exception as e:
-                print(f"      ✗ Error: {str(e)}")
+        def enhance_batch(batch):
+            system_prompt = """Enhance each scene description to 80-150 words. Keep each one a natural paragraph.
+Output ONLY a JSON object mapping each id to its enhanced description."""
 
-        report = f"""✅ Scene Hint Enhancement Complete
+            originals = "\n".join(f'"{idx}": {json.dumps(original_tweets[idx].get("scene_hint", ""), ensure_ascii=False)}'
+                                  for idx in batch)
+            user_prompt = f"""Originals (id: description):
+{originals}
 
-Enhanced: {enhanced_count}/{len(indices)} tweets
-Indices: {indices}
-Mode: Scene hint only (text unchanged)
-"""
+Enhance each to 80-150 words with specific details:
+- Outfit specifics
+- Pose details
+- Expression nuances
+- Lighting specifics
+- Atmosphere
+
+Enhanced descriptions (JSON object):"""
+
+            content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                      temperature=0.8, max_tokens=min(500 * len(batch), 8000), timeout=180)
+            enhanced = json.loads(strip_code_fence(content))
+            return {key: with_hint(int(key), value) for key, value in enhanced.items()
+                    if isinstance(value, str) and key.strip().isdigit() and int(key) in batch}
+
+        results = self._run_requests(indices, enhance_one, enhance_batch,
+                                     request_mode, max_concurrency, "Enhancing scene_hint for tweet")
+        updated_tweets = original_tweets.copy()
+        for idx, (tweet, _) in results.items():
+            if tweet is not None:
+                updated_tweets[idx] = tweet
+
+        return updated_tweets, self._build_report("Scene Hint Enhancement", "Enhanced",
+                                                  "Scene hint only (text unchanged)",
+                                                  indices, results, request_mode)
+
+    def _run_requests(self, indices, request_one, request_batch, request_mode, max_concurrency, label):
+        """
+        执行各索引的请求
+
+        - batched: 所有索引合并为一次结构化请求，返回中缺失或无效的索引再逐条补发
+        - concurrent: 每个索引一次请求，最多 max_concurrency 个同时进行
 
-        return updated_tweets, report
+        Returns:
+            {索引: (新推文 或 None, 错误信息 或 None)}
+        """
+
+        unique = list(dict.fromkeys(indices))
+        results = {}
+
+        if request_mode == "batched" and len(unique) > 1:
+            print(f"\n   {label}s {unique} in one request...")
+            try:
+                batch = request_batch(unique)
+                for key, tweet in batch.items():
+                    if isinstance(tweet, dict) and str(key).strip().isdigit() and int(key) in unique:
+                        results[int(key)] = (tweet, None)
+                        print(f"      ✓ {int(key)}")
+            except Exception as e:
+                print(f"      ✗ Batch request failed: {str(e)}")
+
+            missing = [idx for idx in unique if idx not in results]
+            if missing:
+                print(f"   ↻ Falling back to per-tweet requests for {missing}")
+            unique = missing
+
+        def run_one(idx):
+            print(f"\n   {label} {idx}...")
+            try:
+                tweet = request_one(idx)
+            except Exception as e:
+                print(f"      ✗ {idx} error: {str(e)}")
+                return idx, (None, str(e))
+            print(f"      ✓ {idx} done ({len(tweet.get('scene_hint', '').split())} words scene_hint)")
+            return idx, (tweet, None)
+
+        if unique:
+            workers = max(1, min(max_concurrency, len(unique)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tweet-regen") as executor:
+                results.update(executor.map(run_one, unique))
+
+        return results
+
+    def _build_report(self, title, verb, mode_desc, indices, results, request_mode):
+        """生成报告（逐条列出成功 / 失败）"""
+
+        succeeded = sum(1 for tweet, _ in results.values() if tweet is not None)
+        lines = [
+            f"✅ {title} Complete",
+            "",
+            f"{verb}: {succeeded}/{len(results)} tweets",
+            f"Indices: {indices}",
+            f"Mode: {mode_desc}",
+            f"Requests: {request_mode}",
+            "",
+        ]
+        for idx in sorted(results):
+            tweet, error = results[idx]
+            lines.append(f"   [{idx}] ✓" if tweet is not None else f"   [{idx}] ✗ {error}")
+
+        return "\n".join(lines) + "\n"
 
 
 # 节点映射
 NODE_CLASS_MAPPINGS = {
     "SceneHintEnhancer": SceneHintEnhancer,
+    "SceneHintBatchEnhancer": SceneHintBatchEnhancer,
     "PersonaTweetRegenerate": PersonaTweetRegenerate
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "SceneHintEnhancer": "Scene Hint Enhancer ✨",
+    "SceneHintBatchEnhancer": "Scene Hint Batch Enhancer ✨",
     "PersonaTweetRegenerate": "Persona Tweet Regenerate 🔄"
 }
@@ -4,9 +4,12 @@ Persona Generator Nodes
 """
 
 import json
-import requests
+import re
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.llm_client import chat_completion, strip_code_fence
 
 # 添加prompts目录到路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,7 +17,10 @@ prompts_dir = os.path.join(os.path.dirname(current_dir), 'prompts')
 sys.path.insert(0, prompts_dir)
 
 from core_generation_prompt import get_core_generation_system_prompt, get_core_generation_user_prompt
-from tweet_generation_prompt import get_tweet_generation_system_prompt, get_tweet_generation_user_prompt
+from tweet_generation_prompt import (
+    get_tweet_generation_system_prompt, get_tweet_generation_user_prompt,
+    get_tweet_content_distribution, TWEET_TIME_SEGMENTS
+)
 
 
 class PersonaCoreGenerator:
@@ -115,47 +121,14 @@ class PersonaCoreGenerator:
 
     def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model, temperature):
         """调用LLM API"""
-
-        url = f"{api_base.rstrip('/')}/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": temperature,
-            "max_tokens": 8000
-        }
-
-        response = requests.post(url, headers=headers, json=data, timeout=180)
-        response.raise_for_status()
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
-
-        return content
+        return chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                               temperature=temperature, max_tokens=8000, timeout=180)
 
     def _parse_and_validate(self, content):
         """解析并验证JSON"""
 
         # 清理可能的markdown代码块
-        content = content.strip()
-        if content.startswith('```'):
-            lines = content.split('\n')
-            # 移除第一行和最后一行
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content = '\n'.join(lines)
-
-        content = content.strip()
+        content = strip_code_fence(content)
 
         try:
             persona_data = json.loads(content)
@@ -185,8 +158,25 @@ class PersonaTweetGenerator:
     """
     推文生成节点
     基于核心人设生成详细的推文示例，每个推文包含scene_hint用于图像生成
+
+    按 type / time_segment 规划每条推文的槽位，分块并发请求，合并去重后
+    只对缺失的槽位补发请求，避免单次输出过长被截断导致整批失败。
     """
 
+    # 每次请求的推文数
+    CHUNK_SIZE = 6
+    # 同时进行的请求数
+    MAX_PARALLEL_CHUNKS = 4
+    # 缺失槽位的补发轮数
+    MAX_FILL_ROUNDS = 2
+    # 按分块推文数估算输出上限与超时（每条推文含 80+ 词的 scene_hint）
+    TOKENS_PER_TWEET = 450
+    TOKENS_OVERHEAD = 500
+    TIMEOUT_BASE = 60
+    TIMEOUT_PER_TWEET = 20
+
+    REQUIRED_FIELDS = ['type', 'tweet_format', 'time_segment', 'mood', 'text', 'context', 'scene_hint']
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -241,29 +231,40 @@ class PersonaTweetGenerator:
         except json.JSONDecodeError as e:
             raise Exception(f"Invalid core_persona JSON: {str(e)}")
 
-        # 构建prompts
-        system_prompt = get_tweet_generation_system_prompt()
-        user_prompt = get_tweet_generation_user_prompt(core_persona, num_tweets)
+        slots = self._plan_slots(core_persona, num_tweets)
+        chunks = [slots[i:i + self.CHUNK_SIZE] for i in range(0, len(slots), self.CHUNK_SIZE)]
 
         print(f"📝 Generation parameters:")
         print(f"   Model: {model}")
         print(f"   Temperature: {temperature}")
-        print(f"   Number of tweets: {num_tweets}")
+        print(f"   Number of tweets: {num_tweets} ({len(chunks)} chunks)")
         print(f"\n🤖 Calling LLM...")
 
-        # 调用LLM
-        try:
-            tweets_text = self._call_llm(
-                system_prompt,
-                user_prompt,
-                api_key,
-                api_base,
-                model,
-                temperature
-            )
+        llm = (api_key, api_base, model, temperature)
 
-            # 解析并验证
-            tweets = self._parse_and_validate(tweets_text, num_tweets)
+        try:
+            filled = [None] * len(slots)
+            seen_texts = set()
+            self._fill_slots(filled, self._generate_chunks(core_persona, chunks, [], llm), slots, seen_texts)
+
+            for fill_round in range(1, self.MAX_FILL_ROUNDS + 1):
+                missing = [i for i, tweet in enumerate(filled) if tweet is None]
+                if not missing:
+                    break
+                print(f"   ↻ Re-requesting {len(missing)} missing tweets (round {fill_round})")
+                missing_slots = [slots[i] for i in missing]
+                missing_chunks = [missing_slots[i:i + self.CHUNK_SIZE]
+                                  for i in range(0, len(missing_slots), self.CHUNK_SIZE)]
+                avoid_texts = [tweet['text'] for tweet in filled if tweet is not None]
+                self._fill_slots(filled, self._generate_chunks(core_persona, missing_chunks, avoid_texts, llm),
+                                 slots, seen_texts)
+
+            tweets = [tweet for tweet in filled if tweet is not None]
+            if not tweets:
+                raise Exception("No tweets generated")
+            if len(tweets) < num_tweets:
+                print(f"   ⚠️  Only {len(tweets)}/{num_tweets} tweets generated")
+            print(f"   ✓ Generated {len(tweets)} tweets")
 
             # 生成质量报告
             quality_report = self._generate_quality_report(tweets)
@@ -281,79 +282,140 @@ class PersonaTweetGenerator:
 
         return (tweets_json, quality_report)
 
-    def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model, temperature):
-        """调用LLM API"""
+    def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model, temperature, num_tweets=CHUNK_SIZE):
+        """调用LLM API（max_tokens 与超时按本次请求的推文数缩放）"""
+        return chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                               temperature=temperature,
+                               max_tokens=self.TOKENS_OVERHEAD + self.TOKENS_PER_TWEET * num_tweets,
+                               timeout=self.TIMEOUT_BASE + self.TIMEOUT_PER_TWEET * num_tweets)
 
-        url = f"{api_base.rstrip('/')}/chat/completions"
+    def _plan_slots(self, core_persona, num_tweets):
+        """
+        规划每条推文的 type / time_segment
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
+        type 按内容分布权重分配（最大余数法），time_segment 轮流覆盖四个时间段；
+        两者交错排列，使每个分块都覆盖多种类型和时间段。
+        """
 
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": temperature,
-            "max_tokens": 12000
-        }
+        _, distribution = get_tweet_content_distribution(core_persona)
 
-        response = requests.post(url, headers=headers, json=data, timeout=240)
-        response.raise_for_status()
+        quotas = {k: v['weight'] * num_tweets for k, v in distribution.items()}
+        counts = {k: int(q) for k, q in quotas.items()}
+        remainder = num_tweets - sum(counts.values())
+        for k in sorted(quotas, key=lambda k: quotas[k] - counts[k], reverse=True)[:remainder]:
+            counts[k] += 1
 
-        result = response.json()
-        content = result['choices'][0]['message']['content']
+        types = []
+        while len(types) < num_tweets:
+            for k in distribution:
+                if counts[k] > 0:
+                    types.append(k)
+                    counts[k] -= 1
 
-        return content
+        segments = list(TWEET_TIME_SEGMENTS)
+        return [{'type': t, 'time_segment': segments[i % len(segments)]} for i, t in enumerate(types)]
 
-    def _parse_and_validate(self, content, expected_count):
-        """解析并验证tweets JSON"""
+    def _generate_chunks(self, core_persona, chunks, avoid_texts, llm):
+        """并发请求各分块，失败的分块记为空（由补发处理）"""
 
-        # 清理markdown代码块
-        content = content.strip()
-        if content.startswith('```'):
-            lines = content.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content = '\n'.join(lines)
+        system_prompt = get_tweet_generation_system_prompt()
+
+        def generate(chunk):
+            user_prompt = get_tweet_generation_user_prompt(core_persona, len(chunk), slots=chunk,
+                                                           avoid_texts=avoid_texts)
+            try:
+                return self._parse_tweets(self._call_llm(system_prompt, user_prompt, *llm, num_tweets=len(chunk)))
+            except Exception as e:
+                print(f"   ⚠️  Chunk of {len(chunk)} tweets failed: {str(e)}")
+                return []
+
+        workers = min(self.MAX_PARALLEL_CHUNKS, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tweet-chunk") as executor:
+            return [tweet for tweets in executor.map(generate, chunks) for tweet in tweets]
+
+    def _fill_slots(self, filled, tweets, slots, seen_texts):
+        """
+        将生成的推文放入空槽位（去重）
+
+        优先放入 type 与 time_segment 都匹配的槽位，其次 type 匹配，最后任意空槽位；
+        多出来的推文丢弃。
+        """
+
+        def normalize(text):
+            return re.sub(r'\W+', ' ', text.lower()).strip()
 
-        content = content.strip()
+        for tweet in tweets:
+            key = normalize(tweet['text'])
+            if not key or key in seen_texts:
+                continue
+
+            empty = [i for i, t in enumerate(filled) if t is None]
+            matches = ([i for i in empty if slots[i] == {'type': tweet['type'], 'time_segment': tweet['time_segment']}]
+                       or [i for i in empty if slots[i]['type'] == tweet['type']]
+                       or empty)
+            if not matches:
+                break
+            filled[matches[0]] = tweet
+            seen_texts.add(key)
+
+    def _parse_tweets(self, content):
+        """
+        解析tweets JSON
+
+        输出被截断时保留已完整的推文对象；缺少必需字段或 text / scene_hint 不是字符串的
+        推文跳过，不影响同批其他推文。
+        """
+
+        # 清理markdown代码块
+        content = strip_code_fence(content)
 
         try:
             tweets = json.loads(content)
         except json.JSONDecodeError as e:
-            raise Exception(f"JSON parsing failed: {str(e)}\nContent preview:\n{content[:500]}...")
+            tweets = self._salvage_objects(content)
+            if not tweets:
+                raise Exception(f"JSON parsing failed: {str(e)}\nContent preview:\n{content[:500]}...")
+            print(f"   ⚠️  Output truncated, salvaged {len(tweets)} complete tweets")
 
         # 验证是否为数组
         if not isinstance(tweets, list):
             raise Exception("Tweets must be an array")
 
-        if len(tweets) == 0:
-            raise Exception("No tweets generated")
-
-        # 验证每个tweet的必需字段
-        required_fields = ['type', 'tweet_format', 'time_segment', 'mood', 'text', 'context', 'scene_hint']
-
+        valid = []
         for i, tweet in enumerate(tweets):
-            missing = [f for f in required_fields if f not in tweet]
+            missing = [f for f in self.REQUIRED_FIELDS if not isinstance(tweet, dict) or f not in tweet]
             if missing:
-                raise Exception(f"Tweet {i} missing fields: {', '.join(missing)}")
+                print(f"   ⚠️  Tweet {i} missing fields: {', '.join(missing)}, skipped")
+                continue
+            invalid = [f for f in ('text', 'scene_hint') if not isinstance(tweet[f], str)]
+            if invalid:
+                print(f"   ⚠️  Tweet {i} has non-string fields: {', '.join(invalid)}, skipped")
+                continue
 
             # 验证scene_hint长度
             scene_hint = tweet.get('scene_hint', '')
             word_count = len(scene_hint.split())
             if word_count < 70:
                 print(f"   ⚠️  Tweet {i} scene_hint too short ({word_count} words, need 80+)")
-
-        print(f"   ✓ Generated {len(tweets)} tweets")
-        print(f"   ✓ JSON validation passed")
-
-        return tweets
+            valid.append(tweet)
+
+        return valid
+
+    @staticmethod
+    def _salvage_objects(content):
+        """从被截断的JSON数组中取出所有完整的对象"""
+
+        decoder = json.JSONDecoder()
+        objects = []
+        pos = content.find('{')
+        while pos != -1:
+            try:
+                obj, end = decoder.raw_decode(content, pos)
+            except json.JSONDecodeError:
+                break
+            objects.append(obj)
+            pos = content.find('{', end)
+        return objects
 
     def _generate_quality_report(self, tweets):
         """生成质量报告"""
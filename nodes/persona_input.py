@@ -4,13 +4,30 @@ Persona Input Nodes
 """
 
 import os
-import base64
 import json
-import requests
 import torch
 import numpy as np
 from PIL import Image
-import io
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.llm_client import get_llm_client, strip_code_fence
+from ..utils.image_payload import (
+    encode_image_for_upload, to_data_url, image_content_hash, perceptual_hash, get_default_vision_cache,
+    VisionAnalysisCache
+)
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def find_images(image_dir):
+    """查找目录（含子目录）下所有图片，返回排序后的相对路径"""
+    images = []
+    for root, _, files in os.walk(image_dir):
+        for filename in files:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.relpath(os.path.join(root, filename), image_dir))
+    return sorted(images)
 
 
 class PersonaImageInput:
@@ -68,6 +85,30 @@ class PersonaImageInput:
                 "location": ("STRING", {
                     "default": "United States",
                     "multiline": False
+                }),
+                "max_image_side": ("INT", {
+                    "default": 1536,
+                    "min": 0,
+                    "max": 4096,
+                    "step": 64
+                }),
+                "upload_format": (["JPEG", "WEBP", "PNG"], {
+                    "default": "JPEG"
+                }),
+                "max_upload_kb": ("INT", {
+                    "default": 800,
+                    "min": 0,
+                    "max": 20480,
+                    "step": 50
+                }),
+                "use_analysis_cache": ("BOOLEAN", {
+                    "default": True
+                }),
+                "analysis_cache_max_distance": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16,
+                    "step": 1
                 })
             }
         }
@@ -84,40 +125,71 @@ class PersonaImageInput:
         img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
         return img
 
-    def pil_to_base64(self, pil_image):
-        """将PIL Image转换为base64"""
-        buffered = io.BytesIO()
-        pil_image.save(buffered, format="PNG")
-        img_bytes = buffered.getvalue()
-        return base64.b64encode(img_bytes).decode('utf-8')
-
     def analyze_image(self, image, name, age, persona_type, nsfw_level,
-                     api_key, api_base, vision_model, location="United States"):
+                     api_key, api_base, vision_model, location="United States",
+                     max_image_side=1536, upload_format="JPEG", max_upload_kb=800,
+                     use_analysis_cache=True, analysis_cache_max_distance=0):
         """
         分析图片外貌，生成人设基础参数
         """
 
+        # 转换图像为PIL
+        pil_image = self.tensor_to_pil(image)
+
+        appearance_analysis, base_params_json, suggested_name = self.analyze_pil_image(
+            pil_image, name, age, persona_type, nsfw_level,
+            api_key, api_base, vision_model, location,
+            max_image_side=max_image_side, upload_format=upload_format,
+            max_upload_kb=max_upload_kb, use_analysis_cache=use_analysis_cache,
+            analysis_cache_max_distance=analysis_cache_max_distance
+        )
+
+        return (image, appearance_analysis, base_params_json, suggested_name)
+
+    def analyze_pil_image(self, pil_image, name, age, persona_type, nsfw_level,
+                          api_key, api_base, vision_model, location="United States",
+                          raise_on_error=False, max_image_side=1536, upload_format="JPEG",
+                          max_upload_kb=800, use_analysis_cache=True, analysis_cache_max_distance=0):
+        """
+        分析PIL图片（批量脚本可直接调用，无需ComfyUI tensor）
+
+        raise_on_error为True时Vision API失败直接抛出，否则使用fallback文本继续
+        上传前按 max_image_side / upload_format / max_upload_kb 缩放并重新编码；
+        use_analysis_cache为True时复用像素完全相同的图片的分析结果；
+        analysis_cache_max_distance > 0 时还按感知哈希复用近似图片的结果
+        """
+
         print(f"\n{'='*70}")
         print(f"🎭 PersonaImageInput: Analyzing image")
         print(f"{'='*70}")
 
-        # 转换图像为PIL和base64
-        pil_image = self.tensor_to_pil(image)
-        base64_image = self.pil_to_base64(pil_image)
-        image_url = f"data:image/png;base64,{base64_image}"
-
         # 构建vision prompt
         vision_prompt = self._build_vision_prompt(persona_type, nsfw_level)
 
+        cache = get_default_vision_cache() if use_analysis_cache else None
+        cache_context = VisionAnalysisCache.make_context(vision_model, vision_prompt)
+        image_hash = image_content_hash(pil_image) if cache is not None else None
+        phash = perceptual_hash(pil_image) if cache is not None and analysis_cache_max_distance > 0 else None
+        cached = cache.get(cache_context, image_hash, phash, analysis_cache_max_distance) if cache is not None else None
+
         # 调用Vision API
         try:
-            appearance_analysis = self._call_vision_api(
-                image_url,
-                vision_prompt,
-                api_key,
-                api_base,
-                vision_model
-            )
+            if cached is not None:
+                appearance_analysis, distance = cached
+                if distance:
+                    print(f"♻️  Using cached analysis of a similar image (phash {phash}, distance {distance})")
+                else:
+                    print(f"♻️  Using cached image analysis")
+            else:
+                appearance_analysis = self._call_vision_api(
+                    self._encode_upload(pil_image, max_image_side, upload_format, max_upload_kb),
+                    vision_prompt,
+                    api_key,
+                    api_base,
+                    vision_model
+                )
+                if cache is not None:
+                    cache.set(cache_context, image_hash, appearance_analysis, phash)
 
             print(f"✅ Image analysis complete ({len(appearance_analysis)} characters)")
             print(f"\n📝 Appearance Analysis Preview:")
@@ -125,13 +197,45 @@ class PersonaImageInput:
 
         except Exception as e:
             print(f"❌ Vision API call failed: {str(e)}")
+            if raise_on_error:
+                raise
             # 使用fallback
             appearance_analysis = f"Unable to analyze image: {str(e)}"
 
+        suggested_name, base_params_json = self._build_base_params(
+            appearance_analysis, name, age, persona_type, nsfw_level, location
+        )
+
+        print(f"\n📋 Base Parameters:")
+        print(f"   Name: {suggested_name}")
+        print(f"   Age: {age}")
+        print(f"   Type: {persona_type}")
+        print(f"   NSFW Level: {nsfw_level}")
+        print(f"{'='*70}\n")
+
+        return appearance_analysis, base_params_json, suggested_name
+
+    def _encode_upload(self, pil_image, max_image_side, upload_format, max_upload_kb):
+        """缩放并重新编码图片，返回上传用的 data URL"""
+        image_bytes, mime_type = encode_image_for_upload(
+            pil_image, max_side=max_image_side, image_format=upload_format,
+            max_bytes=max_upload_kb * 1024 if max_upload_kb else None
+        )
+        print(f"📦 Upload payload: {pil_image.size[0]}x{pil_image.size[1]} → "
+              f"{upload_format} {len(image_bytes) / 1024:.0f} KB")
+        return to_data_url(image_bytes, mime_type)
+
+    def _build_base_params(self, appearance_analysis, name, age, persona_type, nsfw_level, location):
+        """
+        构建base_params
+
+        Returns:
+            (suggested_name, base_params_json)
+        """
+
         # 从分析中提取建议的名字（如果未指定）
         suggested_name = name if name.strip() else self._extract_name_from_analysis(appearance_analysis, persona_type)
 
-        # 构建base_params
         base_params = {
             "name": suggested_name,
             "age": age,
@@ -141,16 +245,7 @@ class PersonaImageInput:
             "image_analyzed": True
         }
 
-        base_params_json = json.dumps(base_params, ensure_ascii=False, indent=2)
-
-        print(f"\n📋 Base Parameters:")
-        print(f"   Name: {suggested_name}")
-        print(f"   Age: {age}")
-        print(f"   Type: {persona_type}")
-        print(f"   NSFW Level: {nsfw_level}")
-        print(f"{'='*70}\n")
-
-        return (image, appearance_analysis, base_params_json, suggested_name)
+        return suggested_name, json.dumps(base_params, ensure_ascii=False, indent=2)
 
     def _build_vision_prompt(self, persona_type, nsfw_level):
         """构建vision分析的prompt"""
@@ -204,48 +299,33 @@ Provide a detailed analysis covering:
 
 Output in natural paragraph format, be VERY specific about colors, styles, and details."""
 
-    def _call_vision_api(self, image_url, prompt, api_key, api_base, model):
-        """调用Vision API分析图片"""
-
-        url = f"{api_base.rstrip('/')}/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        data = {
-            "model": model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_url
-                            }
+    def _call_vision_api(self, image_url, prompt, api_key, api_base, model, max_tokens=2000):
+        """调用Vision API分析图片（image_url 可以是多张图片的列表）"""
+
+        image_urls = image_url if isinstance(image_url, list) else [image_url]
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    }
+                ] + [
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": url
                         }
-                    ]
-                }
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2000
-        }
+                    } for url in image_urls
+                ]
+            }
+        ]
 
         print(f"🔍 Calling Vision API ({model})...")
 
-        response = requests.post(url, headers=headers, json=data, timeout=120)
-        response.raise_for_status()
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
-
-        return content
+        llm = get_llm_client(api_key, api_base, model)
+        return llm.generate(messages, temperature=0.7, max_tokens=max_tokens, timeout=120 + 60 * (len(image_urls) - 1))
 
     def _extract_name_from_analysis(self, analysis, persona_type):
         """从分析中提取或生成建议的名字"""
@@ -267,6 +347,260 @@ Output in natural paragraph format, be VERY specific about colors, styles, and d
         return random.choice(pool)
 
 
+class PersonaImageBatchInput(PersonaImageInput):
+    """
+    批量图片输入节点
+    输入图片批次或图片目录，每张图片输出一组 appearance_analysis / base_params_json，
+    整个目录的人设创建在一次节点执行中完成
+
+    - images_per_request > 1 时一次Vision请求分析多张图片（模型不支持或返回不完整时逐张补发）
+    - 请求之间并发执行（max_concurrency）
+    - 与 PersonaImageInput 共用上传压缩与分析缓存
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "age": ("INT", {
+                    "default": 23,
+                    "min": 18,
+                    "max": 35,
+                    "step": 1
+                }),
+                "persona_type": ([
+                    "bdsm_sub",
+                    "bdsm_dom",
+                    "fitness_girl",
+                    "artist",
+                    "neighbor",
+                    "office_worker",
+                    "student",
+                    "attractive-woman"
+                ], {
+                    "default": "attractive-woman"
+                }),
+                "nsfw_level": (["soft", "medium", "high"], {
+                    "default": "medium"
+                }),
+                "api_key": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "OpenAI/Claude API key"
+                }),
+                "api_base": ("STRING", {
+                    "default": "https://www.dmxapi.cn/v1",
+                    "multiline": False
+                }),
+                "vision_model": ("STRING", {
+                    "default": "gpt-4-turbo",
+                    "multiline": False,
+                    "placeholder": "gpt-4-turbo, gpt-4o, gpt-4.1等"
+                })
+            },
+            "optional": {
+                "images": ("IMAGE",),
+                "image_dir": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "图片目录（含子目录），与 images 二选一"
+                }),
+                "location": ("STRING", {
+                    "default": "United States",
+                    "multiline": False
+                }),
+                "images_per_request": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 10,
+                    "step": 1
+                }),
+                "max_concurrency": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 16,
+                    "step": 1
+                }),
+                "max_image_side": ("INT", {
+                    "default": 1024,
+                    "min": 0,
+                    "max": 4096,
+                    "step": 64
+                }),
+                "upload_format": (["JPEG", "WEBP", "PNG"], {
+                    "default": "JPEG"
+                }),
+                "max_upload_kb": ("INT", {
+                    "default": 500,
+                    "min": 0,
+                    "max": 20480,
+                    "step": 50
+                }),
+                "use_analysis_cache": ("BOOLEAN", {
+                    "default": True
+                }),
+                "analysis_cache_max_distance": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16,
+                    "step": 1
+                })
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("appearance_analysis", "base_params_json", "suggested_name", "batch_report")
+    OUTPUT_IS_LIST = (True, True, True, False)
+    FUNCTION = "analyze_images"
+    CATEGORY = "twitterchat/persona"
+
+    def analyze_images(self, age, persona_type, nsfw_level, api_key, api_base, vision_model,
+                       images=None, image_dir="", location="United States", images_per_request=4,
+                       max_concurrency=4, max_image_side=1024, upload_format="JPEG", max_upload_kb=500,
+                       use_analysis_cache=True, analysis_cache_max_distance=0):
+        """
+        批量分析图片外貌，每张图片生成一组人设基础参数
+        """
+
+        print(f"\n{'='*70}")
+        print(f"🎭 PersonaImageBatchInput: Analyzing images")
+        print(f"{'='*70}")
+
+        if images is not None:
+            sources = [f"image_{i}" for i in range(images.shape[0])]
+            loaders = [lambda i=i: self.tensor_to_pil(images[i]) for i in range(images.shape[0])]
+        elif image_dir.strip():
+            image_dir = os.path.abspath(image_dir.strip())
+            sources = find_images(image_dir)
+            loaders = [lambda rel=rel: self._load_image(os.path.join(image_dir, rel)) for rel in sources]
+        else:
+            raise Exception("Please provide images or image_dir")
+
+        if not sources:
+            raise Exception(f"No images found in {image_dir}")
+
+        vision_prompt = self._build_vision_prompt(persona_type, nsfw_level)
+        cache = get_default_vision_cache() if use_analysis_cache else None
+        cache_context = VisionAnalysisCache.make_context(vision_model, vision_prompt)
+        llm = (api_key, api_base, vision_model)
+        upload = (max_image_side, upload_format, max_upload_kb)
+
+        print(f"   Images: {len(sources)}")
+        print(f"   Per request: {images_per_request}, max concurrency: {max_concurrency}")
+
+        def prepare(i):
+            """查询分析缓存（只保留哈希，不保留图片）"""
+            if cache is None:
+                return {"image_hash": None, "phash": None, "analysis": None, "cached": False}
+            pil_image = loaders[i]()
+            image_hash = image_content_hash(pil_image)
+            phash = perceptual_hash(pil_image) if analysis_cache_max_distance > 0 else None
+            cached = cache.get(cache_context, image_hash, phash, analysis_cache_max_distance)
+            return {"image_hash": image_hash, "phash": phash,
+                    "analysis": cached[0] if cached is not None else None, "cached": cached is not None}
+
+        def encode(i):
+            """在发送请求的 worker 中读取并编码图片，上传数据随请求结束释放，内存不随目录大小增长"""
+            return self._encode_upload(loaders[i](), *upload)
+
+        workers = max(1, max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vision-batch") as executor:
+            items = list(executor.map(prepare, range(len(sources))))
+            cached_count = sum(1 for item in items if item["cached"])
+
+            pending = [i for i, item in enumerate(items) if item["analysis"] is None]
+            requests_made = 0
+            if images_per_request > 1 and len(pending) > 1:
+                chunks = [pending[i:i + images_per_request] for i in range(0, len(pending), images_per_request)]
+                requests_made += len(chunks)
+
+                def analyze_chunk(chunk):
+                    try:
+                        return self._analyze_multi([encode(i) for i in chunk], vision_prompt, *llm)
+                    except Exception as e:
+                        print(f"   ⚠️  Multi-image request failed ({len(chunk)} images): {str(e)}")
+                        return [None] * len(chunk)
+
+                for chunk, analyses in zip(chunks, executor.map(analyze_chunk, chunks)):
+                    for i, analysis in zip(chunk, analyses):
+                        items[i]["analysis"] = analysis
+                pending = [i for i in pending if items[i]["analysis"] is None]
+                if pending:
+                    print(f"   ↻ Falling back to single-image requests for {len(pending)} images")
+
+            def analyze_one(i):
+                try:
+                    items[i]["analysis"] = self._call_vision_api(encode(i), vision_prompt, *llm)
+                except Exception as e:
+                    print(f"   ❌ {sources[i]}: {str(e)}")
+                    items[i]["error"] = str(e)
+
+            requests_made += len(pending)
+            list(executor.map(analyze_one, pending))
+
+        analyses, params_list, names, failed = [], [], [], []
+        for i, item in enumerate(items):
+            if item["analysis"] is None:
+                failed.append(sources[i])
+                # 与单图节点一致，使用fallback文本继续
+                analysis = f"Unable to analyze image: {item.get('error', 'no analysis returned')}"
+            else:
+                analysis = item["analysis"]
+                if cache is not None and not item["cached"]:
+                    cache.set(cache_context, item["image_hash"], analysis, item["phash"])
+
+            suggested_name, base_params_json = self._build_base_params(
+                analysis, "", age, persona_type, nsfw_level, location
+            )
+            analyses.append(analysis)
+            params_list.append(base_params_json)
+            names.append(suggested_name)
+
+        lines = [
+            f"✅ Batch image analysis complete",
+            f"   Images: {len(sources)} ({cached_count} cached, {requests_made} vision requests)",
+        ]
+        lines += [f"   {source} → {name}" for source, name in zip(sources, names)]
+        if failed:
+            lines.append(f"   ❌ Failed: {', '.join(failed)}")
+        report = "\n".join(lines)
+
+        print(f"\n{report}")
+        print(f"{'='*70}\n")
+
+        return (analyses, params_list, names, report)
+
+    @staticmethod
+    def _load_image(path):
+        with Image.open(path) as img:
+            return img.convert("RGB")
+
+    def _analyze_multi(self, image_urls, vision_prompt, api_key, api_base, model):
+        """
+        一次请求分析多张图片
+
+        Returns:
+            与 image_urls 等长的列表，缺失或无效的位置为 None
+        """
+
+        prompt = f"""You will receive {len(image_urls)} portrait photos, each of a DIFFERENT person. Analyze every photo separately, following the instructions below for each one.
+
+{vision_prompt}
+
+Return ONLY a JSON array of exactly {len(image_urls)} strings, one per photo in the order the photos were provided. Each string is that photo's complete analysis."""
+
+        content = self._call_vision_api(image_urls, prompt, api_key, api_base, model,
+                                        max_tokens=min(2000 * len(image_urls), 16000))
+        analyses = json.loads(strip_code_fence(content))
+        if not isinstance(analyses, list):
+            raise Exception("Response is not a JSON array")
+        if len(analyses) != len(image_urls):
+            print(f"   ⚠️  Expected {len(image_urls)} analyses, got {len(analyses)}")
+
+        return [analyses[i].strip() if i < len(analyses) and isinstance(analyses[i], str) and analyses[i].strip()
+                else None for i in range(len(image_urls))]
+
+
 class PersonaTextInput:
     """
     从文本描述开始生成人设的输入节点
@@ -381,10 +715,12 @@ class PersonaTextInput:
 # 节点映射
 NODE_CLASS_MAPPINGS = {
     "PersonaImageInput": PersonaImageInput,
+    "PersonaImageBatchInput": PersonaImageBatchInput,
     "PersonaTextInput": PersonaTextInput
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "PersonaImageInput": "Persona Image Input 🎭",
+    "PersonaImageBatchInput": "Persona Image Batch Input 🎭",
     "PersonaTextInput": "Persona Text Input 📝"
 }
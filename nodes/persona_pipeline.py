@@ -0,0 +1,200 @@
+"""
+Persona Pipeline Node
+人设流水线节点 - 按阶段依赖并行执行完整人设生成
+"""
+
+import sys
+
+from ..utils.pipeline import StageGraph
+from ..utils.stage_checkpoint import get_default_checkpoint_store, prompt_version
+from .persona_generator import (
+    PersonaCoreGenerator, PersonaTweetGenerator,
+    get_core_generation_user_prompt, get_tweet_generation_user_prompt
+)
+from .persona_advanced import PersonaSocialGenerator, PersonaAuthenticityGenerator
+from .persona_quality import PersonaTweetStrategyGenerator
+from .persona_knowledge import PersonaCharacterBookGenerator
+from .persona_tools import PersonaMerger
+
+
+def _prompt_module(func):
+    """提示词函数所在模块（prompts/ 目录下的模块）"""
+    return sys.modules[func.__module__]
+
+
+def build_persona_graph(appearance_analysis, base_params_json, api_key, api_base, model,
+                        temperature=0.85, num_tweets=14, num_entries=6, num_close_friends=2,
+                        num_past_relationships=2, num_online_friends=2, max_parallel=5,
+                        checkpoints=None):
+    """
+    构建人设生成阶段图
+
+    core 完成后，tweets / social / authenticity / strategy / character_book
+    只依赖 core，并发执行；merge 等待全部完成后通过 PersonaMerger 合并。
+
+    传入 checkpoints（StageCheckpointStore）时，LLM 阶段按
+    上游输出 + 模型 + 温度 + 参数 + 提示词版本 保存检查点，重跑时跳过已完成的阶段。
+
+    Returns:
+        StageGraph（调用 run() 执行，结果中 "merge" 为完整人设JSON）
+    """
+    graph = StageGraph(max_workers=max_parallel, name="PersonaPipeline", checkpoints=checkpoints)
+    llm = (api_key, api_base, model)
+
+    def inputs(stage_cls, *prompt_sources, upstream=(), **params):
+        """阶段检查点输入（api_key / api_base 不影响输出，不参与 key）"""
+        return lambda r: {
+            "upstream": {name: r[name] for name in upstream},
+            "model": model,
+            "temperature": temperature,
+            "params": params,
+            "prompt_version": prompt_version(stage_cls, *prompt_sources),
+        }
+
+    graph.add("core", lambda r: PersonaCoreGenerator().generate_core(
+        appearance_analysis, base_params_json, *llm, temperature)[0],
+        checkpoint_inputs=inputs(PersonaCoreGenerator, _prompt_module(get_core_generation_user_prompt),
+                                 appearance_analysis=appearance_analysis,
+                                 base_params_json=base_params_json))
+
+    graph.add("tweets", lambda r: PersonaTweetGenerator().generate_tweets(
+        r["core"], num_tweets, *llm, temperature)[0], deps=["core"],
+        checkpoint_inputs=inputs(PersonaTweetGenerator, _prompt_module(get_tweet_generation_user_prompt),
+                                 upstream=["core"], num_tweets=num_tweets))
+    graph.add("social", lambda r: PersonaSocialGenerator().generate_social(
+        r["core"], num_close_friends, num_past_relationships, num_online_friends,
+        *llm, temperature)[0], deps=["core"],
+        checkpoint_inputs=inputs(PersonaSocialGenerator, upstream=["core"],
+                                 num_close_friends=num_close_friends,
+                                 num_past_relationships=num_past_relationships,
+                                 num_online_friends=num_online_friends))
+    graph.add("authenticity", lambda r: PersonaAuthenticityGenerator().generate_authenticity(
+        r["core"], *llm, temperature)[0], deps=["core"],
+        checkpoint_inputs=inputs(PersonaAuthenticityGenerator, upstream=["core"]))
+    graph.add("strategy", lambda r: PersonaTweetStrategyGenerator().generate_strategy(
+        r["core"], *llm, temperature)[0], deps=["core"],
+        checkpoint_inputs=inputs(PersonaTweetStrategyGenerator, upstream=["core"]))
+    graph.add("character_book", lambda r: PersonaCharacterBookGenerator().generate_character_book(
+        r["core"], num_entries, *llm, temperature)[0], deps=["core"],
+        checkpoint_inputs=inputs(PersonaCharacterBookGenerator, upstream=["core"], num_entries=num_entries))
+
+    graph.add("merge", lambda r: PersonaMerger().merge_persona(
+        r["core"], r["tweets"], "yes",
+        social_data_json=r["social"],
+        authenticity_json=r["authenticity"],
+        strategy_json=r["strategy"],
+        character_book_json=r["character_book"])[0],
+        deps=["tweets", "social", "authenticity", "strategy", "character_book"])
+
+    return graph
+
+
+class PersonaPipelineRunner:
+    """
+    人设流水线节点
+    一个节点完成 core → (tweets / social / authenticity / strategy / character_book) → merge，
+    互不依赖的阶段并发执行，总耗时约为关键路径耗时
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "appearance_analysis": ("STRING", {
+                    "forceInput": True
+                }),
+                "base_params_json": ("STRING", {
+                    "forceInput": True
+                }),
+                "num_tweets": ("INT", {
+                    "default": 14,
+                    "min": 8,
+                    "max": 30,
+                    "step": 1
+                }),
+                "num_entries": ("INT", {
+                    "default": 6,
+                    "min": 3,
+                    "max": 15,
+                    "step": 1
+                }),
+                "api_key": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "OpenAI/Claude API key"
+                }),
+                "api_base": ("STRING", {
+                    "default": "https://www.dmxapi.cn/v1",
+                    "multiline": False
+                }),
+                "model": ("STRING", {
+                    "default": "gpt-4.1",
+                    "multiline": False
+                }),
+                "temperature": ("FLOAT", {
+                    "default": 0.85,
+                    "min": 0.0,
+                    "max": 2.0,
+                    "step": 0.05
+                })
+            },
+            "optional": {
+                "max_parallel": ("INT", {
+                    "default": 5,
+                    "min": 1,
+                    "max": 8,
+                    "step": 1
+                }),
+                "use_checkpoints": ("BOOLEAN", {
+                    "default": True
+                }),
+                "rerun_stages": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "强制重跑的阶段，逗号分隔（如 character_book,tweets）"
+                })
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("complete_persona_json", "timing_report")
+    FUNCTION = "run_pipeline"
+    CATEGORY = "twitterchat/persona"
+
+    def run_pipeline(self, appearance_analysis, base_params_json, num_tweets, num_entries,
+                     api_key, api_base, model, temperature, max_parallel=5,
+                     use_checkpoints=True, rerun_stages=""):
+        """
+        执行完整人设流水线
+        """
+
+        print(f"\n{'='*70}")
+        print(f"🚀 PersonaPipelineRunner: Running persona pipeline (max parallel: {max_parallel})")
+        print(f"{'='*70}")
+
+        graph = build_persona_graph(
+            appearance_analysis, base_params_json, api_key, api_base, model,
+            temperature=temperature, num_tweets=num_tweets, num_entries=num_entries,
+            max_parallel=max_parallel,
+            checkpoints=get_default_checkpoint_store() if use_checkpoints else None
+        )
+        force = [stage.strip() for stage in rerun_stages.split(',') if stage.strip()]
+
+        try:
+            results = graph.run(force=force)
+        finally:
+            timing_report = graph.timing_report()
+            print(f"\n{timing_report}")
+            print(f"{'='*70}\n")
+
+        return (results["merge"], timing_report)
+
+
+# 节点映射
+NODE_CLASS_MAPPINGS = {
+    "PersonaPipelineRunner": PersonaPipelineRunner
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "PersonaPipelineRunner": "Persona Pipeline Runner 🚀"
+}
@@ -4,11 +4,13 @@ Persona Quality Enhancement Nodes - Phase 2
 """
 
 import json
-import requests
 import copy
 from collections import Counter
 import re
 
+from ..utils.llm_client import chat_completion, strip_code_fence
+from ..utils.visual_profile import extract_visual_profile_local
+
 
 class PersonaTweetStrategyGenerator:
     """
@@ -340,44 +342,13 @@ Generate the strategy JSON now:"""
 
     def _call_llm(self, system_prompt, user_prompt, api_key, api_base, model, temperature):
         """调用LLM"""
-        url = f"{api_base.rstrip('/')}/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": temperature,
-            "max_tokens": 6000
-        }
-
-        response = requests.post(url, headers=headers, json=data, timeout=180)
-        response.raise_for_status()
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
-
-        return content
+        return chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                               temperature=temperature, max_tokens=6000, timeout=180)
 
     def _parse_and_validate(self, content):
         """解析并验证JSON"""
         # 清理markdown
-        content = content.strip()
-        if content.startswith('```'):
-            lines = content.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content = '\n'.join(lines)
-
-        content = content.strip()
+        content = strip_code_fence(content)
 
         try:
             strategy = json.loads(content)
@@ -424,6 +395,11 @@ class PersonaVisualProfileExtractor:
     视觉档案提取节点
     从推文的scene_hint中自动提取常见服装、道具、颜色、姿势等
     生成统一的visual_profile，确保视觉一致性
+
+    extraction_mode:
+    - auto: 先用本地词表统计提取，置信度低于 min_confidence 时再调用LLM
+    - local: 只用本地提取
+    - llm: 始终调用LLM
     """
 
     @classmethod
@@ -445,6 +421,17 @@ class PersonaVisualProfileExtractor:
                     "default": "gpt-4.1",
                     "multiline": False
                 })
+            },
+            "optional": {
+                "extraction_mode": (["auto", "local", "llm"], {
+                    "default": "auto"
+                }),
+                "min_confidence": ("FLOAT", {
+                    "default": 0.6,
+                    "min": 0.0,
+                    "max": 1.0,
+                    "step": 0.05
+                })
             }
         }
 
@@ -453,7 +440,8 @@ class PersonaVisualProfileExtractor:
     FUNCTION = "extract_visual_profile"
     CATEGORY = "twitterchat/persona"
 
-    def extract_visual_profile(self, persona_json, api_key, api_base, model):
+    def extract_visual_profile(self, persona_json, api_key, api_base, model,
+                               extraction_mode="auto", min_confidence=0.6):
         """
         提取视觉档案
         """
@@ -479,8 +467,22 @@ class PersonaVisualProfileExtractor:
 
         print(f"📸 Analyzing {len(scene_hints)} scene hints...")
 
-        # 使用LLM提取
-        visual_profile = self._extract_with_llm(scene_hints, data, api_key, api_base, model)
+        visual_profile = None
+        if extraction_mode != "llm":
+            local_profile, confidence = extract_visual_profile_local(scene_hints, data.get('tags', []))
+            print(f"   Local extraction confidence: {confidence:.2f} (threshold {min_confidence:.2f})")
+            if extraction_mode == "local" or confidence >= min_confidence:
+                visual_profile = local_profile
+
+        if visual_profile is None:
+            try:
+                visual_profile = self._extract_with_llm(scene_hints, data, api_key, api_base, model)
+            except Exception as e:
+                if extraction_mode != "auto":
+                    raise
+                # LLM失败时退回本地结果
+                print(f"⚠️  LLM extraction failed, using local profile: {str(e)}")
+                visual_profile = local_profile
 
         print(f"✅ Visual profile extracted")
         self._print_profile_summary(visual_profile)
@@ -555,44 +557,22 @@ Extract and return JSON:
 
 Focus on items that appear in MULTIPLE scenes. Ignore one-off items."""
 
-        url = f"{api_base.rstrip('/')}/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": 0.3,  # 低温保证精确提取
-            "max_tokens": 3000
-        }
-
         print(f"🤖 Calling LLM for extraction...")
 
-        response = requests.post(url, headers=headers, json=data, timeout=120)
-        response.raise_for_status()
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
+        # 低温保证精确提取；相同推文重跑时直接复用缓存的结果
+        content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                  temperature=0.3, max_tokens=3000, timeout=120, cache=True)
 
         # 解析JSON
-        content = content.strip()
-        if content.startswith('```'):
-            lines = content.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content = '\n'.join(lines)
-
-        visual_profile = json.loads(content.strip())
-
-        return visual_profile
+        try:
+            return json.loads(strip_code_fence(content).strip())
+        except json.JSONDecodeError:
+            # 缓存的可能是一次格式错误的输出，跳过缓存重新请求
+            print(f"⚠️  Invalid JSON from LLM, retrying without cache")
+            content = chat_completion(api_key, api_base, model, system_prompt, user_prompt,
+                                      temperature=0.3, max_tokens=3000, timeout=120, cache=True,
+                                      use_cache=False)
+            return json.loads(strip_code_fence(content).strip())
 
     def _print_profile_summary(self, profile):
         """打印视觉档案摘要"""
@@ -27,6 +27,18 @@ class PersonaMerger:
             "optional": {
                 "add_twitter_persona": (["yes", "no"], {
                     "default": "yes"
+                }),
+                "social_data_json": ("STRING", {
+                    "forceInput": True
+                }),
+                "authenticity_json": ("STRING", {
+                    "forceInput": True
+                }),
+                "strategy_json": ("STRING", {
+                    "forceInput": True
+                }),
+                "character_book_json": ("STRING", {
+                    "forceInput": True
                 })
             }
         }
@@ -36,9 +48,10 @@ class PersonaMerger:
     FUNCTION = "merge_persona"
     CATEGORY = "twitterchat/persona"
 
-    def merge_persona(self, core_persona_json, tweets_json, add_twitter_persona="yes"):
+    def merge_persona(self, core_persona_json, tweets_json, add_twitter_persona="yes",
+                      social_data_json="", authenticity_json="", strategy_json="", character_book_json=""):
         """
-        合并核心人设和推文
+        合并核心人设和推文（以及可选的社交、真实感、策略、知识库结果）
         """
 
         print(f"\n{'='*70}")
@@ -60,11 +73,27 @@ class PersonaMerger:
             twitter_persona = self._create_twitter_persona(core_persona, tweets)
             complete_persona['data']['twitter_persona'] = twitter_persona
 
+        # 可选阶段结果
+        data = complete_persona.setdefault('data', {})
+        merged_sections = []
+        for label, section_json in [("social", social_data_json), ("authenticity", authenticity_json)]:
+            if section_json:
+                self._merge_section(data, self._load_section(label, section_json))
+                merged_sections.append(label)
+        if strategy_json:
+            data['tweet_strategy'] = self._load_section("strategy", strategy_json)
+            merged_sections.append("strategy")
+        if character_book_json:
+            data['character_book'] = self._load_section("character_book", character_book_json)
+            merged_sections.append("character_book")
+
         print(f"✅ Persona merged successfully")
         print(f"   Core fields: {len(core_persona.get('data', {}).keys())}")
         print(f"   Tweets: {len(tweets)}")
         if add_twitter_persona == "yes":
             print(f"   Twitter persona added: Yes")
+        if merged_sections:
+            print(f"   Extra sections: {', '.join(merged_sections)}")
 
         complete_json = json.dumps(complete_persona, ensure_ascii=False, indent=2)
 
@@ -72,6 +101,24 @@ class PersonaMerger:
 
         return (complete_json,)
 
+    def _load_section(self, label, section_json):
+        """解析可选阶段的JSON"""
+        try:
+            return json.loads(section_json)
+        except json.JSONDecodeError as e:
+            raise Exception(f"Invalid {label} JSON: {str(e)}")
+
+    def _merge_section(self, data, section):
+        """把阶段结果的顶层字段合并进data（同名字典浅合并，阶段结果优先）"""
+        for key, value in section.items():
+            existing = data.get(key)
+            if isinstance(existing, dict) and isinstance(value, dict):
+                merged = dict(existing)
+                merged.update(value)
+                data[key] = merged
+            else:
+                data[key] = value
+
     def _create_twitter_persona(self, core_persona, tweets):
         """创建twitter_persona结构"""
 
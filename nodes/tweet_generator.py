@@ -1,8 +1,67 @@
 """Tweet generation node"""
+import re
+import time
+from typing import Callable, Optional
 # Use relative imports
-from ..utils.llm_client import LLMClient
+from ..utils.llm_client import get_llm_client
 from ..utils.persona_utils import extract_few_shot_examples, search_character_book
 
+try:
+    # Only available inside ComfyUI
+    from server import PromptServer
+except ImportError:
+    PromptServer = None
+
+# Frontend event carrying the early tweet preview: {"node": node id, "tweet": text}
+TWEET_PREVIEW_EVENT = "twitterchat.tweet_preview"
+
+
+class TweetStreamParser:
+    """
+    Incremental parser for streamed TWEET:/SCENE: output
+
+    The tweet is complete as soon as the SCENE: marker starts a line, so it can
+    be handed downstream before the scene description finishes streaming.
+    """
+
+    _SCENE_MARKER = re.compile(r'(?:^|\n)[ \t]*SCENE:')
+
+    def __init__(self):
+        self.buffer = ""
+        self.tweet = None
+
+    def feed(self, delta: str) -> Optional[str]:
+        """
+        Append a streamed chunk
+
+        Returns:
+            The tweet text the first time it becomes complete, otherwise None
+        """
+        self.buffer += delta
+        if self.tweet is not None:
+            return None
+
+        match = self._SCENE_MARKER.search(self.buffer)
+        if not match:
+            return None
+
+        self.tweet = self._extract_tweet(self.buffer[:match.start()])
+        return self.tweet
+
+    @staticmethod
+    def _extract_tweet(text: str) -> str:
+        """Extract tweet section (same line rules as TweetGenerator._parse_response)"""
+        tweet_lines = []
+        in_tweet = False
+        for line in text.split('\n'):
+            line = line.strip()
+            if line.startswith('TWEET:'):
+                in_tweet = True
+                tweet_lines = [line.replace('TWEET:', '').strip()]
+            elif in_tweet and line:
+                tweet_lines.append(line)
+        return '\n'.join(tweet_lines).strip()
+
 
 class TweetGenerator:
     """Tweet Generator (combines persona + context)"""
@@ -56,6 +115,12 @@ class TweetGenerator:
                     "multiline": True,
                     "placeholder": "⭐ Directly edit complete user prompt (leave empty for auto-generation)"
                 }),
+                "stream": ("BOOLEAN", {
+                    "default": False
+                }),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -68,7 +133,7 @@ class TweetGenerator:
     def generate(self, persona, api_key, api_base, model,
                  calendar_plan=None, context=None, is_batch_mode=False, custom_topic="",
                  temperature=0.85, custom_user_prompt_template="",
-                 system_prompt_override="", user_prompt_override=""):
+                 system_prompt_override="", user_prompt_override="", stream=False, unique_id=None):
         """
         Generate tweet and scene hint
 
@@ -85,6 +150,8 @@ class TweetGenerator:
             custom_user_prompt_template: Custom user prompt template
             system_prompt_override: Directly override system prompt (highest priority)
             user_prompt_override: Directly override user prompt (highest priority)
+            stream: Stream the completion and surface the tweet as soon as SCENE: starts
+            unique_id: Node id (hidden input), used to address the frontend preview
 
         Returns:
             (tweet, scene_hint, system_prompt, user_prompt) Tweet, scene, system prompt, user prompt
@@ -130,16 +197,73 @@ class TweetGenerator:
 
         # Call LLM
         try:
-            llm = LLMClient(api_key, api_base, model)
-            response = llm.generate(messages, temperature=temperature, max_tokens=400)
+            llm = get_llm_client(api_key, api_base, model)
+
+            if stream:
+                tweet, scene_hint = self.generate_streaming(
+                    llm, messages, temperature, calendar_plan,
+                    on_tweet=lambda early_tweet: self._preview_tweet(early_tweet, unique_id)
+                )
+            else:
+                response = llm.generate(messages, temperature=temperature, max_tokens=400)
 
-            # Parse LLM output, extract tweet and scene hint
-            tweet, scene_hint = self._parse_response(response, calendar_plan)
+                # Parse LLM output, extract tweet and scene hint
+                tweet, scene_hint = self._parse_response(response, calendar_plan)
 
             return (tweet, scene_hint, system_prompt, user_prompt)
         except Exception as e:
             raise RuntimeError(f"Tweet generation failed: {str(e)}")
 
+    def generate_streaming(self, llm, messages: list, temperature: float = 0.85, calendar_plan=None,
+                           on_tweet: Optional[Callable[[str], None]] = None) -> tuple:
+        """
+        Stream the completion, reporting the tweet as soon as it is complete
+
+        Args:
+            llm: LLMClient instance
+            messages: Chat messages
+            temperature: Temperature parameter
+            calendar_plan: Calendar plan (used for scene fallback)
+            on_tweet: Callback invoked with the tweet once the SCENE: marker arrives
+                      (defaults to _preview_tweet without a node id)
+
+        Returns:
+            (tweet, scene_hint) parsed from the full completion
+        """
+        on_tweet = on_tweet or self._preview_tweet
+        parser = TweetStreamParser()
+        start_time = time.time()
+
+        for delta in llm.generate(messages, temperature=temperature, max_tokens=400, stream=True):
+            early_tweet = parser.feed(delta)
+            if early_tweet is not None:
+                print(f"[TweetGenerator] Tweet ready after {time.time() - start_time:.2f}s")
+                on_tweet(early_tweet)
+
+        return self._parse_response(parser.buffer, calendar_plan)
+
+    def _preview_tweet(self, tweet: str, node_id: Optional[str] = None):
+        """
+        Default early-tweet handler
+
+        Prints the tweet and, when running inside ComfyUI, sends it to the frontend:
+        as the node's progress text if the server supports it, otherwise as a
+        TWEET_PREVIEW_EVENT message.
+        """
+        print(f"[TweetGenerator] Tweet preview:\n{tweet}")
+
+        server = getattr(PromptServer, "instance", None) if PromptServer is not None else None
+        if server is None:
+            return
+        try:
+            if node_id is not None and hasattr(server, "send_progress_text"):
+                server.send_progress_text(tweet, node_id)
+            else:
+                server.send_sync(TWEET_PREVIEW_EVENT, {"node": node_id, "tweet": tweet})
+        except Exception as e:
+            # A failed preview must not fail the generation
+            print(f"[TweetGenerator] Failed to send tweet preview: {e}")
+
     def _parse_response(self, response: str, calendar_plan=None) -> tuple:
         """
         Parse LLM response, extract tweet and scene hint
@@ -11,7 +11,9 @@ from .core_generation_prompt import (
 from .tweet_generation_prompt import (
     get_tweet_generation_system_prompt,
     get_tweet_generation_user_prompt,
-    get_scene_hint_quality_guide
+    get_tweet_content_distribution,
+    get_scene_hint_quality_guide,
+    TWEET_TIME_SEGMENTS
 )
 
 __all__ = [
@@ -20,5 +22,7 @@ __all__ = [
     'get_persona_type_examples',
     'get_tweet_generation_system_prompt',
     'get_tweet_generation_user_prompt',
-    'get_scene_hint_quality_guide'
+    'get_tweet_content_distribution',
+    'get_scene_hint_quality_guide',
+    'TWEET_TIME_SEGMENTS'
 ]
@@ -57,24 +57,19 @@ ATTRACTIVENESS GUIDANCE:
 OUTPUT FORMAT: Pure JSON array of tweet objects, no markdown blocks"""
 
 
-def get_tweet_generation_user_prompt(core_persona, num_tweets=14):
+def get_tweet_content_distribution(core_persona):
     """
-    用户提示词 - 基于核心人设生成详细推文
+    根据人设标签确定推文内容类型分布
 
     Args:
         core_persona: 核心人设字典
-        num_tweets: 生成推文数量（默认14条）
+
+    Returns:
+        (persona_type, {type: {'weight', 'desc'}})
     """
 
-    data = core_persona.get('data', {})
-    name = data.get('name', 'Character')
-    personality = data.get('personality', '')
-    description = data.get('description', '')
-    tags = data.get('tags', [])
-    verbal_style = data.get('verbal_style', {})
-    appearance = data.get('appearance', {})
+    tags = core_persona.get('data', {}).get('tags', [])
 
-    # 提取关键信息
     persona_type = 'bdsm_sub' if 'bdsm' in tags or 'submissive' in tags else \
                    'fitness_girl' if 'fitness' in tags or 'gym' in tags else \
                    'artist' if 'artist' in tags or 'creative' in tags else \
@@ -112,31 +107,56 @@ def get_tweet_generation_user_prompt(core_persona, num_tweets=14):
         }
     }
 
-    distribution = content_distributions.get(persona_type, content_distributions['attractive-woman'])
-
-    # 时间段mood定义
-    time_segments = {
-        'morning': {
-            'time': '08:00-12:00',
-            'mood': 'Fresh, energetic, starting the day',
-            'content_style': 'Morning routines, breakfast, plans for the day'
-        },
-        'afternoon': {
-            'time': '12:00-18:00',
-            'mood': 'Active, social, productive',
-            'content_style': 'Work/study updates, activities, social moments'
-        },
-        'evening_prime': {
-            'time': '18:00-22:00',
-            'mood': 'Relaxed, visual, prime posting time',
-            'content_style': 'Outfit posts, evening activities, visual content'
-        },
-        'late_night': {
-            'time': '22:00-03:00',
-            'mood': 'Intimate, vulnerable, reflective',
-            'content_style': 'Personal thoughts, late night confessions, bedroom content'
-        }
+    return persona_type, content_distributions.get(persona_type, content_distributions['attractive-woman'])
+
+
+# 时间段mood定义
+TWEET_TIME_SEGMENTS = {
+    'morning': {
+        'time': '08:00-12:00',
+        'mood': 'Fresh, energetic, starting the day',
+        'content_style': 'Morning routines, breakfast, plans for the day'
+    },
+    'afternoon': {
+        'time': '12:00-18:00',
+        'mood': 'Active, social, productive',
+        'content_style': 'Work/study updates, activities, social moments'
+    },
+    'evening_prime': {
+        'time': '18:00-22:00',
+        'mood': 'Relaxed, visual, prime posting time',
+        'content_style': 'Outfit posts, evening activities, visual content'
+    },
+    'late_night': {
+        'time': '22:00-03:00',
+        'mood': 'Intimate, vulnerable, reflective',
+        'content_style': 'Personal thoughts, late night confessions, bedroom content'
     }
+}
+
+
+def get_tweet_generation_user_prompt(core_persona, num_tweets=14, slots=None, avoid_texts=None):
+    """
+    用户提示词 - 基于核心人设生成详细推文
+
+    Args:
+        core_persona: 核心人设字典
+        num_tweets: 生成推文数量（默认14条）
+        slots: 指定每条推文的 type / time_segment（分块生成时使用，数量以 slots 为准）
+        avoid_texts: 已生成的推文文本，要求不要重复
+    """
+
+    data = core_persona.get('data', {})
+    name = data.get('name', 'Character')
+    personality = data.get('personality', '')
+    description = data.get('description', '')
+    verbal_style = data.get('verbal_style', {})
+    appearance = data.get('appearance', {})
+
+    persona_type, distribution = get_tweet_content_distribution(core_persona)
+    time_segments = TWEET_TIME_SEGMENTS
+    if slots:
+        num_tweets = len(slots)
 
     # Strategic flaws定义
     strategic_flaws = {
@@ -180,7 +200,7 @@ TIME SEGMENTS (distribute tweets across):
 
 STRATEGIC FLAWS (use in 20-30% of tweets):
 {chr(10).join([f"- {k}: {v['desc']}" for k, v in strategic_flaws.items()])}
-
+{_format_slots(slots, avoid_texts)}
 REQUIRED OUTPUT FORMAT:
 Return a JSON array of {num_tweets} tweet objects:
 
@@ -256,6 +276,25 @@ EXAMPLE TWEET STRUCTURE:
 Now generate {num_tweets} tweets following ALL requirements above. Ensure scene_hints are DETAILED (80-150 words each) and tweets sound AUTHENTIC."""
 
 
+def _format_slots(slots, avoid_texts):
+    """分块生成时附加的指定槽位与去重要求"""
+
+    sections = []
+    if slots:
+        sections.append(
+            "\nASSIGNED SLOTS (this is one batch of a larger set - generate exactly one tweet per slot, "
+            "in this order; the slot list overrides the distribution and coverage targets above):\n" +
+            "\n".join(f"{i}. type: {slot['type']}, time_segment: {slot['time_segment']}"
+                      for i, slot in enumerate(slots, 1))
+        )
+    if avoid_texts:
+        sections.append(
+            "\nALREADY WRITTEN (do not repeat or paraphrase these tweets or their scenes):\n" +
+            "\n".join(f"- {text[:100]}" for text in avoid_texts[-30:])
+        )
+    return "\n".join(sections) + "\n" if sections else ""
+
+
 def get_scene_hint_quality_guide():
     """
     Scene hint质量指导 - 好的和坏的例子
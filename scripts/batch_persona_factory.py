@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Batch persona factory - generate personas for every image in a directory
+
+Runs PersonaImageInput → core → tweets/enrichment → visual profile → PersonaSaver
+in-process with a bounded worker pool. Progress is kept in a job ledger, so an
+interrupted run can simply be started again and finished images are skipped.
+Each pipeline stage is checkpointed by input hash (cache/stages), so a failed
+image resumes from its last valid stage instead of starting over.
+
+Usage:
+    python scripts/batch_persona_factory.py --image-dir image --concurrency 8
+    python scripts/batch_persona_factory.py --image-dir image --status
+    python scripts/batch_persona_factory.py --image-dir image --force-stage character_book
+"""
+
+import os
+import sys
+import types
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "twitterchat"
+
+
+def load_package():
+    """Import the repo as a package without running the ComfyUI entry __init__"""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [REPO_DIR]
+        sys.modules[PACKAGE] = package
+    from twitterchat.nodes.persona_batch import PersonaBatchFactory
+    return PersonaBatchFactory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch generate personas from images")
+    parser.add_argument("--image-dir", default=os.path.join(REPO_DIR, "image"))
+    parser.add_argument("--concurrency", type=int, default=8, help="images processed at the same time")
+    parser.add_argument("--stage-parallel", type=int, default=5, help="pipeline stages run at the same time per image")
+    parser.add_argument("--nsfw", default="high", choices=["soft", "medium", "high"])
+    parser.add_argument("--persona-type", default="attractive-woman")
+    parser.add_argument("--age", type=int, default=23)
+    parser.add_argument("--num-tweets", type=int, default=14)
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--vision-model", default="gpt-4.1")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""))
+    parser.add_argument("--api-base", default=os.environ.get("OPENAI_BASE_URL", "https://www.dmxapi.cn/v1"))
+    parser.add_argument("--ledger", default=None, help="job ledger path (default: cache/persona_batch/<dir>.json)")
+    parser.add_argument("--skip-failed", action="store_true", help="do not retry images that failed last run")
+    parser.add_argument("--report-interval", type=float, default=30.0)
+    parser.add_argument("--status", action="store_true", help="print ledger status and exit")
+    parser.add_argument("--no-checkpoints", action="store_true", help="do not reuse or save stage checkpoints")
+    parser.add_argument("--force-stage", action="append", default=[], metavar="STAGE",
+                        help="ignore checkpoints for a stage (vision, core, tweets, social, authenticity, "
+                             "strategy, character_book, merge, visual_profile); repeatable")
+    args = parser.parse_args()
+
+    PersonaBatchFactory = load_package()
+
+    factory = PersonaBatchFactory(
+        args.image_dir, args.api_key, args.api_base, args.model,
+        vision_model=args.vision_model,
+        concurrency=args.concurrency,
+        nsfw_level=args.nsfw,
+        persona_type=args.persona_type,
+        age=args.age,
+        num_tweets=args.num_tweets,
+        stage_parallel=args.stage_parallel,
+        ledger_path=args.ledger,
+        retry_failed=not args.skip_failed,
+        report_interval=args.report_interval,
+        use_checkpoints=not args.no_checkpoints,
+        force_stages=args.force_stage
+    )
+
+    if args.status:
+        # Read-only: safe to poll while a batch is writing the same ledger
+        status = factory.status()
+        print(f"📊 Ledger: {factory.ledger.path}")
+        print(f"   Finished: {status['finished']}")
+        print(f"   Remaining: {status['remaining']}")
+        print(f"   Running: {status['running']}")
+        print(f"   Failed last run: {status['failed']}")
+        return 0
+
+    if not args.api_key:
+        print("❌ Missing API key: pass --api-key or set OPENAI_API_KEY")
+        return 1
+
+    summary = factory.run()
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""测试 AsyncLLMClient 的有界并发与同步包装（请求仍经过 LLMClient 的熔断 / 缓存层）"""
+import os
+import sys
+import time
+import types
+import uuid
+import asyncio
+import tempfile
+import threading
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.async_llm_client import AsyncLLMClient
+from twitterchat.utils.llm_cache import LLMResponseCache
+
+
+class SlowEndpoint:
+    """替代 LLMClient._call_endpoint，记录同时在途的最大请求数"""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, messages, temperature, max_tokens, timeout, max_retries):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        content = messages[-1]["content"]
+        if content == "fail":
+            raise RuntimeError("bad request")
+        return content.upper()
+
+
+def make_client(max_concurrency, **options):
+    name = uuid.uuid4().hex[:8]
+    client = AsyncLLMClient("key", f"http://async-{name}.test/v1", model=f"model-{name}",
+                            max_concurrency=max_concurrency, **options)
+    client.sync_client._call_endpoint = endpoint = SlowEndpoint()
+    return client, endpoint
+
+
+def test_generate_many_is_bounded_and_ordered():
+    client, endpoint = make_client(max_concurrency=3)
+    try:
+        requests = [[{"role": "user", "content": f"item {i}"}] for i in range(9)]
+        results = client.generate_many_sync(requests)
+
+        assert results == [f"ITEM {i}" for i in range(9)]
+        assert endpoint.peak == 3
+        # 请求经过 LLMClient 的熔断器
+        assert client.sync_client.breaker.status()["window_calls"] == 9
+    finally:
+        client.close()
+
+
+def test_generate_many_returns_failures_in_place():
+    client, _ = make_client(max_concurrency=2)
+    try:
+        results = client.generate_many_sync([
+            [{"role": "user", "content": "ok"}],
+            {"messages": [{"role": "user", "content": "fail"}], "max_tokens": 50},
+        ])
+        assert results[0] == "OK"
+        assert isinstance(results[1], RuntimeError)
+    finally:
+        client.close()
+
+
+def test_generate_uses_response_cache():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        client, endpoint = make_client(max_concurrency=2, cache=LLMResponseCache(cache_dir))
+        try:
+            messages = [{"role": "user", "content": "cached"}]
+            assert client.generate_sync(messages) == "CACHED"
+            assert client.generate_sync(messages) == "CACHED"
+            assert endpoint.calls == 1
+        finally:
+            client.close()
+
+
+def test_generate_inside_running_loop():
+    client, _ = make_client(max_concurrency=4)
+
+    async def main():
+        return await asyncio.gather(*(client.generate([{"role": "user", "content": str(i)}]) for i in range(4)))
+
+    try:
+        assert asyncio.run(main()) == ["0", "1", "2", "3"]
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
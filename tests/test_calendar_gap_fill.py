@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""测试日历补缺（只查找并保存缺失的日期，不覆盖已有计划；JSON 与 SQLite 两种后端）"""
+import os
+import sys
+import types
+import tempfile
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.calendar_manager import CalendarManager
+
+
+def plan(topic_type="lifestyle_mundane", theme=""):
+    return {"topic_type": topic_type, "theme": theme}
+
+
+def managers():
+    """每个存储后端一个使用临时目录的 CalendarManager"""
+    for backend in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as calendar_dir:
+            manager = CalendarManager(calendar_dir, backend=backend)
+            try:
+                yield manager
+            finally:
+                manager.store.close()
+
+
+def test_save_calendar_days_fills_gaps_without_overwriting():
+    for manager in managers():
+        manager.save_calendar_days("alice", {"2026-05-01": plan("personal_emotion", "old")})
+        manager.save_calendar_days("alice", {"2026-05-01": plan(theme="new"), "2026-05-02": plan(theme="new")})
+        calendar = manager.load_calendar("alice", "2026-05")["calendar"]
+        assert calendar["2026-05-01"]["theme"] == "old"
+        assert calendar["2026-05-02"]["theme"] == "new"
+
+        manager.save_calendar_days("alice", {"2026-05-01": plan(theme="new")}, overwrite=True)
+        assert manager.get_today_plan("alice", "2026-05-01")["theme"] == "new"
+
+
+def test_find_missing_dates_across_months():
+    for manager in managers():
+        manager.save_calendar_days("alice", {"2026-06-29": plan(), "2026-07-01": plan()})
+        missing = manager.find_missing_dates("alice", "2026-06-28", 5)
+        assert missing == ["2026-06-28", "2026-06-30", "2026-07-02"]
+        assert sorted(manager.load_window("alice", "2026-06-28", 5)) == ["2026-06-29", "2026-07-01"]
+
+
+def test_find_missing_dates_without_calendar():
+    for manager in managers():
+        assert manager.find_missing_dates("bob", "2026-06-28", 3) == ["2026-06-28", "2026-06-29", "2026-06-30"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""测试跨月规划窗口与按月分区保存（CalendarManager，JSON 与 SQLite 两种后端）"""
+import os
+import sys
+import types
+import tempfile
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+if "twitterchat.nodes" not in sys.modules:
+    # 只加载日历节点，不执行 nodes/__init__（其他节点依赖 torch）
+    nodes_package = types.ModuleType("twitterchat.nodes")
+    nodes_package.__path__ = [os.path.join(REPO_DIR, "nodes")]
+    sys.modules["twitterchat.nodes"] = nodes_package
+
+from twitterchat.nodes.calendar_manager import CalendarManager as CalendarManagerNode
+from twitterchat.utils.calendar_manager import CalendarManager
+
+
+def plan(topic_type="lifestyle_mundane", theme=""):
+    return {"topic_type": topic_type, "theme": theme}
+
+
+def managers():
+    """每个存储后端一个使用临时目录的 CalendarManager"""
+    for backend in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as calendar_dir:
+            manager = CalendarManager(calendar_dir, backend=backend)
+            try:
+                yield manager
+            finally:
+                manager.store.close()
+
+
+def test_window_dates_cross_month_boundary():
+    dates = CalendarManager.window_dates("2026-01-30", 4)
+    assert dates == ["2026-01-30", "2026-01-31", "2026-02-01", "2026-02-02"]
+    # 窗口长度至少为 1
+    assert CalendarManager.window_dates("2026-03-01", 0) == ["2026-03-01"]
+
+
+def test_planning_window():
+    assert CalendarManager.planning_window("2026-01", 4, "2026-01-30")[-1] == "2026-02-02"
+    # 没有起始日期时从月初开始，截止到月底
+    dates = CalendarManager.planning_window("2026-02", 40)
+    assert dates[0] == "2026-02-01" and dates[-1] == "2026-02-28"
+
+
+def test_split_by_month():
+    days = {"2026-01-31": plan(), "2026-02-01": plan(), "2026-02-02": plan()}
+    partitions = CalendarManager.split_by_month(days)
+    assert sorted(partitions) == ["2026-01", "2026-02"]
+    assert list(partitions["2026-02"]) == ["2026-02-01", "2026-02-02"]
+
+
+def test_save_calendar_days_splits_into_month_partitions():
+    for manager in managers():
+        days = {date: plan() for date in CalendarManager.window_dates("2026-01-29", 6)}
+        saved = manager.save_calendar_days("alice", days)
+
+        assert saved == ["2026-01", "2026-02"]
+        january = manager.load_calendar("alice", "2026-01")
+        february = manager.load_calendar("alice", "2026-02")
+        assert list(january["calendar"]) == ["2026-01-29", "2026-01-30", "2026-01-31"]
+        assert list(february["calendar"]) == ["2026-02-01", "2026-02-02", "2026-02-03"]
+        assert january["persona_name"] == "alice"
+        assert february["monthly_strategy"]["total_days"] == 3
+
+
+def test_single_request_only_overwrites_the_window():
+    node = CalendarManagerNode()
+    persona = {"data": {"name": "alice", "description": "", "personality": ""}}
+    for manager in managers():
+        manager.save_calendar_days("alice", {"2026-01-28": plan(theme="old"), "2026-02-04": plan(theme="old")})
+
+        # 模型返回了窗口之外的日期
+        returned = {date: plan(theme="new") for date in CalendarManager.window_dates("2026-01-27", 10)}
+        node._request_calendar = lambda *args, **kwargs: {"calendar": dict(returned)}
+        status = node._generate_calendar(manager, persona, "alice", "2026-01", "", "", "m", 0.7,
+                                         days_to_generate=4, max_tokens=1000, target_date_str="2026-01-30")[0]
+
+        assert "(4 days)" in status
+        window = manager.load_window("alice", "2026-01-27", 10)
+        assert window["2026-01-28"]["theme"] == "old"
+        assert window["2026-02-04"]["theme"] == "old"
+        assert sorted(date for date, day in window.items() if day["theme"] == "new") == \
+            CalendarManager.window_dates("2026-01-30", 4)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
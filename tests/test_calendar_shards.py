@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""测试按周分片的日历生成（分片、本地话题类型规划与合并后校正）"""
+import os
+import sys
+import types
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.calendar_manager import CONTENT_TYPE_RATIOS, CalendarManager
+
+
+def test_split_into_shards():
+    dates = CalendarManager.window_dates("2026-03-01", 17)
+    shards = CalendarManager.split_into_shards(dates, 7)
+    assert [len(shard) for shard in shards] == [7, 7, 3]
+    assert [date for shard in shards for date in shard] == dates
+
+
+def test_plan_topic_types_follows_ratios_without_three_in_a_row():
+    dates = CalendarManager.window_dates("2026-03-01", 100)
+    topics = list(CalendarManager.plan_topic_types(dates).values())
+
+    assert len(topics) == len(dates)
+    for topic, percent in CONTENT_TYPE_RATIOS.items():
+        assert abs(topics.count(topic) - percent) <= 2
+    assert all(not (topics[i] == topics[i + 1] == topics[i + 2]) for i in range(len(topics) - 2))
+
+
+def test_plan_topic_types_continues_previous_days():
+    dates = CalendarManager.window_dates("2026-03-01", 3)
+    topic_plan = CalendarManager.plan_topic_types(dates, previous=["lifestyle_mundane", "lifestyle_mundane"])
+    assert topic_plan["2026-03-01"] != "lifestyle_mundane"
+
+
+def test_reconcile_topic_types_realigns_over_represented_days():
+    dates = CalendarManager.window_dates("2026-03-01", 10)
+    topic_plan = CalendarManager.plan_topic_types(dates)
+    calendar_dict = {date: {"topic_type": "lifestyle_mundane"} for date in dates}
+
+    adjusted = CalendarManager.reconcile_topic_types(calendar_dict, topic_plan)
+
+    assert adjusted
+    assert {date: day["topic_type"] for date, day in calendar_dict.items()} == topic_plan
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""测试日历存储后端（JSON 文件 / SQLite）的读写一致性与并发写入"""
+import os
+import sys
+import json
+import time
+import types
+import tempfile
+import threading
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.calendar_store import JsonCalendarStore, SQLiteCalendarStore, copy_calendars, merge_month_days
+
+
+def month(persona_name, year_month, days):
+    return {
+        "persona_name": persona_name,
+        "month": year_month,
+        "generated_at": "2026-01-01 00:00:00",
+        "calendar": {f"{year_month}-{day:02d}": {"topic_type": "lifestyle_mundane", "day": day} for day in days},
+        "monthly_strategy": {"content_ratio": {"lifestyle_mundane": 100.0}, "total_days": len(days)},
+    }
+
+
+def stores():
+    """每个后端一个使用临时目录的存储"""
+    with tempfile.TemporaryDirectory() as calendar_dir:
+        store = JsonCalendarStore(calendar_dir)
+        yield store
+    with tempfile.TemporaryDirectory() as calendar_dir:
+        store = SQLiteCalendarStore(os.path.join(calendar_dir, "calendars.db"))
+        try:
+            yield store
+        finally:
+            store.close()
+
+
+def test_save_and_load_round_trip():
+    for store in stores():
+        data = month("alice", "2026-03", [1, 2, 3])
+        assert store.save_month("alice", "2026-03", data)
+
+        assert store.exists("alice", "2026-03")
+        assert not store.exists("alice", "2026-04")
+        assert store.load_month("alice", "2026-03") == data
+        assert store.load_month("alice", "2026-04") is None
+        assert store.get_day("alice", "2026-03-02")["day"] == 2
+        assert store.get_day("alice", "2026-03-09") is None
+
+
+def test_save_month_replaces_days():
+    for store in stores():
+        store.save_month("alice", "2026-03", month("alice", "2026-03", [1, 2, 3]))
+        store.save_month("alice", "2026-03", month("alice", "2026-03", [2, 4]))
+        assert list(store.load_month("alice", "2026-03")["calendar"]) == ["2026-03-02", "2026-03-04"]
+
+
+def test_loaded_month_is_a_copy():
+    for store in stores():
+        store.save_month("alice", "2026-03", month("alice", "2026-03", [1]))
+        store.load_month("alice", "2026-03")["calendar"]["2026-03-01"]["day"] = 99
+        store.get_day("alice", "2026-03-01")["day"] = 99
+        assert store.get_day("alice", "2026-03-01")["day"] == 1
+
+
+def test_plans_for_date_and_list_months():
+    for store in stores():
+        store.save_month("alice", "2026-03", month("alice", "2026-03", [1, 2]))
+        store.save_month("bob", "2026-03", month("bob", "2026-03", [2]))
+        store.save_month("bob", "2026-04", month("bob", "2026-04", [1]))
+
+        assert sorted(store.get_plans_for_date("2026-03-02")) == ["alice", "bob"]
+        assert sorted(store.get_plans_for_date("2026-03-01")) == ["alice"]
+        assert sorted(store.get_plans_for_date("2026-03-02", ["bob", "carol"])) == ["bob"]
+        assert store.list_months() == [("alice", "2026-03"), ("bob", "2026-03"), ("bob", "2026-04")]
+        assert store.list_months("bob") == [("bob", "2026-03"), ("bob", "2026-04")]
+
+
+def test_merge_keeps_existing_days_unless_overwrite():
+    calendar_data = {"month": "2026-03", "calendar": {"2026-03-01": {"topic_type": "personal_emotion"}}}
+    new_days = {
+        "2026-03-01": {"topic_type": "visual_showcase"},
+        "2026-03-02": {"topic_type": "lifestyle_mundane"},
+        "2026-04-01": {"topic_type": "lifestyle_mundane"},
+    }
+
+    merge_month_days(calendar_data, new_days)
+    assert calendar_data["calendar"]["2026-03-01"]["topic_type"] == "personal_emotion"
+    # 其他月份的日期被忽略
+    assert list(calendar_data["calendar"]) == ["2026-03-01", "2026-03-02"]
+    assert calendar_data["monthly_strategy"]["total_days"] == 2
+
+    merge_month_days(calendar_data, new_days, overwrite=True)
+    assert calendar_data["calendar"]["2026-03-01"]["topic_type"] == "visual_showcase"
+
+
+def test_merge_recomputes_strategy_and_keeps_other_fields():
+    calendar_data = {
+        "month": "2026-03",
+        "calendar": {"2026-03-01": {"topic_type": "lifestyle_mundane"}},
+        "monthly_strategy": {"content_ratio": {}, "total_days": 1, "focus": "spring"},
+    }
+    merge_month_days(calendar_data, {"2026-03-02": {"topic_type": "personal_emotion"}})
+    strategy = calendar_data["monthly_strategy"]
+    assert strategy["focus"] == "spring"
+    assert strategy["total_days"] == 2
+    assert strategy["content_ratio"] == {"lifestyle_mundane": 50.0, "personal_emotion": 50.0}
+
+
+def test_upsert_days_creates_month_and_recomputes_strategy():
+    for store in stores():
+        assert store.upsert_days("alice", "2026-03", {
+            "2026-03-01": {"topic_type": "lifestyle_mundane"},
+            "2026-03-02": {"topic_type": "personal_emotion"},
+            "2026-04-01": {"topic_type": "personal_emotion"},
+        })
+        data = store.load_month("alice", "2026-03")
+        assert data["persona_name"] == "alice"
+        assert list(data["calendar"]) == ["2026-03-01", "2026-03-02"]
+        assert data["monthly_strategy"]["content_ratio"] == {"lifestyle_mundane": 50.0, "personal_emotion": 50.0}
+        assert not store.exists("alice", "2026-04")
+
+
+def test_upsert_days_overwrite():
+    for store in stores():
+        store.upsert_days("alice", "2026-03", {"2026-03-01": {"topic_type": "a"}})
+        store.upsert_days("alice", "2026-03", {"2026-03-01": {"topic_type": "b"}})
+        assert store.get_day("alice", "2026-03-01")["topic_type"] == "a"
+        store.upsert_days("alice", "2026-03", {"2026-03-01": {"topic_type": "b"}}, overwrite=True)
+        assert store.get_day("alice", "2026-03-01")["topic_type"] == "b"
+        assert store.load_month("alice", "2026-03")["monthly_strategy"]["content_ratio"] == {"b": 100.0}
+
+
+def test_concurrent_upserts_keep_every_day():
+    for store in stores():
+        def write(day):
+            assert store.upsert_days("alice", "2026-03", {f"2026-03-{day:02d}": {"topic_type": "lifestyle_mundane"}})
+
+        threads = [threading.Thread(target=write, args=(day,)) for day in range(1, 32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        data = store.load_month("alice", "2026-03")
+        assert len(data["calendar"]) == 31
+        assert data["monthly_strategy"]["total_days"] == 31
+
+
+def test_json_store_rereads_file_changed_on_disk():
+    with tempfile.TemporaryDirectory() as calendar_dir:
+        store = JsonCalendarStore(calendar_dir)
+        store.save_month("alice", "2026-03", month("alice", "2026-03", [1]))
+        assert store.get_day("alice", "2026-03-02") is None
+
+        # 另一个进程写入（mtime / 大小变化后缓存失效）
+        time.sleep(0.01)
+        with open(store.get_path("alice", "2026-03"), 'w', encoding='utf-8') as f:
+            json.dump(month("alice", "2026-03", [1, 2]), f)
+        assert store.get_day("alice", "2026-03-02")["day"] == 2
+
+
+def test_copy_calendars_between_backends():
+    with tempfile.TemporaryDirectory() as calendar_dir:
+        source = JsonCalendarStore(calendar_dir)
+        target = SQLiteCalendarStore(os.path.join(calendar_dir, "calendars.db"))
+        try:
+            source.save_month("alice", "2026-03", month("alice", "2026-03", [1, 2]))
+            source.save_month("bob", "2026-03", month("bob", "2026-03", [3]))
+
+            assert copy_calendars(source, target, persona_name="alice") == 1
+            assert target.list_months() == [("alice", "2026-03")]
+            assert target.load_month("alice", "2026-03") == source.load_month("alice", "2026-03")
+        finally:
+            target.close()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
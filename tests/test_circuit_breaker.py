@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""测试熔断器状态转换与 LLMClient 的多端点故障转移"""
+import os
+import sys
+import time
+import types
+import uuid
+
+from requests.structures import CaseInsensitiveDict
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.circuit_breaker import CircuitBreaker
+from twitterchat.utils.llm_client import LLMClient
+from twitterchat.utils.retry import ClientRequestError, RetryableError
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class FakeEndpoint:
+    """替代 LLMClient._call_endpoint，记录每次调用的 max_retries"""
+
+    def __init__(self, result="ok", error=None):
+        self.result = result
+        self.error = error
+        self.retries = []
+
+    def __call__(self, messages, temperature, max_tokens, timeout, max_retries):
+        self.retries.append(max_retries)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class FakeResponse:
+    def __init__(self, status_code, message="error", headers=None):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.text = message
+
+    def json(self):
+        return {"error": {"message": self.text}}
+
+
+def make_client(fallbacks=0):
+    """端点地址与模型名唯一，熔断器不与其他用例共享"""
+    name = uuid.uuid4().hex[:8]
+    return LLMClient("key", f"http://primary-{name}.test/v1", model=f"model-{name}",
+                     fallbacks=[f"http://fallback{i}-{name}.test/v1" for i in range(fallbacks)])
+
+
+def test_breaker_opens_on_failures_and_recovers():
+    breaker = CircuitBreaker("test-failures", window_size=4, min_calls=4, open_timeout=0.1,
+                             half_open_successes=1)
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 半开状态只放行一个探测请求
+    assert not breaker.allow_request()
+    breaker.record_success(0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("test-probe", window_size=2, min_calls=2, open_timeout=0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.open_count == 2
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker("test-slow", window_size=4, min_calls=4, slow_call_threshold=1.0,
+                             slow_call_rate_threshold=0.75)
+    for latency in (2.0, 2.0, 2.0, 0.1):
+        breaker.record_success(latency)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_check_response_classifies_status_codes():
+    client = make_client()
+    client._check_response(FakeResponse(200))
+    for status_code in (429, 500, 503):
+        try:
+            client._check_response(FakeResponse(status_code, headers={"Retry-After": "2"}))
+            assert False, "expected RetryableError"
+        except RetryableError as e:
+            assert e.retry_after == 2.0
+    try:
+        client._check_response(FakeResponse(400, "context_length_exceeded"))
+        assert False, "expected ClientRequestError"
+    except ClientRequestError as e:
+        assert e.status_code == 400
+        assert "context_length_exceeded" in str(e)
+
+
+def test_client_fails_over_to_fallback():
+    client = make_client(fallbacks=1)
+    client._call_endpoint = primary = FakeEndpoint(error=RuntimeError("down"))
+    client.fallback_clients[0]._call_endpoint = fallback = FakeEndpoint("from fallback")
+
+    assert client.generate(MESSAGES, max_retries=3) == "from fallback"
+    # 还有备用端点时主端点只尝试一次，最后一个端点使用完整重试次数
+    assert primary.retries == [1]
+    assert fallback.retries == [3]
+
+
+def test_client_skips_open_endpoint():
+    client = make_client(fallbacks=1)
+    client._call_endpoint = primary = FakeEndpoint(error=RuntimeError("down"))
+    client.fallback_clients[0]._call_endpoint = FakeEndpoint("from fallback")
+
+    for _ in range(client.breaker.min_calls):
+        client.generate(MESSAGES)
+    assert client.breaker.state == CircuitBreaker.OPEN
+    calls = len(primary.retries)
+    assert client.generate(MESSAGES) == "from fallback"
+    assert len(primary.retries) == calls
+
+
+def test_client_errors_do_not_trip_breaker_or_fail_over():
+    client = make_client(fallbacks=1)
+    client._call_endpoint = primary = FakeEndpoint(error=ClientRequestError("HTTP 400: bad request", 400))
+    client.fallback_clients[0]._call_endpoint = fallback = FakeEndpoint("from fallback")
+
+    for _ in range(client.breaker.min_calls * 2):
+        try:
+            client.generate(MESSAGES)
+            assert False, "expected ClientRequestError"
+        except ClientRequestError:
+            pass
+
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.breaker.status()["window_calls"] == 0
+    assert len(primary.retries) == client.breaker.min_calls * 2
+    assert fallback.retries == []
+
+
+def test_sdk_client_errors_are_classified():
+    class StatusError(Exception):
+        def __init__(self, status_code):
+            super().__init__(f"Error code: {status_code}")
+            self.status_code = status_code
+
+    assert isinstance(LLMClient.friendly_sdk_error(StatusError(400), 60), ClientRequestError)
+    assert isinstance(LLMClient.friendly_sdk_error(StatusError(401), 60), ClientRequestError)
+    assert not isinstance(LLMClient.friendly_sdk_error(StatusError(429), 60), ClientRequestError)
+    assert not isinstance(LLMClient.friendly_sdk_error(StatusError(502), 60), ClientRequestError)
+    assert not isinstance(LLMClient.friendly_sdk_error(TimeoutError("timeout"), 60), ClientRequestError)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
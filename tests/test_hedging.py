@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""测试对冲请求（延迟分桶、分位数阈值与 LLMClient 的对冲副本）"""
+import os
+import sys
+import time
+import types
+import uuid
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.hedging import LatencyTracker, hedged_call, latency_bucket
+from twitterchat.utils.llm_client import LLMClient
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class FakeEndpoint:
+    """替代 LLMClient._call_endpoint，记录每次调用的 max_retries"""
+
+    def __init__(self, result="ok", delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.retries = []
+
+    def __call__(self, messages, temperature, max_tokens, timeout, max_retries):
+        self.retries.append(max_retries)
+        if self.delay:
+            time.sleep(self.delay)
+        return self.result
+
+
+def test_latency_buckets_and_tracker():
+    assert latency_bucket(300) == "<=512"
+    assert latency_bucket(2048) == "<=2048"
+    assert latency_bucket(10000) == ">8192"
+
+    tracker = LatencyTracker(min_samples=5)
+    for latency in (1, 2, 3, 4):
+        tracker.record(latency)
+    assert tracker.percentile(0.95) is None
+    tracker.record(5)
+    assert tracker.percentile(0.5) == 3
+    assert tracker.percentile(1.0) == 5
+
+
+def test_hedged_call():
+    assert hedged_call(lambda: "primary", lambda: "hedge", 0.5) == "primary"
+
+    def slow():
+        time.sleep(0.5)
+        return "primary"
+
+    assert hedged_call(slow, lambda: "hedge", 0.05) == "hedge"
+
+    def fail_primary():
+        time.sleep(0.1)
+        raise ValueError("primary failed")
+
+    def fail_hedge():
+        raise KeyError("hedge failed")
+
+    try:
+        hedged_call(fail_primary, fail_hedge, 0.01)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_client_hedges_slow_primary_once():
+    name = uuid.uuid4().hex[:8]
+    client = LLMClient("key", f"http://primary-{name}.test/v1", model=f"model-{name}",
+                       fallbacks=[f"http://fallback-{name}.test/v1"],
+                       hedge_percentile=0.5, hedge_min_delay=0.05)
+    client._call_endpoint = FakeEndpoint("slow primary", delay=0.5)
+    hedge_target = client.fallback_clients[0]
+    hedge_target._call_endpoint = fallback = FakeEndpoint("fast fallback")
+
+    # 只有同一 max_tokens 分桶有足够样本时才对冲
+    for _ in range(20):
+        client._latency(300).record(0.05)
+    assert client._hedge_delay(10000) is None
+
+    assert client.generate(MESSAGES, max_tokens=300) == "fast fallback"
+    # 副本只发一次请求，并计入目标端点的熔断器
+    assert fallback.retries == [1]
+    assert hedge_target.breaker.status()["window_calls"] == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""测试批量任务账本（JobLedger）的状态记录、中断恢复与多写入方合并"""
+import os
+import sys
+import json
+import types
+import tempfile
+import threading
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.job_ledger import JobLedger
+
+
+def test_ledger_tracks_job_lifecycle():
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        path = os.path.join(ledger_dir, "ledger.json")
+        ledger = JobLedger(path)
+        ledger.register(["a.png", "b.png"])
+        ledger.start("a.png")
+        ledger.finish("a.png", output="a_persona.json", duration=1.5)
+        ledger.start("b.png")
+        ledger.fail("b.png", "timeout")
+
+        reloaded = JobLedger(path)
+        assert reloaded.get("a.png")["status"] == JobLedger.DONE
+        assert reloaded.get("a.png")["output"] == "a_persona.json"
+        assert reloaded.get("b.png")["error"] == "timeout"
+        assert reloaded.counts()[JobLedger.FAILED] == 1
+        assert reloaded.keys_with_status(JobLedger.FAILED) == ["b.png"]
+
+        # 重新登记不覆盖已有记录
+        reloaded.register(["a.png", "c.png"])
+        assert reloaded.status("a.png") == JobLedger.DONE
+        assert reloaded.status("c.png") == JobLedger.PENDING
+
+
+def test_ledger_recovers_interrupted_jobs_explicitly():
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        path = os.path.join(ledger_dir, "ledger.json")
+        ledger = JobLedger(path)
+        ledger.register(["a.png"])
+        ledger.start("a.png")
+
+        # 构造账本不修改 running 状态，也不写回文件
+        with open(path, 'rb') as f:
+            before = f.read()
+        assert JobLedger(path).status("a.png") == JobLedger.RUNNING
+        assert JobLedger.read(path)["a.png"]["status"] == JobLedger.RUNNING
+        with open(path, 'rb') as f:
+            assert f.read() == before
+
+        assert JobLedger(path).recover_interrupted() == 1
+        assert JobLedger.read(path)["a.png"]["status"] == JobLedger.PENDING
+
+
+def test_ledgers_sharing_a_file_keep_each_others_updates():
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        path = os.path.join(ledger_dir, "ledger.json")
+        JobLedger(path).register(["a.png", "b.png"])
+
+        # 两个批量进程各自加载账本，处理不同的任务
+        first = JobLedger(path)
+        second = JobLedger(path)
+        first.start("a.png")
+        second.start("b.png")
+        second.fail("b.png", "timeout")
+        second.register(["c.png"])
+        first.finish("a.png", output="a.json")
+
+        jobs = JobLedger.read(path)
+        assert jobs["a.png"]["status"] == JobLedger.DONE
+        assert jobs["b.png"]["status"] == JobLedger.FAILED
+        assert jobs["c.png"]["status"] == JobLedger.PENDING
+        # 写回时合并的磁盘状态同时更新到内存
+        assert first.status("b.png") == JobLedger.FAILED
+        assert first.status("c.png") == JobLedger.PENDING
+
+
+def test_ledger_concurrent_updates_leave_no_temp_files():
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        path = os.path.join(ledger_dir, "ledger.json")
+        ledger = JobLedger(path)
+        keys = [f"{i}.png" for i in range(40)]
+        ledger.register(keys)
+
+        def process(key):
+            ledger.start(key)
+            ledger.finish(key, output=key)
+
+        threads = [threading.Thread(target=process, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            jobs = json.load(f)["jobs"]
+        assert all(jobs[key]["status"] == JobLedger.DONE for key in keys)
+        assert os.listdir(ledger_dir) == ["ledger.json"]
+
+
+def test_ledger_read_missing_file():
+    with tempfile.TemporaryDirectory() as ledger_dir:
+        path = os.path.join(ledger_dir, "missing.json")
+        assert JobLedger.read(path) == {}
+        JobLedger(path)
+        assert not os.path.exists(path)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
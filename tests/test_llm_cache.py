@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""测试 LLM 响应缓存（内容寻址的 key、TTL、LRU 淘汰与客户端缓存命中）"""
+import os
+import sys
+import time
+import types
+import uuid
+import tempfile
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.llm_cache import LLMResponseCache, make_cache_key
+from twitterchat.utils.llm_client import LLMClient
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class FakeEndpoint:
+    """替代 LLMClient._call_endpoint，记录调用次数"""
+
+    def __init__(self, result="ok"):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, messages, temperature, max_tokens, timeout, max_retries):
+        self.calls += 1
+        return self.result
+
+
+def test_cache_key_is_canonical():
+    key = make_cache_key("m", MESSAGES, 0.7, 100)
+    assert key == make_cache_key("m", [dict(MESSAGES[0])], 0.70000001, 100)
+    assert key != make_cache_key("m", MESSAGES, 0.8, 100)
+    assert key != make_cache_key("m", MESSAGES, 0.7, 200)
+
+
+def test_cache_get_set_and_ttl():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = LLMResponseCache(cache_dir, ttl=0.2)
+        cache.set("a" * 64, "response")
+        assert cache.get("a" * 64) == "response"
+        assert cache.get("b" * 64) is None
+        time.sleep(0.3)
+        assert cache.get("a" * 64) is None
+        assert cache.stats()["hits"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = LLMResponseCache(cache_dir, max_bytes=1000, ttl=None)
+        keys = [f"{i:02d}" * 32 for i in range(10)]
+        for key in keys:
+            cache.set(key, "x" * 200)
+            time.sleep(0.01)
+
+        assert cache.get(keys[-1]) is not None
+        assert cache.get(keys[0]) is None
+        assert cache.stats()["evictions"] > 0
+
+
+def test_client_cache_skips_endpoint():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        name = uuid.uuid4().hex[:8]
+        client = LLMClient("key", f"http://cache-{name}.test/v1", model=f"model-{name}",
+                           cache=LLMResponseCache(cache_dir))
+        client._call_endpoint = endpoint = FakeEndpoint("cached")
+
+        assert client.generate(MESSAGES) == "cached"
+        assert client.generate(MESSAGES) == "cached"
+        assert client.generate(MESSAGES, use_cache=False) == "cached"
+        assert endpoint.calls == 2
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
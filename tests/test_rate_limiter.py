@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""测试跨进程令牌桶限流（请求数 / token 数配额与用量修正）"""
+import os
+import sys
+import types
+import tempfile
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.rate_limiter import TokenBucketRateLimiter, estimate_tokens
+
+
+def test_estimate_tokens():
+    messages = [{"role": "user", "content": "x" * 400},
+                {"role": "user", "content": [{"type": "text", "text": "y" * 40}, {"type": "image_url"}]}]
+    assert estimate_tokens(messages, 100) == 110 + 100
+
+
+def test_rate_limiter_request_bucket():
+    with tempfile.TemporaryDirectory() as state_dir:
+        limiter = TokenBucketRateLimiter("rpm", requests_per_minute=5, state_dir=state_dir)
+        for _ in range(5):
+            assert limiter.acquire(timeout=0.5) < 0.5
+        try:
+            limiter.acquire(timeout=0.5)
+            assert False, "expected TimeoutError"
+        except TimeoutError:
+            pass
+
+        # 同名同目录的实例共享配额（跨进程）
+        other = TokenBucketRateLimiter("rpm", requests_per_minute=5, state_dir=state_dir)
+        try:
+            other.acquire(timeout=0.5)
+            assert False, "expected TimeoutError"
+        except TimeoutError:
+            pass
+
+
+def test_rate_limiter_token_bucket_adjust():
+    with tempfile.TemporaryDirectory() as state_dir:
+        limiter = TokenBucketRateLimiter("tpm", tokens_per_minute=1000, state_dir=state_dir)
+        limiter.acquire(tokens=900)
+        try:
+            limiter.acquire(tokens=500, timeout=0.5)
+            assert False, "expected TimeoutError"
+        except TimeoutError:
+            pass
+        # 实际用量比估算少：归还后可以继续
+        limiter.adjust(-600)
+        assert limiter.acquire(tokens=500, timeout=0.5) < 0.5
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""测试相同在途请求的合并（SingleFlight）"""
+import os
+import sys
+import time
+import types
+import threading
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.singleflight import SingleFlight
+
+
+def test_singleflight_shares_one_call():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+    assert flight.shared == 4
+    assert flight.in_flight() == 0
+
+
+def test_singleflight_shares_errors_and_releases_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        flight.do("key", fail)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert flight.do("key", lambda: "again") == "again"
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
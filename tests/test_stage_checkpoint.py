@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""测试流水线阶段检查点（StageCheckpointStore）与 StageGraph 的断点续跑"""
+import os
+import sys
+import types
+import tempfile
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.pipeline import StageGraph
+from twitterchat.utils.stage_checkpoint import StageCheckpointStore
+
+
+def build_graph(checkpoints, calls, fail_stage=None, seed="v1"):
+    """core → (tweets, social) → merge，记录每个阶段实际执行的次数"""
+
+    def stage(name, func):
+        def run(results):
+            calls[name] = calls.get(name, 0) + 1
+            if name == fail_stage:
+                raise RuntimeError(f"{name} failed")
+            return func(results)
+        return run
+
+    graph = StageGraph(max_workers=4, checkpoints=checkpoints)
+    graph.add("core", stage("core", lambda r: f"core-{seed}"),
+              checkpoint_inputs=lambda r: {"seed": seed})
+    graph.add("tweets", stage("tweets", lambda r: r["core"] + "+tweets"), deps=["core"],
+              checkpoint_inputs=lambda r: {"core": r["core"]})
+    graph.add("social", stage("social", lambda r: r["core"] + "+social"), deps=["core"],
+              checkpoint_inputs=lambda r: {"core": r["core"]})
+    graph.add("merge", stage("merge", lambda r: [r["tweets"], r["social"]]), deps=["tweets", "social"],
+              checkpoint_inputs=lambda r: {"tweets": r["tweets"], "social": r["social"]})
+    return graph
+
+
+def test_checkpoints_resume_from_failed_stage():
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        checkpoints = StageCheckpointStore(checkpoint_dir)
+        calls = {}
+        try:
+            build_graph(checkpoints, calls, fail_stage="merge").run()
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+
+        calls.clear()
+        graph = build_graph(checkpoints, calls)
+        results = graph.run()
+
+        # 成功过的阶段从检查点恢复，只重跑失败的阶段
+        assert calls == {"merge": 1}
+        assert sorted(graph.restored) == ["core", "social", "tweets"]
+        assert results["merge"] == ["core-v1+tweets", "core-v1+social"]
+
+
+def test_checkpoints_rerun_downstream_when_input_changes():
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        checkpoints = StageCheckpointStore(checkpoint_dir)
+        build_graph(checkpoints, {}).run()
+
+        calls = {}
+        results = build_graph(checkpoints, calls, seed="v2").run()
+        assert calls == {"core": 1, "tweets": 1, "social": 1, "merge": 1}
+        assert results["merge"] == ["core-v2+tweets", "core-v2+social"]
+
+
+def test_forced_stage_reruns_without_touching_siblings():
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        checkpoints = StageCheckpointStore(checkpoint_dir)
+        build_graph(checkpoints, {}).run()
+
+        calls = {}
+        build_graph(checkpoints, calls).run(force=["tweets"])
+        # 输出未变，下游 merge 的 key 不变，仍从检查点恢复
+        assert calls == {"tweets": 1}
+
+
+def test_corrupt_checkpoint_is_a_miss():
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        checkpoints = StageCheckpointStore(checkpoint_dir)
+        key = checkpoints.make_key("core", {"seed": 1})
+        checkpoints.set("core", key, "output")
+        assert checkpoints.get("core", key) == "output"
+
+        with open(os.path.join(checkpoint_dir, "core", f"{key}.json"), 'w', encoding='utf-8') as f:
+            f.write('{"output": ')
+        assert checkpoints.get("core", key) is None
+        assert checkpoints.memoize("core", {"seed": 1}, lambda: "again") == "again"
+        assert checkpoints.invalidate("core") == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
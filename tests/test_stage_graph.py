@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""测试阶段依赖图（StageGraph）的并行执行、依赖检查与失败处理"""
+import os
+import sys
+import time
+import types
+
+# 以包名 twitterchat 导入仓库（不执行 ComfyUI 入口 __init__）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "twitterchat" not in sys.modules:
+    package = types.ModuleType("twitterchat")
+    package.__path__ = [REPO_DIR]
+    sys.modules["twitterchat"] = package
+
+from twitterchat.utils.pipeline import StageGraph
+
+
+def test_stage_graph_runs_independent_stages_concurrently():
+    graph = StageGraph(max_workers=2)
+    graph.add("a", lambda r: time.sleep(0.3) or "a")
+    graph.add("b", lambda r: time.sleep(0.3) or "b")
+    graph.add("c", lambda r: r["a"] + r["b"], deps=["a", "b"])
+
+    results = graph.run()
+
+    assert results["c"] == "ab"
+    assert graph.wall_time < 0.55
+    path, _ = graph.critical_path()
+    assert path[-1] == "c"
+
+
+def test_stage_graph_rejects_unknown_dependencies():
+    graph = StageGraph()
+    try:
+        graph.add("tweets", lambda r: None, deps=["core"])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_stage_graph_failure_raises_runtime_error():
+    calls = []
+
+    def fail(results):
+        raise RuntimeError("tweets failed")
+
+    graph = StageGraph(max_workers=2)
+    graph.add("core", lambda r: "core")
+    graph.add("tweets", fail, deps=["core"])
+    graph.add("merge", lambda r: calls.append("merge"), deps=["tweets"])
+
+    try:
+        graph.run()
+        assert False, "expected RuntimeError"
+    except RuntimeError as e:
+        assert "tweets" in str(e)
+    # 下游阶段不会执行
+    assert calls == []
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
+    print("全部测试通过")
@@ -0,0 +1,141 @@
+"""异步 LLM API 客户端（有界并发，用于批量扇出场景）"""
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+
+from .llm_client import LLMClient
+
+
+# 默认最大并发请求数（同一客户端内）
+DEFAULT_MAX_CONCURRENCY = 32
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """获取常驻后台事件循环（供同步包装调用）"""
+    global _background_loop
+
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-async-loop", daemon=True)
+            thread.start()
+            _background_loop = loop
+        return _background_loop
+
+
+def run_sync(coro):
+    """
+    在同步代码中运行协程（ComfyUI 节点等同步入口使用）
+
+    协程会提交到常驻后台事件循环执行，因此无论调用方线程是否已有
+    运行中的事件循环都可以安全调用。
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+    return future.result()
+
+
+class AsyncLLMClient:
+    """
+    异步 LLM 客户端（接口与 LLMClient.generate 一致，支持有界并发）
+
+    每个请求都交给同步 LLMClient.generate 执行，因此响应缓存、请求合并、限流、
+    熔断故障转移与对冲请求对异步调用同样生效；信号量限制同时在途的请求数，
+    阻塞调用在与并发上限等大的专用线程池中运行，不占用事件循环。
+    """
+
+    def __init__(self, api_key: str, api_base: str = "https://api.openai.com/v1", model: str = "gpt-4",
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 client: Optional[LLMClient] = None, **options):
+        """
+        参数:
+            api_key: API Key
+            api_base: API 基础 URL
+            model: 模型名称
+            max_concurrency: 最大同时在途请求数
+            client: 复用已有的 LLMClient（如 get_llm_client 的共享实例），此时忽略端点参数
+            **options: 创建 LLMClient 时的其他参数（如 cache、fallbacks、hedge_percentile）
+        """
+        self.max_concurrency = max_concurrency
+        self.owns_client = client is None
+        self.sync_client = client or LLMClient(api_key, api_base, model,
+                                               pool_size=options.pop("pool_size", max_concurrency), **options)
+        self.model = self.sync_client.model
+
+        # 信号量绑定事件循环，按循环分别创建
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix="llm-async")
+            return self._executor
+
+    async def generate(self, messages: list, temperature: float = 0.7, max_tokens: int = 300,
+                       timeout: int = 180, max_retries: int = 3, use_cache: bool = True,
+                       hedge: Optional[bool] = None) -> str:
+        """
+        异步调用 LLM 生成内容（参数同 LLMClient.generate，不支持流式）
+
+        返回:
+            生成的文本
+        """
+        call = functools.partial(self.sync_client.generate, messages, temperature=temperature,
+                                 max_tokens=max_tokens, timeout=timeout, max_retries=max_retries,
+                                 use_cache=use_cache, hedge=hedge)
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), call)
+
+    async def generate_many(self, requests: List[Union[list, Dict[str, Any]]],
+                            return_exceptions: bool = True) -> list:
+        """
+        并发执行多个生成请求（受 max_concurrency 限制）
+
+        参数:
+            requests: 请求列表，每项为 messages 列表，或 generate 的关键字参数字典
+            return_exceptions: True 时失败项以异常对象返回，否则首个失败直接抛出
+
+        返回:
+            与 requests 顺序一致的结果列表
+        """
+        tasks = []
+        for item in requests:
+            kwargs = item if isinstance(item, dict) else {"messages": item}
+            tasks.append(self.generate(**kwargs))
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    def generate_sync(self, messages: list, **kwargs) -> str:
+        """同步包装：供现有同步节点直接调用"""
+        return run_sync(self.generate(messages, **kwargs))
+
+    def generate_many_sync(self, requests: List[Union[list, Dict[str, Any]]],
+                           return_exceptions: bool = True) -> list:
+        """同步包装：并发执行多个请求并按顺序返回结果"""
+        return run_sync(self.generate_many(requests, return_exceptions=return_exceptions))
+
+    def close(self):
+        """关闭线程池（自行创建的同步客户端一并关闭）"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        if self.owns_client:
+            self.sync_client.close()
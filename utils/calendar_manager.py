@@ -1,20 +1,34 @@
 """Content calendar management tool"""
 import os
 import json
-from datetime import datetime
-from typing import Dict, Optional
-from .file_lock import file_lock
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Union
+from .calendar_store import (CalendarStore, JsonCalendarStore, build_monthly_strategy, copy_calendars,
+                             get_calendar_store)
+
+
+# Target content distribution (percent) requested in the calendar prompt
+CONTENT_TYPE_RATIOS = {
+    "lifestyle_mundane": 50,
+    "personal_emotion": 20,
+    "interaction_bait": 20,
+    "visual_showcase": 8,
+    "cta_conversion": 2,
+}
 
 
 class CalendarManager:
     """Content calendar manager"""
 
-    def __init__(self, calendar_dir: str = "calendars"):
+    def __init__(self, calendar_dir: str = "calendars", backend: Union[str, CalendarStore] = "json"):
         """
         Initialize calendar manager
 
         Args:
             calendar_dir: Calendar file storage directory
+            backend: Storage backend, "json" (one file per month), "sqlite"
+                     (<calendar_dir>/calendars.db) or a CalendarStore instance
         """
         self.calendar_dir = os.path.join(
             os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
@@ -24,9 +38,14 @@ class CalendarManager:
         # Ensure directory exists
         os.makedirs(self.calendar_dir, exist_ok=True)
 
+        if isinstance(backend, CalendarStore):
+            self.store = backend
+        else:
+            self.store = get_calendar_store(backend, self.calendar_dir)
+
     def get_calendar_path(self, persona_name: str, year_month: str) -> str:
         """
-        Get calendar file path
+        Get calendar file path (JSON file, also used as import/export format)
 
         Args:
             persona_name: Persona name
@@ -40,7 +59,7 @@ class CalendarManager:
 
     def calendar_exists(self, persona_name: str, year_month: str) -> bool:
         """
-        Check if calendar file exists
+        Check if calendar exists
 
         Args:
             persona_name: Persona name
@@ -49,40 +68,24 @@ class CalendarManager:
         Returns:
             Whether it exists
         """
-        path = self.get_calendar_path(persona_name, year_month)
-        return os.path.exists(path)
+        return self.store.exists(persona_name, year_month)
 
     def load_calendar(self, persona_name: str, year_month: str) -> Optional[Dict]:
         """
-        Load calendar file (with file lock protection)
+        Load calendar
 
         Args:
             persona_name: Persona name
             year_month: Year-month, format YYYY-MM
 
         Returns:
-            Calendar data, returns None if doesn't exist
+            Calendar data (a copy the caller may modify), returns None if doesn't exist
         """
-        path = self.get_calendar_path(persona_name, year_month)
-
-        if not os.path.exists(path):
-            return None
-
-        try:
-            # Protect read operation with file lock
-            with file_lock(path, timeout=5.0):
-                with open(path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except TimeoutError:
-            print(f"[CalendarManager] Calendar load timeout (file locked): {path}")
-            return None
-        except Exception as e:
-            print(f"[CalendarManager] Failed to load calendar: {e}")
-            return None
+        return self.store.load_month(persona_name, year_month)
 
     def save_calendar(self, persona_name: str, year_month: str, calendar_data: Dict) -> bool:
         """
-        Save calendar file (with file lock protection)
+        Save calendar (replaces the stored month)
 
         Args:
             persona_name: Persona name
@@ -92,20 +95,12 @@ class CalendarManager:
         Returns:
             Whether save succeeded
         """
-        path = self.get_calendar_path(persona_name, year_month)
+        return self.store.save_month(persona_name, year_month, calendar_data)
 
-        try:
-            # Protect write operation with file lock
-            with file_lock(path, timeout=10.0):
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(calendar_data, f, ensure_ascii=False, indent=2)
-            return True
-        except TimeoutError:
-            print(f"[CalendarManager] Calendar save timeout (file locked): {path}")
-            return False
-        except Exception as e:
-            print(f"[CalendarManager] Failed to save calendar: {e}")
-            return False
+    @staticmethod
+    def clear_cache():
+        """Drop all cached JSON calendars (next load re-reads from disk)"""
+        JsonCalendarStore.clear_cache()
 
     def get_today_plan(self, persona_name: str, date: Optional[str] = None) -> Optional[Dict]:
         """
@@ -121,15 +116,264 @@ class CalendarManager:
         if date is None:
             date = datetime.now().strftime("%Y-%m-%d")
 
-        year_month = date[:7]  # YYYY-MM
+        return self.store.get_day(persona_name, date)
+
+    def get_plans_for_date(self, date: Optional[str] = None,
+                           persona_names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Get operation plans of all personas for a date in one query
+
+        Args:
+            date: Date, format YYYY-MM-DD, defaults to today
+            persona_names: Only these personas (default: every persona with a calendar)
+
+        Returns:
+            {persona_name: daily plan}
+        """
+        if date is None:
+            date = datetime.now().strftime("%Y-%m-%d")
+
+        return self.store.get_plans_for_date(date, persona_names)
+
+    def import_json_calendars(self, persona_name: Optional[str] = None, year_month: Optional[str] = None) -> int:
+        """
+        Import `{persona}_{YYYY-MM}.json` files from the calendar directory into the backend
+
+        Args:
+            persona_name: Only import this persona
+            year_month: Only import this month
+
+        Returns:
+            Number of months imported
+        """
+        if isinstance(self.store, JsonCalendarStore) and self.store.calendar_dir == self.calendar_dir:
+            return 0
+        return copy_calendars(JsonCalendarStore(self.calendar_dir), self.store, persona_name, year_month)
+
+    def export_json_calendars(self, persona_name: Optional[str] = None, year_month: Optional[str] = None) -> int:
+        """
+        Export calendars from the backend to `{persona}_{YYYY-MM}.json` files in the calendar directory
+
+        Args:
+            persona_name: Only export this persona
+            year_month: Only export this month
+
+        Returns:
+            Number of months exported
+        """
+        if isinstance(self.store, JsonCalendarStore) and self.store.calendar_dir == self.calendar_dir:
+            return 0
+        return copy_calendars(self.store, JsonCalendarStore(self.calendar_dir), persona_name, year_month)
+
+    @staticmethod
+    def window_dates(start_date: str, days: int) -> List[str]:
+        """
+        Dates of a planning window (may cross month boundaries)
+
+        Args:
+            start_date: First date, format YYYY-MM-DD
+            days: Window length
+
+        Returns:
+            Dates in order, format YYYY-MM-DD
+        """
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(max(days, 1))]
+
+    @classmethod
+    def planning_window(cls, year_month: str, days: int, start_date: Optional[str] = None) -> List[str]:
+        """
+        Dates a calendar request plans: from start_date (may run into the following months),
+        or from the month beginning clipped to the month end
+
+        Args:
+            year_month: Year-month, format YYYY-MM (used when start_date is None)
+            days: Window length
+            start_date: First date, format YYYY-MM-DD
+
+        Returns:
+            Dates in order, format YYYY-MM-DD
+        """
+        if start_date:
+            return cls.window_dates(start_date, days)
+        return [date for date in cls.window_dates(f"{year_month}-01", days) if date.startswith(year_month)]
+
+    @staticmethod
+    def split_by_month(calendar_dict: Dict) -> Dict[str, Dict]:
+        """
+        Partition {date: plan} by month
+
+        Returns:
+            {YYYY-MM: {date: plan}}
+        """
+        partitions = {}
+        for date, plan in calendar_dict.items():
+            partitions.setdefault(date[:7], {})[date] = plan
+        return partitions
+
+    def load_window(self, persona_name: str, start_date: str, days: int) -> Dict:
+        """
+        Planned days of a window, read from every month partition it touches
+
+        Returns:
+            {date: plan} for the planned dates in the window
+        """
+        dates = self.window_dates(start_date, days)
+        plans = {}
+        for year_month in sorted({date[:7] for date in dates}):
+            calendar_data = self.store.load_month(persona_name, year_month)
+            if calendar_data:
+                month_plans = calendar_data.get("calendar", {})
+                plans.update((date, month_plans[date]) for date in dates if date in month_plans)
+        return plans
+
+    def find_missing_dates(self, persona_name: str, start_date: str, days: int) -> List[str]:
+        """
+        Find dates without a plan in a window
+
+        Args:
+            persona_name: Persona name
+            start_date: First date of the window, format YYYY-MM-DD
+            days: Window length (may cross into following months)
+
+        Returns:
+            Missing dates in order
+        """
+        planned = self.load_window(persona_name, start_date, days)
+        return [date for date in self.window_dates(start_date, days) if date not in planned]
+
+    def save_calendar_days(self, persona_name: str, calendar_dict: Dict, overwrite: bool = False) -> List[str]:
+        """
+        Save planned days into their month partitions
 
-        calendar = self.load_calendar(persona_name, year_month)
-        if calendar is None:
-            return None
+        Each month is merged with what is already stored (days outside calendar_dict are kept)
+        and its monthly strategy recomputed in one atomic store operation, so concurrent runs
+        filling different days of a month don't lose each other's days; months that don't
+        exist yet are created.
 
-        return calendar.get("calendar", {}).get(date)
+        Args:
+            persona_name: Persona name
+            calendar_dict: {date: plan}, may span several months
+            overwrite: Replace existing plans on the same dates (otherwise only fill gaps)
+
+        Returns:
+            Saved months (YYYY-MM)
 
-    def generate_calendar_prompt(self, persona: Dict, year_month: str, days_to_generate: int = 15, start_date: str = None) -> str:
+        Raises:
+            RuntimeError: A month partition could not be saved
+        """
+        saved = []
+        for year_month, days in sorted(self.split_by_month(calendar_dict).items()):
+            if not self.store.upsert_days(persona_name, year_month, days, overwrite=overwrite):
+                raise RuntimeError(f"Failed to save calendar: {persona_name} {year_month}")
+            saved.append(year_month)
+        return saved
+
+    @staticmethod
+    def build_monthly_strategy(calendar_dict: Dict) -> Dict:
+        """
+        Compute content distribution of a calendar
+
+        Args:
+            calendar_dict: {date: plan}
+
+        Returns:
+            {"content_ratio": {topic_type: percent}, "total_days": n}
+        """
+        return build_monthly_strategy(calendar_dict)
+
+    @staticmethod
+    def summarize_plans(calendar_dict: Dict) -> str:
+        """One line per planned day (date, weekday, topic type, theme), used as continuity context"""
+        lines = []
+        for date, plan in sorted(calendar_dict.items()):
+            line = f"- {date} ({plan.get('weekday', '')}): {plan.get('topic_type', '')}"
+            if plan.get("theme"):
+                line += f" - {plan['theme']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    def split_into_shards(dates: List[str], shard_days: int = 7) -> List[List[str]]:
+        """Split window dates into consecutive shards of shard_days (the last one may be shorter)"""
+        return [dates[i:i + shard_days] for i in range(0, len(dates), max(shard_days, 1))]
+
+    @staticmethod
+    def plan_topic_types(dates: List[str], previous: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Assign a topic type to every date following CONTENT_TYPE_RATIOS
+
+        Uses smooth weighted round-robin so each type is spread evenly over the window,
+        never placing the same type on 3 consecutive days.
+
+        Args:
+            dates: Window dates in order
+            previous: Topic types of the days right before the window (oldest first)
+
+        Returns:
+            {date: topic_type}
+        """
+        total = sum(CONTENT_TYPE_RATIOS.values())
+        current = {topic: 0 for topic in CONTENT_TYPE_RATIOS}
+        recent = list(previous or [])[-2:]
+        plan = {}
+
+        for date in dates:
+            for topic, weight in CONTENT_TYPE_RATIOS.items():
+                current[topic] += weight
+            candidates = sorted(current, key=lambda topic: current[topic], reverse=True)
+            if len(recent) == 2 and recent[0] == recent[1]:
+                candidates = [topic for topic in candidates if topic != recent[0]]
+            topic = candidates[0]
+            current[topic] -= total
+            plan[date] = topic
+            recent = (recent + [topic])[-2:]
+        return plan
+
+    @staticmethod
+    def reconcile_topic_types(calendar_dict: Dict, topic_plan: Dict[str, str]) -> List[str]:
+        """
+        Realign topic types of independently generated shards with the window plan
+
+        A day keeps its topic type unless the type is invalid, its type is over-represented
+        while the planned type is under-represented, or it makes 3 consecutive days of one type;
+        such days are switched to the planned type.
+
+        Args:
+            calendar_dict: {date: plan} (modified in place)
+            topic_plan: {date: topic_type} from plan_topic_types
+
+        Returns:
+            Adjusted dates
+        """
+        dates = sorted(date for date in calendar_dict if date in topic_plan)
+        target = Counter(topic_plan[date] for date in dates)
+        actual = Counter(calendar_dict[date].get("topic_type") for date in dates)
+        adjusted = []
+
+        def realign(date):
+            current, planned = calendar_dict[date].get("topic_type"), topic_plan[date]
+            actual[current] -= 1
+            actual[planned] += 1
+            calendar_dict[date]["topic_type"] = planned
+            adjusted.append(date)
+
+        for date in dates:
+            current, planned = calendar_dict[date].get("topic_type"), topic_plan[date]
+            if current == planned:
+                continue
+            if current not in CONTENT_TYPE_RATIOS or (actual[current] > target[current] and actual[planned] < target[planned]):
+                realign(date)
+
+        for i in range(2, len(dates)):
+            run = {calendar_dict[date].get("topic_type") for date in dates[i - 2:i + 1]}
+            if len(run) == 1 and calendar_dict[dates[i]].get("topic_type") != topic_plan[dates[i]]:
+                realign(dates[i])
+
+        return adjusted
+
+    def generate_calendar_prompt(self, persona: Dict, year_month: str, days_to_generate: int = 15, start_date: str = None,
+                                 existing_plans: Optional[Dict] = None, topic_plan: Optional[Dict[str, str]] = None) -> str:
         """
         Generate LLM prompt for calendar generation
 
@@ -138,6 +382,10 @@ class CalendarManager:
             year_month: Year-month, format YYYY-MM
             days_to_generate: Number of days to generate, default 15
             start_date: Start date for generation (format YYYY-MM-DD). If None, starts from month beginning
+            existing_plans: Already planned days {date: plan}; listed in the prompt so new days continue
+                            the rhythm and content distribution instead of repeating it
+            topic_plan: Topic type assigned to each date {date: topic_type} (used when the window
+                        is generated in parallel shards, so the merged calendar keeps the distribution)
 
         Returns:
             LLM prompt
@@ -149,24 +397,9 @@ class CalendarManager:
         description = data.get("description", "")
         personality = data.get("personality", "")
 
-        # Get month and days
-        year, month = year_month.split("-")
-
-        # Calculate days in month
-        import calendar
-        _, days_in_month = calendar.monthrange(int(year), int(month))
-
-        # Determine start day
-        if start_date:
-            # Use provided start date
-            start_day = int(start_date.split("-")[2])
-        else:
-            # Default to month beginning
-            start_day = 1
-
-        # Calculate how many days can be generated from start_day
-        remaining_days_in_month = days_in_month - start_day + 1
-        actual_days = min(days_to_generate, remaining_days_in_month)
+        dates = self.planning_window(year_month, days_to_generate, start_date)
+        actual_days = len(dates)
+        first_date, last_date = dates[0], dates[-1]
 
         # ⭐ Get holidays based on persona's country code (Issue #4 fix)
         import holidays
@@ -177,15 +410,15 @@ class CalendarManager:
         country_code = location.get("country_code", "US")
 
         # Use corresponding country's holidays
+        years = sorted({int(date[:4]) for date in dates})
         try:
-            country_holidays = holidays.country_holidays(country_code, years=int(year))
+            country_holidays = holidays.country_holidays(country_code, years=years)
         except Exception:
             # If country code invalid, fallback to US
-            country_holidays = holidays.country_holidays("US", years=int(year))
+            country_holidays = holidays.country_holidays("US", years=years)
 
         month_holidays = []
-        for i in range(start_day, start_day + actual_days):
-            date = f"{year_month}-{i:02d}"
+        for date in dates:
             date_obj = datetime.strptime(date, "%Y-%m-%d").date()
             if date_obj in country_holidays:
                 holiday_name = country_holidays.get(date_obj)
@@ -193,11 +426,29 @@ class CalendarManager:
 
         holidays_info = "\n".join(month_holidays) if month_holidays else "No special holidays"
 
-        # Format year-month display
-        year_month_display = f"{month}/{year}"
+        existing_info = ""
+        if existing_plans:
+            existing_info = (
+                "\nAlready planned days (keep continuity with them, don't repeat their themes, "
+                "and balance the content distribution across them and the new days):\n"
+                f"{self.summarize_plans(existing_plans)}\n"
+            )
+
+        topic_info = ""
+        if topic_plan:
+            assigned = "\n".join(
+                f"- {date} ({datetime.strptime(date, '%Y-%m-%d').strftime('%A')}): {topic}"
+                for date, topic in sorted(topic_plan.items())
+            )
+            topic_info = (
+                "\nAssigned topic types (other parts of this calendar are planned separately; "
+                "use exactly these topic_type values so the whole calendar keeps the distribution below):\n"
+                f"{assigned}\n"
+            )
 
-        # Calculate end date
-        end_day = start_day + actual_days - 1
+        # Format year-month display
+        months = sorted({date[:7] for date in dates})
+        year_month_display = " - ".join(f"{m[5:]}/{m[:4]}" for m in months)
 
         prompt = f"""You are a professional social media operations expert planning {name}'s tweet calendar for {year_month_display}.
 
@@ -213,9 +464,9 @@ Operation Goals:
 
 Special dates in this period:
 {holidays_info}
-
+{existing_info}{topic_info}
 Requirements:
-1. Plan {actual_days} days from {year_month}-{start_day:02d} to {year_month}-{end_day:02d}
+1. Plan {actual_days} days from {first_date} to {last_date}
 2. Design weekly rhythm (Monday to Sunday content types) based on persona traits
 3. Special themes for special dates (holidays, anniversaries)
 4. Diversify content types, avoid 3 consecutive days of same type
@@ -249,7 +500,7 @@ Requirements:
 
 Output format (strict JSON, no other explanatory text):
 {{
-  "{year_month}-{start_day:02d}": {{
+  "{first_date}": {{
     "weekday": "Monday",
     "topic_type": "lifestyle_mundane",  // Must be one of the above types: lifestyle_mundane/personal_emotion/interaction_bait/visual_showcase/cta_conversion
     "tweet_format": "standard",  // standard/thread/poll/grwm
@@ -262,7 +513,7 @@ Output format (strict JSON, no other explanatory text):
     "special_event": null,
     "strategic_flaw": null  // Optional: sleep_deprived/clumsy/tech_inept/forgetful
   }},
-  "{year_month}-{end_day:02d}": {{
+  "{last_date}": {{
     "weekday": "...",
     "topic_type": "...",
     "tweet_format": "...",
@@ -363,27 +614,12 @@ Please output JSON directly, don't include any ```json markers or other explanat
                 )
 
         # Build complete data structure
-        # Calculate content distribution
-        topic_counts = {}
-        for date_data in calendar_dict.values():
-            topic_type = date_data.get("topic_type", "daily sharing")
-            topic_counts[topic_type] = topic_counts.get(topic_type, 0) + 1
-
-        total = len(calendar_dict)
-        content_ratio = {
-            topic: round(count / total * 100, 1)
-            for topic, count in topic_counts.items()
-        }
-
         calendar_data = {
             "persona_name": persona_name,
             "month": year_month,
             "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "calendar": calendar_dict,
-            "monthly_strategy": {
-                "content_ratio": content_ratio,
-                "total_days": total
-            }
+            "monthly_strategy": self.build_monthly_strategy(calendar_dict)
         }
 
         return calendar_data
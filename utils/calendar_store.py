@@ -0,0 +1,573 @@
+"""Calendar storage backends (per-month JSON files, SQLite with per-day rows)"""
+import os
+import re
+import copy
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from .file_lock import file_lock
+
+
+# {persona}_{YYYY-MM}.json
+_CALENDAR_FILE_RE = re.compile(r"^(.+)_(\d{4}-\d{2})\.json$")
+
+# Process-level cache of parsed calendars: path -> ((mtime_ns, size), calendar data).
+# Entries are validated against the file's mtime/size on every read, so the file lock
+# and JSON parse are only paid when the file changed (e.g. written by another process).
+_calendar_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+_calendar_cache_lock = threading.Lock()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def build_monthly_strategy(calendar_dict: Dict) -> Dict:
+    """
+    Compute content distribution of a calendar
+
+    Args:
+        calendar_dict: {date: plan}
+
+    Returns:
+        {"content_ratio": {topic_type: percent}, "total_days": n}
+    """
+    topic_counts = {}
+    for date_data in calendar_dict.values():
+        topic_type = date_data.get("topic_type", "daily sharing")
+        topic_counts[topic_type] = topic_counts.get(topic_type, 0) + 1
+
+    total = len(calendar_dict)
+    content_ratio = {
+        topic: round(count / total * 100, 1)
+        for topic, count in topic_counts.items()
+    }
+
+    return {
+        "content_ratio": content_ratio,
+        "total_days": total
+    }
+
+
+def new_month(persona_name: str, year_month: str) -> Dict:
+    """Empty calendar month"""
+    return {
+        "persona_name": persona_name,
+        "month": year_month,
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "calendar": {},
+    }
+
+
+def merge_month_days(calendar_data: Dict, new_days: Dict, overwrite: bool = False) -> Dict:
+    """
+    Merge days into a calendar month and recompute its monthly strategy
+
+    Existing days are kept unless overwrite is set; days of other months are ignored.
+
+    Args:
+        calendar_data: Calendar month (modified in place)
+        new_days: {date: plan}
+        overwrite: Replace existing plans on the same dates
+
+    Returns:
+        Merged calendar data
+    """
+    calendar_dict = calendar_data.setdefault("calendar", {})
+
+    for date, plan in new_days.items():
+        if date in calendar_dict and not overwrite:
+            continue
+        if not date.startswith(calendar_data.get("month", date[:7])):
+            continue
+        calendar_dict[date] = plan
+
+    calendar_data["calendar"] = dict(sorted(calendar_dict.items()))
+    strategy = calendar_data.get("monthly_strategy") or {}
+    strategy.update(build_monthly_strategy(calendar_data["calendar"]))
+    calendar_data["monthly_strategy"] = strategy
+    calendar_data["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return calendar_data
+
+
+class CalendarStore:
+    """
+    Calendar storage backend interface
+
+    A calendar month is the structure produced by CalendarManager.parse_calendar_response:
+    {"persona_name", "month", "generated_at", "calendar": {date: plan}, "monthly_strategy"}.
+    Every method returns data the caller may modify.
+    """
+
+    name = "base"
+
+    def exists(self, persona_name: str, year_month: str) -> bool:
+        """Whether a calendar is stored for the persona and month"""
+        raise NotImplementedError
+
+    def load_month(self, persona_name: str, year_month: str) -> Optional[Dict]:
+        """Load a calendar month, None if it doesn't exist"""
+        raise NotImplementedError
+
+    def save_month(self, persona_name: str, year_month: str, calendar_data: Dict) -> bool:
+        """Replace a calendar month, returns whether save succeeded"""
+        raise NotImplementedError
+
+    def upsert_days(self, persona_name: str, year_month: str, days: Dict, overwrite: bool = False) -> bool:
+        """
+        Merge days into a calendar month (created if missing) and recompute its monthly strategy
+
+        Backends do the read-merge-write atomically, so concurrent writers adding different
+        days to the same month don't lose each other's days.
+
+        Args:
+            persona_name: Persona name
+            year_month: Month the days belong to (days of other months are ignored)
+            days: {date: plan}
+            overwrite: Replace existing plans on the same dates (otherwise only fill gaps)
+
+        Returns:
+            Whether save succeeded
+        """
+        calendar_data = self.load_month(persona_name, year_month) or new_month(persona_name, year_month)
+        merge_month_days(calendar_data, days, overwrite=overwrite)
+        return self.save_month(persona_name, year_month, calendar_data)
+
+    def get_day(self, persona_name: str, date: str) -> Optional[Dict]:
+        """Plan of one day (YYYY-MM-DD), None if it doesn't exist"""
+        calendar_data = self.load_month(persona_name, date[:7])
+        if calendar_data is None:
+            return None
+        return calendar_data.get("calendar", {}).get(date)
+
+    def get_plans_for_date(self, date: str, persona_names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Plans of all personas (or the given ones) for one date
+
+        Returns:
+            {persona_name: plan}, personas without a plan for the date are omitted
+        """
+        raise NotImplementedError
+
+    def list_months(self, persona_name: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Stored (persona_name, year_month) pairs, sorted"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release backend resources"""
+
+
+class JsonCalendarStore(CalendarStore):
+    """
+    One `{persona}_{YYYY-MM}.json` file per month
+
+    Reads and writes take the file's `.lock` lock; parsed files are cached in-process
+    and re-read only when their mtime/size change.
+    """
+
+    name = "json"
+
+    def __init__(self, calendar_dir: str):
+        """
+        Args:
+            calendar_dir: Calendar file storage directory
+        """
+        self.calendar_dir = calendar_dir
+        os.makedirs(calendar_dir, exist_ok=True)
+
+    def get_path(self, persona_name: str, year_month: str) -> str:
+        return os.path.join(self.calendar_dir, f"{persona_name}_{year_month}.json")
+
+    def exists(self, persona_name: str, year_month: str) -> bool:
+        return os.path.exists(self.get_path(persona_name, year_month))
+
+    def load_month(self, persona_name: str, year_month: str) -> Optional[Dict]:
+        calendar_data = self.load_shared(persona_name, year_month)
+        return copy.deepcopy(calendar_data) if calendar_data is not None else None
+
+    def load_shared(self, persona_name: str, year_month: str) -> Optional[Dict]:
+        """Load calendar through the cache; the returned object is shared and must not be modified"""
+        path = self.get_path(persona_name, year_month)
+
+        signature = _file_signature(path)
+        if signature is None:
+            with _calendar_cache_lock:
+                _calendar_cache.pop(path, None)
+            return None
+
+        with _calendar_cache_lock:
+            cached = _calendar_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        try:
+            # Protect read operation with file lock
+            with file_lock(path, timeout=5.0):
+                return self._read(path)
+        except TimeoutError:
+            print(f"[CalendarStore] Calendar load timeout (file locked): {path}")
+            return None
+        except Exception as e:
+            print(f"[CalendarStore] Failed to load calendar: {e}")
+            return None
+
+    def save_month(self, persona_name: str, year_month: str, calendar_data: Dict) -> bool:
+        path = self.get_path(persona_name, year_month)
+
+        try:
+            # Protect write operation with file lock
+            with file_lock(path, timeout=10.0):
+                self._write(path, calendar_data)
+            return True
+        except TimeoutError:
+            print(f"[CalendarStore] Calendar save timeout (file locked): {path}")
+            return False
+        except Exception as e:
+            print(f"[CalendarStore] Failed to save calendar: {e}")
+            with _calendar_cache_lock:
+                _calendar_cache.pop(path, None)
+            return False
+
+    def upsert_days(self, persona_name: str, year_month: str, days: Dict, overwrite: bool = False) -> bool:
+        path = self.get_path(persona_name, year_month)
+
+        try:
+            # Hold the lock across read-merge-write so concurrent writers don't drop each other's days
+            with file_lock(path, timeout=10.0):
+                calendar_data = self._read(path) if os.path.exists(path) else None
+                calendar_data = copy.deepcopy(calendar_data) if calendar_data else new_month(persona_name, year_month)
+                merge_month_days(calendar_data, days, overwrite=overwrite)
+                self._write(path, calendar_data)
+            return True
+        except TimeoutError:
+            print(f"[CalendarStore] Calendar save timeout (file locked): {path}")
+            return False
+        except Exception as e:
+            print(f"[CalendarStore] Failed to save calendar: {e}")
+            with _calendar_cache_lock:
+                _calendar_cache.pop(path, None)
+            return False
+
+    @staticmethod
+    def _read(path: str) -> Dict:
+        """Parse a calendar file and cache it (caller holds the file lock)"""
+        signature = _file_signature(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            calendar_data = json.load(f)
+        with _calendar_cache_lock:
+            _calendar_cache[path] = (signature, calendar_data)
+        return calendar_data
+
+    @staticmethod
+    def _write(path: str, calendar_data: Dict):
+        """Write a calendar file and cache it (caller holds the file lock)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(calendar_data, f, ensure_ascii=False, indent=2)
+        signature = _file_signature(path)
+        with _calendar_cache_lock:
+            _calendar_cache[path] = (signature, copy.deepcopy(calendar_data))
+
+    def get_day(self, persona_name: str, date: str) -> Optional[Dict]:
+        calendar_data = self.load_shared(persona_name, date[:7])
+        if calendar_data is None:
+            return None
+        # Copy only the requested day; callers add fields to the plan
+        return copy.deepcopy(calendar_data.get("calendar", {}).get(date))
+
+    def get_plans_for_date(self, date: str, persona_names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        if persona_names is None:
+            persona_names = [persona for persona, month in self.list_months() if month == date[:7]]
+        plans = {}
+        for persona_name in persona_names:
+            plan = self.get_day(persona_name, date)
+            if plan is not None:
+                plans[persona_name] = plan
+        return plans
+
+    def list_months(self, persona_name: Optional[str] = None) -> List[Tuple[str, str]]:
+        months = []
+        for filename in os.listdir(self.calendar_dir):
+            match = _CALENDAR_FILE_RE.match(filename)
+            if match and (persona_name is None or match.group(1) == persona_name):
+                months.append((match.group(1), match.group(2)))
+        return sorted(months)
+
+    @staticmethod
+    def clear_cache():
+        """Drop all cached calendars (next load re-reads from disk)"""
+        with _calendar_cache_lock:
+            _calendar_cache.clear()
+
+
+class SQLiteCalendarStore(CalendarStore):
+    """
+    SQLite database in WAL mode with one row per (persona, date)
+
+    Tables:
+        calendar_months: (persona, month) -> month-level fields (generated_at, monthly_strategy, ...)
+        calendar_days:   (persona, date)  -> plan JSON, indexed by date and by (persona, month)
+
+    Saving a month upserts its day rows and removes days no longer in it, all in one
+    transaction; upsert_days only writes the given days and recomputes the month fields
+    inside a BEGIN IMMEDIATE transaction. Readers are never blocked by writers. Each thread
+    uses its own connection.
+    """
+
+    name = "sqlite"
+
+    # SQLite host parameter limit is 999 on old builds
+    _IN_CHUNK = 500
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS calendar_months (
+            persona TEXT NOT NULL,
+            month TEXT NOT NULL,
+            meta TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (persona, month)
+        );
+        CREATE TABLE IF NOT EXISTS calendar_days (
+            persona TEXT NOT NULL,
+            date TEXT NOT NULL,
+            month TEXT NOT NULL,
+            plan TEXT NOT NULL,
+            PRIMARY KEY (persona, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_calendar_days_date ON calendar_days (date);
+        CREATE INDEX IF NOT EXISTS idx_calendar_days_month ON calendar_days (persona, month);
+    """
+
+    def __init__(self, db_path: str, timeout: float = 10.0):
+        """
+        Args:
+            db_path: Database file path
+            timeout: Seconds to wait for another writer's lock
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(self._SCHEMA)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def exists(self, persona_name: str, year_month: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM calendar_months WHERE persona = ? AND month = ?",
+            (persona_name, year_month)
+        ).fetchone()
+        return row is not None
+
+    def load_month(self, persona_name: str, year_month: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT meta FROM calendar_months WHERE persona = ? AND month = ?",
+                (persona_name, year_month)
+            ).fetchone()
+            if row is None:
+                return None
+            days = conn.execute(
+                "SELECT date, plan FROM calendar_days WHERE persona = ? AND month = ? ORDER BY date",
+                (persona_name, year_month)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[CalendarStore] Failed to load calendar: {e}")
+            return None
+
+        meta = json.loads(row[0])
+        calendar_data = {key: meta[key] for key in ("persona_name", "month", "generated_at") if key in meta}
+        calendar_data["calendar"] = {date: json.loads(plan) for date, plan in days}
+        calendar_data.update((key, value) for key, value in meta.items() if key not in calendar_data)
+        return calendar_data
+
+    def save_month(self, persona_name: str, year_month: str, calendar_data: Dict) -> bool:
+        days = calendar_data.get("calendar", {})
+        meta = {key: value for key, value in calendar_data.items() if key != "calendar"}
+        conn = self._connect()
+
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO calendar_months (persona, month, meta, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (persona, month) DO UPDATE SET meta = excluded.meta, updated_at = excluded.updated_at",
+                    (persona_name, year_month, json.dumps(meta, ensure_ascii=False), time.time())
+                )
+                conn.execute(
+                    f"DELETE FROM calendar_days WHERE persona = ? AND month = ? "
+                    f"AND date NOT IN ({', '.join('?' * len(days))})",
+                    (persona_name, year_month, *days)
+                )
+                conn.executemany(
+                    "INSERT INTO calendar_days (persona, date, month, plan) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (persona, date) DO UPDATE SET month = excluded.month, plan = excluded.plan",
+                    [(persona_name, date, year_month, json.dumps(plan, ensure_ascii=False))
+                     for date, plan in days.items()]
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"[CalendarStore] Failed to save calendar: {e}")
+            return False
+
+    def upsert_days(self, persona_name: str, year_month: str, days: Dict, overwrite: bool = False) -> bool:
+        days = {date: plan for date, plan in days.items() if date.startswith(year_month)}
+        conflict = "DO UPDATE SET plan = excluded.plan" if overwrite else "DO NOTHING"
+        conn = self._connect()
+
+        try:
+            # Take the write lock up front: the month fields are recomputed from the rows this
+            # transaction sees, so no other writer may add days in between
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    f"INSERT INTO calendar_days (persona, date, month, plan) VALUES (?, ?, ?, ?) "
+                    f"ON CONFLICT (persona, date) {conflict}",
+                    [(persona_name, date, year_month, json.dumps(plan, ensure_ascii=False))
+                     for date, plan in days.items()]
+                )
+                row = conn.execute(
+                    "SELECT meta FROM calendar_months WHERE persona = ? AND month = ?",
+                    (persona_name, year_month)
+                ).fetchone()
+                if row is not None:
+                    meta = json.loads(row[0])
+                else:
+                    meta = {key: value for key, value in new_month(persona_name, year_month).items()
+                            if key != "calendar"}
+                plans = conn.execute(
+                    "SELECT date, plan FROM calendar_days WHERE persona = ? AND month = ?",
+                    (persona_name, year_month)
+                ).fetchall()
+                strategy = meta.get("monthly_strategy") or {}
+                strategy.update(build_monthly_strategy({date: json.loads(plan) for date, plan in plans}))
+                meta["monthly_strategy"] = strategy
+                meta["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                conn.execute(
+                    "INSERT INTO calendar_months (persona, month, meta, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (persona, month) DO UPDATE SET meta = excluded.meta, updated_at = excluded.updated_at",
+                    (persona_name, year_month, json.dumps(meta, ensure_ascii=False), time.time())
+                )
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"[CalendarStore] Failed to save calendar: {e}")
+            return False
+
+    def get_day(self, persona_name: str, date: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT plan FROM calendar_days WHERE persona = ? AND date = ?",
+            (persona_name, date)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def get_plans_for_date(self, date: str, persona_names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        conn = self._connect()
+        if persona_names is None:
+            rows = conn.execute("SELECT persona, plan FROM calendar_days WHERE date = ?", (date,)).fetchall()
+        else:
+            persona_names = list(persona_names)
+            rows = []
+            for start in range(0, len(persona_names), self._IN_CHUNK):
+                chunk = persona_names[start:start + self._IN_CHUNK]
+                rows += conn.execute(
+                    f"SELECT persona, plan FROM calendar_days WHERE date = ? "
+                    f"AND persona IN ({', '.join('?' * len(chunk))})",
+                    (date, *chunk)
+                ).fetchall()
+        return {persona: json.loads(plan) for persona, plan in rows}
+
+    def list_months(self, persona_name: Optional[str] = None) -> List[Tuple[str, str]]:
+        if persona_name is None:
+            rows = self._connect().execute(
+                "SELECT persona, month FROM calendar_months ORDER BY persona, month").fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT persona, month FROM calendar_months WHERE persona = ? ORDER BY month",
+                (persona_name,)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def copy_calendars(source: CalendarStore, target: CalendarStore, persona_name: Optional[str] = None,
+                   year_month: Optional[str] = None) -> int:
+    """
+    Copy calendar months between backends (JSON import/export)
+
+    Args:
+        source: Backend to read from
+        target: Backend to write to (existing months are replaced)
+        persona_name: Only copy this persona
+        year_month: Only copy this month
+
+    Returns:
+        Number of months copied
+    """
+    copied = 0
+    for persona, month in source.list_months(persona_name):
+        if year_month is not None and month != year_month:
+            continue
+        calendar_data = source.load_month(persona, month)
+        if calendar_data is not None and target.save_month(persona, month, calendar_data):
+            copied += 1
+    return copied
+
+
+CALENDAR_BACKENDS = ("json", "sqlite")
+
+_stores: Dict[Tuple[str, str], CalendarStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_calendar_store(backend: str, calendar_dir: str) -> CalendarStore:
+    """
+    Process-level shared store for a backend and calendar directory
+
+    Args:
+        backend: "json" or "sqlite" (database at <calendar_dir>/calendars.db)
+        calendar_dir: Calendar storage directory
+    """
+    if backend not in CALENDAR_BACKENDS:
+        raise ValueError(f"Unknown calendar backend: {backend} (expected one of {', '.join(CALENDAR_BACKENDS)})")
+    key = (backend, os.path.abspath(calendar_dir))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == "sqlite":
+                store = SQLiteCalendarStore(os.path.join(calendar_dir, "calendars.db"))
+            else:
+                store = JsonCalendarStore(calendar_dir)
+            _stores[key] = store
+        return store
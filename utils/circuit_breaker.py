@@ -0,0 +1,175 @@
+"""熔断器（按错误率 / 慢调用率熔断，半开探测后恢复）"""
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class CircuitBreaker:
+    """
+    滑动窗口熔断器
+
+    - closed: 正常放行，记录最近 window_size 次调用结果
+    - open: 错误率或慢调用率超过阈值后熔断，open_timeout 秒内拒绝请求
+    - half_open: 熔断到期后放行少量探测请求，连续成功则关闭，任一失败重新熔断
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_threshold: float = 60.0,
+        slow_call_rate_threshold: float = 0.8,
+        open_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        half_open_successes: int = 2
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            name: 名称（用于日志与状态展示）
+            window_size: 滑动窗口大小（最近 N 次调用）
+            min_calls: 窗口内至少多少次调用后才计算比率
+            failure_rate_threshold: 错误率阈值（0-1）
+            slow_call_threshold: 超过该耗时（秒）视为慢调用
+            slow_call_rate_threshold: 慢调用率阈值（0-1）
+            open_timeout: 熔断持续时间（秒），到期进入半开
+            half_open_max_calls: 半开状态下同时放行的探测请求数
+            half_open_successes: 半开状态下需要连续成功的次数
+        """
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_timeout = open_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.half_open_successes = half_open_successes
+
+        self.state = self.CLOSED
+        self.opened_at: Optional[float] = None
+        self.open_count = 0
+        self._outcomes = deque(maxlen=window_size)  # (是否失败, 是否慢调用)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """当前是否放行请求（半开状态下会占用一个探测名额）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.open_timeout:
+                    return False
+                self._transition(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_max_calls:
+                    return False
+                self._probes_in_flight += 1
+
+            return True
+
+    def release_probe(self):
+        """归还 allow_request 占用但最终未使用的半开探测名额"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record_success(self, latency: float):
+        """记录一次成功调用（慢调用也会计入慢调用率）"""
+        slow = latency >= self.slow_call_threshold
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_successes:
+                    self._transition(self.CLOSED)
+                return
+
+            self._outcomes.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self, latency: Optional[float] = None):
+        """记录一次失败调用"""
+        slow = latency is not None and latency >= self.slow_call_threshold
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._open()
+                return
+
+            self._outcomes.append((True, slow))
+            self._evaluate()
+
+    def _evaluate(self):
+        """根据窗口内的错误率 / 慢调用率决定是否熔断（调用方需持有锁）"""
+        total = len(self._outcomes)
+        if self.state != self.CLOSED or total < self.min_calls:
+            return
+
+        failure_rate = sum(1 for failed, _ in self._outcomes if failed) / total
+        slow_rate = sum(1 for _, slow in self._outcomes if slow) / total
+
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._open()
+
+    def _open(self):
+        self._transition(self.OPEN)
+        self.opened_at = time.time()
+        self.open_count += 1
+
+    def _transition(self, state: str):
+        if state != self.state:
+            print(f"[CircuitBreaker] {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == self.CLOSED:
+            self._outcomes.clear()
+            self.opened_at = None
+
+    def status(self) -> Dict:
+        """返回熔断器状态快照"""
+        with self._lock:
+            total = len(self._outcomes)
+            failures = sum(1 for failed, _ in self._outcomes if failed)
+            slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.open_timeout - (time.time() - self.opened_at)), 1)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "window_calls": total,
+                "failure_rate": round(failures / total, 3) if total else 0.0,
+                "slow_call_rate": round(slow / total, 3) if total else 0.0,
+                "open_count": self.open_count,
+                "retry_in": retry_in,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """
+    获取进程内共享的熔断器（同名共享状态，kwargs 仅在首次创建时生效）
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _breakers[name] = breaker
+        return breaker
@@ -46,6 +46,13 @@ class FileLock:
                 # 尝试获取排他锁（非阻塞）
                 fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
 
+                # 等锁期间上一个持有者可能已删除锁文件（见 release），此时锁住的是
+                # 已脱离路径的旧文件，新来者会在新文件上加锁；重新打开锁文件再试
+                if not self._holds_current_file():
+                    os.close(self.fd)
+                    self.fd = None
+                    continue
+
                 # 写入当前进程ID和时间戳
                 os.write(self.fd, f"{os.getpid()}:{time.time()}\n".encode())
                 os.fsync(self.fd)
@@ -72,9 +79,24 @@ class FileLock:
                         self.fd = None
                     raise
 
+    def _holds_current_file(self) -> bool:
+        """已加锁的 fd 是否仍是锁文件路径当前指向的文件"""
+        try:
+            return os.path.samestat(os.fstat(self.fd), os.stat(self.lock_file))
+        except FileNotFoundError:
+            return False
+
     def release(self):
         """释放文件锁"""
         if self.fd is not None:
+            # 先在持锁状态下删除锁文件，再解锁：等待者拿到旧文件的锁后会发现它已脱离路径并重试，
+            # 不会与在新锁文件上加锁的进程同时持锁
+            try:
+                if self._holds_current_file():
+                    os.remove(self.lock_file)
+            except Exception as e:
+                print(f"[FileLock] 删除锁文件时出错: {e}")
+
             try:
                 # 释放锁
                 fcntl.flock(self.fd, fcntl.LOCK_UN)
@@ -84,13 +106,6 @@ class FileLock:
             finally:
                 self.fd = None
 
-            # 删除锁文件
-            try:
-                if os.path.exists(self.lock_file):
-                    os.remove(self.lock_file)
-            except Exception as e:
-                print(f"[FileLock] 删除锁文件时出错: {e}")
-
     def __enter__(self):
         """上下文管理器入口"""
         self.acquire()
@@ -0,0 +1,165 @@
+"""对冲请求工具（慢请求超过历史延迟分位数时发出副本，先返回者胜出）"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+
+# 对冲请求使用的共享线程池（主请求与副本都在其中执行）
+HEDGE_POOL_SIZE = 64
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="llm-hedge")
+        return _hedge_executor
+
+
+class LatencyTracker:
+    """记录最近 N 次成功调用的耗时，用于计算延迟分位数"""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        """
+        Args:
+            window_size: 保留的最近样本数
+            min_samples: 样本数不足时不给出分位数（避免冷启动误判）
+        """
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        """记录一次调用耗时（秒）"""
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        计算延迟分位数
+
+        Args:
+            q: 分位（0-1），如 0.95
+
+        Returns:
+            分位数秒数，样本不足时返回 None
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+# 延迟分桶的 max_tokens 上界：输出上限不同的请求耗时相差数十倍，不能共用一个分位数
+LATENCY_TOKEN_BUCKETS = (512, 2048, 8192)
+
+
+def latency_bucket(max_tokens: int) -> str:
+    """max_tokens 所属的延迟分桶名（如 "<=512"、">8192"）"""
+    for bound in LATENCY_TOKEN_BUCKETS:
+        if max_tokens <= bound:
+            return f"<={bound}"
+    return f">{LATENCY_TOKEN_BUCKETS[-1]}"
+
+
+def latency_buckets() -> List[str]:
+    """全部延迟分桶名（从小到大）"""
+    return [f"<={bound}" for bound in LATENCY_TOKEN_BUCKETS] + [f">{LATENCY_TOKEN_BUCKETS[-1]}"]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """获取进程内共享的延迟记录器（通常按 模型 + max_tokens 分桶 区分）"""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _trackers[name] = tracker
+        return tracker
+
+
+class HedgeStats:
+    """对冲统计（进程内累计）"""
+
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def add(self, hedged: bool, hedge_won: bool):
+        with self._lock:
+            self.calls += 1
+            self.hedged += int(hedged)
+            self.hedge_wins += int(hedge_won)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            }
+
+
+hedge_stats = HedgeStats()
+
+
+def hedged_call(primary: Callable[[], str], hedge: Callable[[], str], hedge_delay: float) -> str:
+    """
+    执行对冲调用
+
+    先执行 primary；若 hedge_delay 秒内未完成，再发出一次 hedge 副本（每次调用最多一个副本，
+    因此花费不会超过原来的两倍）。先成功返回的结果胜出，另一方被取消（尚未开始）
+    或其结果被丢弃（已在传输中的 HTTP 请求无法中断）。
+
+    Args:
+        primary: 主请求
+        hedge: 副本请求
+        hedge_delay: 发出副本前的等待时间（秒）
+
+    Returns:
+        先成功的结果；两者都失败时抛出主请求的异常
+    """
+    executor = _get_hedge_executor()
+    primary_future: Future = executor.submit(primary)
+
+    done, _ = wait([primary_future], timeout=hedge_delay)
+    if done:
+        hedge_stats.add(hedged=False, hedge_won=False)
+        return primary_future.result()
+
+    print(f"[LLM] 请求超过 {hedge_delay:.1f}s 未返回，发出对冲请求")
+    hedge_future: Future = executor.submit(hedge)
+    pending = {primary_future, hedge_future}
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                hedge_won = future is hedge_future
+                hedge_stats.add(hedged=True, hedge_won=hedge_won)
+                if hedge_won:
+                    print(f"[LLM] 对冲请求先返回")
+                return future.result()
+
+    hedge_stats.add(hedged=True, hedge_won=False)
+    # 两者都失败：以主请求的错误为准
+    return primary_future.result()
@@ -0,0 +1,264 @@
+"""Vision 请求图片处理（上传前缩放与重新编码、内容哈希与感知哈希、图片分析结果缓存）"""
+import io
+import os
+import json
+import base64
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from .llm_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, LLMResponseCache
+
+
+# 默认缓存目录（项目根目录下 cache/vision）
+DEFAULT_VISION_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "cache", "vision"
+)
+
+# 压缩到字节预算时的最低质量与最小边长
+MIN_QUALITY = 50
+MIN_SIDE = 384
+
+MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png",
+}
+
+
+def _encode(pil_image: Image.Image, image_format: str, quality: int) -> bytes:
+    buffered = io.BytesIO()
+    if image_format == "PNG":
+        pil_image.save(buffered, format="PNG", optimize=True)
+    else:
+        pil_image.save(buffered, format=image_format, quality=quality)
+    return buffered.getvalue()
+
+
+def encode_image_for_upload(pil_image: Image.Image, max_side: int = 1536, image_format: str = "JPEG",
+                            quality: int = 85, max_bytes: Optional[int] = 800 * 1024) -> Tuple[bytes, str]:
+    """
+    缩放并重新编码图片，控制上传体积
+
+    先将长边缩放到 max_side，超出 max_bytes 时依次降低质量（不低于 MIN_QUALITY）、
+    再按 0.75 倍缩小尺寸（不小于 MIN_SIDE），直到满足字节预算。
+
+    Args:
+        pil_image: PIL 图片
+        max_side: 长边上限（像素），0 表示不缩放
+        image_format: JPEG / WEBP / PNG
+        quality: 初始编码质量（PNG 忽略）
+        max_bytes: 字节预算，None 或 0 表示不限制
+
+    Returns:
+        (编码后的字节, MIME 类型)
+    """
+    image_format = image_format.upper()
+    if image_format not in MIME_TYPES:
+        raise ValueError(f"不支持的图片格式: {image_format}")
+
+    img = pil_image
+    if image_format != "PNG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    if max_side and max(img.size) > max_side:
+        img = img.copy()
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    while True:
+        data = _encode(img, image_format, quality)
+        if not max_bytes or len(data) <= max_bytes:
+            break
+        if image_format != "PNG" and quality > MIN_QUALITY:
+            quality = max(MIN_QUALITY, quality - 15)
+            continue
+        if max(img.size) <= MIN_SIDE:
+            break
+        img = img.resize((max(1, int(img.width * 0.75)), max(1, int(img.height * 0.75))), Image.LANCZOS)
+
+    return data, MIME_TYPES[image_format]
+
+
+def to_data_url(data: bytes, mime_type: str) -> str:
+    """编码为 data URL"""
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def perceptual_hash(pil_image: Image.Image, hash_size: int = 8) -> str:
+    """
+    计算差值感知哈希（dHash）
+
+    缩放、重新压缩、轻微调色后的同一张图哈希相同或只差几位。
+
+    Returns:
+        十六进制字符串（hash_size * hash_size 位）
+    """
+    gray = pil_image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def image_content_hash(pil_image: Image.Image) -> str:
+    """解码后像素的内容哈希（模式 + 尺寸 + 像素），与文件格式和元数据无关"""
+    digest = hashlib.sha256(f"{pil_image.mode}|{pil_image.size[0]}x{pil_image.size[1]}|".encode("utf-8"))
+    digest.update(pil_image.tobytes())
+    return digest.hexdigest()
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """两个感知哈希的汉明距离"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+class VisionAnalysisCache:
+    """
+    图片分析结果缓存
+
+    默认按解码后像素的内容哈希精确匹配，条目存放在 LLMResponseCache（<dir>/entries），
+    与 LLM 响应缓存一样有 TTL 与容量上限。近似匹配需显式开启（max_distance > 0）：
+    每个上下文（模型 + 分析 prompt）维护一个感知哈希索引 <dir>/index/<context>.json，
+    内容为 {感知哈希: 内容哈希}，取汉明距离不超过 max_distance 的最近条目；
+    写入时顺带清理缓存中已淘汰的条目，索引不会无限增长。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_VISION_CACHE_DIR, max_distance: int = 0,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl: Optional[float] = DEFAULT_TTL):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_distance: 默认的近似匹配距离（64 位感知哈希的汉明距离），0 表示只精确匹配
+            max_bytes: 分析结果总大小上限（字节）
+            ttl: 条目有效期（秒），None 表示永不过期
+        """
+        self.cache_dir = cache_dir
+        self.max_distance = max_distance
+        self.entries = LLMResponseCache(os.path.join(cache_dir, "entries"), max_bytes=max_bytes, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._indexes: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "index"), exist_ok=True)
+
+    @staticmethod
+    def make_context(model: str, prompt: str) -> str:
+        """模型与分析 prompt 的哈希（prompt 不同的分析结果互不复用）"""
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _key(context: str, image_hash: str) -> str:
+        return hashlib.sha256(f"{context}\n{image_hash}".encode("utf-8")).hexdigest()
+
+    def _index_path(self, context: str) -> str:
+        return os.path.join(self.cache_dir, "index", f"{context}.json")
+
+    def _load_index(self, context: str) -> Dict[str, str]:
+        """读取感知哈希索引（需持有锁）"""
+        index = self._indexes.get(context)
+        if index is None:
+            try:
+                with open(self._index_path(context), 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+            self._indexes[context] = index
+        return index
+
+    def get(self, context: str, image_hash: str, phash: Optional[str] = None,
+            max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """
+        查找分析结果
+
+        Args:
+            context: make_context 的结果
+            image_hash: image_content_hash 的结果
+            phash: 感知哈希（仅近似匹配时需要）
+            max_distance: 本次查找的近似匹配距离，默认使用构造参数
+
+        Returns:
+            (分析文本, 汉明距离)，精确命中时距离为 0，未命中返回 None
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+
+        best = None
+        analysis = self.entries.get(self._key(context, image_hash))
+        if analysis is not None:
+            best = (analysis, 0)
+        elif max_distance > 0 and phash:
+            with self._lock:
+                candidates = sorted(
+                    (hamming_distance(phash, other), content)
+                    for other, content in self._load_index(context).items()
+                )
+            for distance, content in candidates:
+                if distance > max_distance:
+                    break
+                analysis = self.entries.get(self._key(context, content))
+                if analysis is not None:
+                    best = (analysis, distance)
+                    break
+
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best
+
+    def set(self, context: str, image_hash: str, analysis: str, phash: Optional[str] = None):
+        """
+        写入分析结果
+
+        传入 phash 时同时登记到感知哈希索引（合并磁盘上其他进程写入的条目、
+        去掉已淘汰的条目后原子替换）
+        """
+        self.entries.set(self._key(context, image_hash), analysis)
+        if not phash:
+            return
+
+        path = self._index_path(context)
+        with self._lock:
+            index = self._load_index(context)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    index.update({k: v for k, v in json.load(f).items() if k not in index})
+            except (OSError, ValueError):
+                pass
+            index[phash] = image_hash
+            for other, content in list(index.items()):
+                if not self.entries.contains(self._key(context, content)):
+                    del index[other]
+
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[VisionCache] 写入缓存失败: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中统计"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_default_vision_cache: Optional[VisionAnalysisCache] = None
+_default_vision_cache_lock = threading.Lock()
+
+
+def get_default_vision_cache() -> VisionAnalysisCache:
+    """获取进程内共享的默认图片分析缓存"""
+    global _default_vision_cache
+    with _default_vision_cache_lock:
+        if _default_vision_cache is None:
+            _default_vision_cache = VisionAnalysisCache()
+        return _default_vision_cache
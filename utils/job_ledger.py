@@ -0,0 +1,153 @@
+"""批量任务账本（JSON 持久化，进程崩溃后可从账本恢复）"""
+import os
+import json
+import time
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .file_lock import file_lock
+
+
+class JobLedger:
+    """
+    批量任务状态账本
+
+    每个任务一条记录: {"status", "attempts", "output", "error", "duration", "updated_at"}
+    status 取值: pending / running / done / failed。每次状态变化都原子写回文件，
+    因此进程被中断后重新启动即可从账本继续：running 视为未完成重新执行（recover_interrupted），
+    done 跳过。构造账本只读取文件，不写回；只查看进度时用 read()。
+    写回时在文件锁内与磁盘上的账本合并，多个进程共用同一账本也不会丢失彼此的更新。
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 账本文件路径（不存在时自动创建）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.jobs: Dict[str, Dict] = {}
+
+        if os.path.exists(path):
+            try:
+                self.jobs = self.read(path)
+            except (OSError, ValueError) as e:
+                print(f"[JobLedger] 账本读取失败，重新开始: {e}")
+                self.jobs = {}
+
+    @staticmethod
+    def read(path: str) -> Dict[str, Dict]:
+        """
+        只读加载账本（不修正 running 状态、不写回），其他进程运行批量任务时也可安全调用
+
+        Returns:
+            {任务 key: 记录}，文件不存在时为空
+        """
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("jobs", {})
+
+    def recover_interrupted(self) -> int:
+        """
+        将上次中断时仍为 running 的任务重置为 pending（仅由执行批量任务的进程调用）
+
+        Returns:
+            恢复的任务数
+        """
+        with self._lock:
+            interrupted = [key for key, job in self.jobs.items() if job.get("status") == self.RUNNING]
+            for key in interrupted:
+                self.jobs[key]["status"] = self.PENDING
+            if interrupted:
+                self._save(interrupted)
+                print(f"[JobLedger] 恢复 {len(interrupted)} 个中断的任务")
+            return len(interrupted)
+
+    def register(self, keys: Iterable[str]):
+        """登记任务（已存在的记录保持不变）"""
+        with self._lock:
+            added = [key for key in keys if key not in self.jobs]
+            for key in added:
+                self.jobs[key] = {"status": self.PENDING, "attempts": 0}
+            self._save(added)
+
+    def status(self, key: str) -> Optional[str]:
+        with self._lock:
+            job = self.jobs.get(key)
+            return job.get("status") if job else None
+
+    def get(self, key: str) -> Dict:
+        with self._lock:
+            return dict(self.jobs.get(key, {}))
+
+    def start(self, key: str):
+        self._update(key, status=self.RUNNING, error=None, attempts_delta=1)
+
+    def finish(self, key: str, output: Optional[str] = None, duration: Optional[float] = None):
+        self._update(key, status=self.DONE, output=output, duration=duration)
+
+    def fail(self, key: str, error: str, duration: Optional[float] = None):
+        self._update(key, status=self.FAILED, error=error, duration=duration)
+
+    def keys_with_status(self, *statuses: str) -> List[str]:
+        with self._lock:
+            return [key for key, job in self.jobs.items() if job.get("status") in statuses]
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        with self._lock:
+            counts = dict.fromkeys((self.PENDING, self.RUNNING, self.DONE, self.FAILED), 0)
+            for job in self.jobs.values():
+                status = job.get("status", self.PENDING)
+                counts[status] = counts.get(status, 0) + 1
+            return counts
+
+    def _update(self, key: str, attempts_delta: int = 0, **fields):
+        with self._lock:
+            job = self.jobs.setdefault(key, {"status": self.PENDING, "attempts": 0})
+            job["attempts"] = job.get("attempts", 0) + attempts_delta
+            for name, value in fields.items():
+                if value is None and name != "error":
+                    continue
+                job[name] = value
+            job["updated_at"] = time.strftime('%Y-%m-%d %H:%M:%S')
+            self._save([key])
+
+    def _save(self, changed: Iterable[str]):
+        """
+        合并后原子写回（调用方需持有线程锁）
+
+        在文件锁内重新读取磁盘上的账本，只用本次修改的记录覆盖，其他记录以磁盘为准
+        （其他进程可能刚更新过），合并结果同时作为新的内存状态。
+
+        Args:
+            changed: 本次修改的任务 key
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with file_lock(self.path, timeout=10.0):
+            try:
+                jobs = self.read(self.path)
+            except (OSError, ValueError) as e:
+                print(f"[JobLedger] 账本读取失败，以内存状态覆盖: {e}")
+                jobs = {}
+
+            for key, job in self.jobs.items():
+                jobs.setdefault(key, job)
+            for key in changed:
+                jobs[key] = self.jobs[key]
+            self.jobs = jobs
+
+            # 临时文件名带进程与线程号，多个写入方不会互相覆盖对方的临时文件
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"jobs": self.jobs}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,223 @@
+"""LLM 响应缓存（内容寻址，磁盘存储，TTL + LRU 淘汰）"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+
+# 默认缓存目录（项目根目录下 cache/llm）
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "cache", "llm"
+)
+
+# 默认容量上限 200MB，默认有效期 7 天
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600
+
+# 每写入多少次做一次完整的过期/容量扫描
+SWEEP_INTERVAL = 100
+
+
+def make_cache_key(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    """
+    计算请求的规范化哈希（相同请求内容得到相同 key）
+
+    参数:
+        model: 模型名称
+        messages: 消息列表
+        temperature: 温度参数
+        max_tokens: 最大 token 数
+
+    返回:
+        sha256 十六进制字符串
+    """
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """磁盘 LLM 响应缓存（每个条目一个文件，按 mtime 实现 LRU）"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: Optional[float] = DEFAULT_TTL):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节），超出时淘汰最久未使用的条目
+            ttl: 条目有效期（秒），None 表示永不过期
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # 估算的缓存总大小（None 表示尚未扫描）
+        self._approx_bytes: Optional[int] = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # 按前两位分目录，避免单目录文件过多
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+
+        Returns:
+            缓存的响应文本，未命中或已过期返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        if self.ttl is not None and time.time() - entry.get("created_at", 0) > self.ttl:
+            self._remove(path)
+            self._count("misses")
+            return None
+
+        # 更新 mtime 作为最近使用时间（LRU）
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self._count("hits")
+        return entry.get("response")
+
+    def contains(self, key: str) -> bool:
+        """条目文件是否存在（不检查 TTL，不计入命中统计）"""
+        return os.path.exists(self._path(key))
+
+    def set(self, key: str, response: str):
+        """写入缓存（先写临时文件再原子替换，多进程安全）"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "response": response}, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[LLMCache] 写入缓存失败: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self.writes += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            need_sweep = (
+                self._approx_bytes is None
+                or self._approx_bytes > self.max_bytes
+                or self.writes % SWEEP_INTERVAL == 0
+            )
+
+        # 完整扫描代价与条目数成正比，只在估算超限或周期到达时执行
+        if need_sweep:
+            self._enforce_limits()
+
+    def _enforce_limits(self):
+        """淘汰过期条目，并按 LRU 将总大小控制在 max_bytes 以内"""
+        entries = []
+        total = 0
+        now = time.time()
+
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes and self.ttl is None:
+            with self._lock:
+                self._approx_bytes = total
+            return
+
+        entries.sort()
+        for mtime, size, path in entries:
+            # mtime 不晚于创建时间，mtime 已超过 TTL 的条目一定已过期
+            expired = self.ttl is not None and now - mtime > self.ttl
+            if not expired and total <= self.max_bytes:
+                continue
+            if self._remove(path):
+                total -= size
+                self._count("evictions")
+
+        with self._lock:
+            self._approx_bytes = total
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def clear(self):
+        """清空缓存"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                self._remove(os.path.join(root, name))
+        with self._lock:
+            self._approx_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """返回命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_default_cache: Optional[LLMResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> LLMResponseCache:
+    """获取进程内共享的默认缓存实例"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
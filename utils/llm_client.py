@@ -7,47 +7,289 @@ except ImportError:
     print("[LLM Client] 警告: 未安装 openai 库，将使用 requests 回退模式")
 
 import requests
+from requests.adapters import HTTPAdapter
+import os
+import gzip
 import json
 import time
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .circuit_breaker import get_circuit_breaker
+from .file_lock import file_lock
+from .hedging import LatencyTracker, get_latency_tracker, hedge_stats, hedged_call, latency_bucket, latency_buckets
+from .llm_cache import LLMResponseCache, get_default_cache, make_cache_key
+from .rate_limiter import estimate_tokens, get_rate_limiter
+from .retry import (ClientRequestError, RetryContext, RetryableError, apply_retry_after, full_jitter_delay,
+                    parse_rate_limit_headers, parse_retry_after)
+from .singleflight import SingleFlight
+
+
+# ===== requests 回退模式的共享 Session =====
+
+# 连接池大小应与并发 worker 数匹配（可通过环境变量覆盖）
+DEFAULT_HTTP_POOL_SIZE = int(os.environ.get("TWITTERCHAT_HTTP_POOL_SIZE", "20"))
+
+# 请求体超过该字节数时才进行 gzip 压缩
+GZIP_MIN_BYTES = 1024
+
+_http_sessions: Dict[int, requests.Session] = {}
+_http_session_lock = threading.Lock()
+
+
+def get_http_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    获取进程内共享的 requests.Session（keep-alive 连接复用）
+
+    参数:
+        pool_size: 每个 host 的连接池大小，相同大小的调用方共享同一个 Session
+
+    返回:
+        共享的 Session
+    """
+    pool_size = pool_size or DEFAULT_HTTP_POOL_SIZE
+
+    with _http_session_lock:
+        session = _http_sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            # 重试由调用方负责，这里只做连接池管理
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_sessions[pool_size] = session
+        return session
+
+
+# 进程内共享的请求合并器（所有 LLMClient 共用）
+_inflight = SingleFlight()
+
+
+def iter_sse_deltas(response: requests.Response) -> Iterator[str]:
+    """
+    解析 OpenAI 兼容的 SSE 流式响应，逐个产出增量文本
+
+    参数:
+        response: 以 stream=True 发起的 requests 响应
+    """
+    # text/event-stream 未声明 charset 时 requests 会按 ISO-8859-1 解码
+    response.encoding = "utf-8"
+
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
+
+
+def encode_json_body(payload: dict, use_gzip: bool = False) -> Tuple[bytes, Dict[str, str]]:
+    """
+    序列化 JSON 请求体（可选 gzip 压缩）
+
+    返回:
+        (请求体字节, 需要附加的请求头)
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if use_gzip and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def strip_code_fence(content: str) -> str:
+    """
+    去掉模型输出首尾的 markdown 代码块标记（```json ... ```）
+
+    参数:
+        content: 模型原始输出
+
+    返回:
+        去掉代码块标记并 strip 后的文本
+    """
+    content = content.strip()
+    if content.startswith('```'):
+        lines = content.split('\n')
+        if lines[0].startswith('```'):
+            lines = lines[1:]
+        if lines and lines[-1].strip() == '```':
+            lines = lines[:-1]
+        content = '\n'.join(lines)
+    return content.strip()
 
 
 class LLMClient:
     """通用 LLM API 客户端（支持 OpenAI/Claude/本地模型）"""
 
-    def __init__(self, api_key: str, api_base: str = "https://api.openai.com/v1", model: str = "gpt-4"):
+    def __init__(self, api_key: str, api_base: str = "https://api.openai.com/v1", model: str = "gpt-4",
+                 gzip_requests: bool = False, pool_size: Optional[int] = None,
+                 cache: Union[bool, LLMResponseCache, None] = None,
+                 coalesce: bool = False, coalesce_lock_dir: Optional[str] = None,
+                 requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 fallbacks: Optional[Sequence[Union[str, Dict[str, str]]]] = None,
+                 hedge_percentile: Optional[float] = None, hedge_min_delay: float = 2.0):
+        """
+        参数:
+            api_key: API Key
+            api_base: API 基础 URL
+            model: 模型名称
+            gzip_requests: requests 模式下是否 gzip 压缩请求体（需网关支持 Content-Encoding）
+            pool_size: requests 模式下的连接池大小，默认 DEFAULT_HTTP_POOL_SIZE
+            cache: 响应缓存（默认关闭）；True 使用共享默认缓存，也可传入 LLMResponseCache 实例
+            coalesce: 合并进程内相同请求的并发调用（共享一次上游调用的结果）
+            coalesce_lock_dir: 跨进程合并的锁目录；需同时启用 cache，
+                               后到的进程等锁释放后直接读取缓存结果
+            requests_per_minute: 每分钟请求数上限（跨进程共享，按端点 + Key），
+                                 默认读取环境变量 TWITTERCHAT_LLM_RPM
+            tokens_per_minute: 每分钟 token 上限，默认读取环境变量 TWITTERCHAT_LLM_TPM
+            fallbacks: 备用端点列表（按优先级排序），每项为 api_base 字符串，
+                       或 {"api_base": ..., "api_key": ..., "model": ...} 字典（缺省字段沿用主端点）。
+                       每个端点有独立熔断器，请求自动路由到健康端点
+            hedge_percentile: 启用对冲请求（如 0.95）：请求耗时超过该模型同一 max_tokens 分桶的历史延迟分位数时，
+                              向备用端点（或同一端点）发出一次副本，先返回者胜出
+            hedge_min_delay: 对冲等待时间下限（秒）
+        """
         self.api_key = api_key
         self.api_base = api_base.rstrip('/')
         self.model = model
+        self.gzip_requests = gzip_requests
+        self.pool_size = pool_size
+        self.cache = get_default_cache() if cache is True else (cache or None)
+        self.coalesce = coalesce
+        self.coalesce_lock_dir = coalesce_lock_dir
+        self.rate_limiter = get_rate_limiter(api_base, api_key, requests_per_minute, tokens_per_minute)
+        self.last_rate_limit: Dict[str, float] = {}
 
         # 优先使用 OpenAI SDK（更稳定，自带重试机制）
         self.use_sdk = HAS_OPENAI and not self._is_non_openai_endpoint(api_base)
 
         if self.use_sdk:
             # 初始化 OpenAI 客户端
-            if "openai.azure.com" in api_base:
-                # Azure OpenAI
-                api_version = api_base.split("=")[-1].split("/")[0]
-                azure_endpoint = "https://" + api_base.split("//")[1].split("/")[0]
-                self.client = AzureOpenAI(
-                    api_key=api_key,
-                    api_version=api_version,
-                    azure_endpoint=azure_endpoint,
-                    max_retries=3,  # 自动重试3次
-                    timeout=180.0   # 默认超时3分钟
-                )
-            else:
-                # 标准 OpenAI 或兼容端点
-                self.client = OpenAI(
-                    api_key=api_key,
-                    base_url=api_base,
-                    max_retries=3,  # 自动重试3次
-                    timeout=180.0   # 默认超时3分钟
-                )
+            self.client = self.create_sdk_client()
             print(f"[LLM Client] 使用 OpenAI SDK 模式（自带重试机制）")
         else:
             self.client = None
             print(f"[LLM Client] 使用 Requests 模式")
 
+        # 熔断器按端点 + 模型在进程内共享，不同客户端实例看到同一健康状态
+        self.breaker = get_circuit_breaker(f"{self.api_base}#{self.model}")
+        self.fallback_clients: List["LLMClient"] = [self._make_fallback(spec) for spec in (fallbacks or [])]
+
+        # 按 模型 + max_tokens 分桶 记录成功调用耗时，用于计算对冲阈值（见 _latency）
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+
+        # 最近一次使用时间（供连接池空闲回收使用）
+        self.last_used = time.time()
+
+    def _make_fallback(self, spec: Union[str, Dict[str, str]]) -> "LLMClient":
+        """根据备用端点配置创建子客户端（缓存、合并在主客户端层处理）"""
+        if isinstance(spec, str):
+            spec = {"api_base": spec}
+        return LLMClient(
+            api_key=spec.get("api_key", self.api_key),
+            api_base=spec.get("api_base", self.api_base),
+            model=spec.get("model", self.model),
+            gzip_requests=self.gzip_requests,
+            pool_size=self.pool_size
+        )
+
+    def endpoint_status(self) -> List[Dict]:
+        """
+        各端点的熔断器状态（按优先级顺序）
+
+        返回:
+            [{"api_base", "model", "state", "failure_rate", "slow_call_rate", ...}, ...]
+        """
+        return [
+            {"api_base": client.api_base, "model": client.model, **client.breaker.status()}
+            for client in [self] + self.fallback_clients
+        ]
+
+    def hedge_status(self) -> Dict:
+        """
+        对冲请求状态：各 max_tokens 分桶的对冲阈值、样本数与进程内累计统计
+
+        返回:
+            {"enabled", "hedge_delay": {分桶: 秒数或 None}, "latency_samples": {分桶: 样本数},
+             "calls", "hedged", "hedge_wins", "hedge_rate"}
+        """
+        trackers = {bucket: get_latency_tracker(f"{self.model}|{bucket}") for bucket in latency_buckets()}
+        return {
+            "enabled": self.hedge_percentile is not None,
+            "hedge_delay": {bucket: self._hedge_delay_for(tracker) for bucket, tracker in trackers.items()},
+            "latency_samples": {bucket: len(tracker) for bucket, tracker in trackers.items()},
+            **hedge_stats.snapshot(),
+        }
+
+    def _latency(self, max_tokens: int) -> LatencyTracker:
+        """本模型在该 max_tokens 分桶下的延迟记录器（短输出与长输出的耗时分开统计）"""
+        return get_latency_tracker(f"{self.model}|{latency_bucket(max_tokens)}")
+
+    def _throttle(self, messages: list, max_tokens: int) -> int:
+        """
+        发请求前向限流器申请配额（未配置限流时直接返回）
+
+        返回:
+            本次请求的估算 token 数（用于之后按实际用量修正）
+        """
+        if self.rate_limiter is None:
+            return 0
+        estimated = estimate_tokens(messages, max_tokens)
+        waited = self.rate_limiter.acquire(estimated)
+        if waited > 0.5:
+            print(f"[LLM] 限流等待 {waited:.1f} 秒")
+        return estimated
+
+    def _settle_usage(self, estimated: int, total_tokens: Optional[int]):
+        """按响应中的实际 token 用量修正限流器"""
+        if self.rate_limiter is not None and total_tokens:
+            self.rate_limiter.adjust(int(total_tokens) - estimated)
+
+    def create_sdk_client(self):
+        """创建 OpenAI SDK 客户端"""
+        if "openai.azure.com" in self.api_base:
+            # Azure OpenAI
+            api_version = self.api_base.split("=")[-1].split("/")[0]
+            azure_endpoint = "https://" + self.api_base.split("//")[1].split("/")[0]
+            return AzureOpenAI(
+                api_key=self.api_key,
+                api_version=api_version,
+                azure_endpoint=azure_endpoint,
+                max_retries=3,  # 自动重试3次
+                timeout=180.0   # 默认超时3分钟
+            )
+
+        # 标准 OpenAI 或兼容端点
+        return OpenAI(
+            api_key=self.api_key,
+            base_url=self.api_base,
+            max_retries=3,  # 自动重试3次
+            timeout=180.0   # 默认超时3分钟
+        )
+
+    def close(self):
+        """关闭底层 HTTP 连接池"""
+        for fallback in self.fallback_clients:
+            fallback.close()
+        if self.client is not None and hasattr(self.client, "close"):
+            try:
+                self.client.close()
+            except Exception as e:
+                print(f"[LLM Client] 关闭客户端时出错: {e}")
+
     def _is_non_openai_endpoint(self, base_url: str) -> bool:
         """检查是否为非 OpenAI 兼容端点"""
         # 一些已知的非兼容端点
@@ -57,7 +299,8 @@ class LLMClient:
         return any(endpoint in base_url for endpoint in non_openai_endpoints)
 
     def generate(self, messages: list, temperature: float = 0.7, max_tokens: int = 300,
-                 timeout: int = 180, max_retries: int = 3) -> str:
+                 timeout: int = 180, max_retries: int = 3, stream: bool = False,
+                 use_cache: bool = True, hedge: Optional[bool] = None) -> Union[str, Iterator[str]]:
         """
         调用 LLM 生成内容（带重试机制）
 
@@ -66,23 +309,338 @@ class LLMClient:
             temperature: 温度参数 (0.0-2.0)
             max_tokens: 最大 token 数
             timeout: 超时时间（秒），默认 180 秒
-            max_retries: 最大重试次数（仅在 requests 模式有效）
+            max_retries: 最大尝试次数（requests 与 SDK 模式均生效）
+            stream: 为 True 时返回逐 token 产出的迭代器（见 generate_stream）
+            use_cache: 客户端启用缓存时，False 可跳过本次调用的缓存读写
+            hedge: 是否对本次调用启用对冲请求；None 表示按客户端 hedge_percentile 配置（非流式）
 
         返回:
-            生成的文本
+            生成的文本；stream=True 时为文本增量迭代器
+        """
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = make_cache_key(self.model, messages, temperature, max_tokens)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"[LLM] 命中响应缓存 ({cache_key[:12]})")
+                return iter([cached]) if stream else cached
+
+        if stream:
+            deltas = self.generate_stream(messages, temperature, max_tokens, timeout, max_retries)
+            return self._cache_stream(deltas, cache_key) if cache_key else deltas
+
+        hedge = self.hedge_percentile is not None if hedge is None else hedge
+
+        def fetch():
+            return self._fetch_and_store(messages, temperature, max_tokens, timeout, max_retries, cache_key, hedge)
+
+        if self.coalesce:
+            flight_key = f"{self.api_base}|{cache_key or make_cache_key(self.model, messages, temperature, max_tokens)}"
+            return _inflight.do(flight_key, fetch)
+        return fetch()
+
+    def _fetch_and_store(self, messages: list, temperature: float, max_tokens: int,
+                         timeout: int, max_retries: int, cache_key: Optional[str], hedge: bool = False) -> str:
+        """发起请求并写入缓存（启用跨进程合并时先获取该请求的文件锁）"""
+        if self.coalesce_lock_dir and cache_key:
+            lock_path = os.path.join(self.coalesce_lock_dir, cache_key)
+            try:
+                # 锁等待上限覆盖持锁进程的完整重试周期
+                with file_lock(lock_path, timeout=timeout * max_retries + 30):
+                    # 其他进程可能已在持锁期间完成同一请求
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        print(f"[LLM] 合并跨进程请求，读取缓存结果 ({cache_key[:12]})")
+                        return cached
+                    return self._store(cache_key, self._dispatch(
+                        messages, temperature, max_tokens, timeout, max_retries, hedge))
+            except TimeoutError:
+                print(f"[LLM] 等待跨进程请求锁超时，直接发起请求")
+
+        response = self._dispatch(messages, temperature, max_tokens, timeout, max_retries, hedge)
+        return self._store(cache_key, response)
+
+    def _dispatch(self, messages: list, temperature: float, max_tokens: int,
+                  timeout: int, max_retries: int, hedge: bool) -> str:
+        """直接请求，或在启用对冲且已有足够延迟样本时发起对冲请求"""
+        hedge_delay = self._hedge_delay(max_tokens) if hedge else None
+        if hedge_delay is None:
+            return self._generate_uncached(messages, temperature, max_tokens, timeout, max_retries)
+
+        target = self._hedge_target()
+        return hedged_call(
+            lambda: self._generate_uncached(messages, temperature, max_tokens, timeout, max_retries),
+            lambda: target._hedge_attempt(messages, temperature, max_tokens, timeout),
+            hedge_delay
+        )
+
+    def _hedge_attempt(self, messages: list, temperature: float, max_tokens: int, timeout: int) -> str:
+        """
+        对冲副本：经熔断器放行后只发一次上游请求（SDK 也不重试），结果计入该端点熔断器
+
+        每次调用最多两个上游请求，花费不超过两倍。
+        """
+        if not self.breaker.allow_request():
+            raise RuntimeError(f"对冲目标端点已熔断: {self.api_base} ({self.model})")
+
+        start_time = time.time()
+        try:
+            result = self._call_endpoint(messages, temperature, max_tokens, timeout, 1)
+        except ClientRequestError:
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure(time.time() - start_time)
+            raise
+        self.breaker.record_success(time.time() - start_time)
+        return result
+
+    def _hedge_delay(self, max_tokens: int) -> Optional[float]:
+        """对冲等待时间：同一 max_tokens 分桶的历史延迟分位数（样本不足时不对冲）"""
+        return self._hedge_delay_for(self._latency(max_tokens))
+
+    def _hedge_delay_for(self, tracker: LatencyTracker) -> Optional[float]:
+        percentile = tracker.percentile(self.hedge_percentile or 0.95)
+        if percentile is None:
+            return None
+        return max(percentile, self.hedge_min_delay)
+
+    def _hedge_target(self) -> "LLMClient":
+        """对冲副本的目标：第一个熔断器关闭的备用端点，没有则为主端点自身"""
+        for client in self.fallback_clients:
+            if client.breaker.state == client.breaker.CLOSED:
+                return client
+        return self
+
+    def _store(self, cache_key: Optional[str], response: str) -> str:
+        if cache_key and response:
+            self.cache.set(cache_key, response)
+        return response
+
+    def _cache_stream(self, deltas: Iterator[str], cache_key: str) -> Iterator[str]:
+        """透传流式增量，完整结束后写入缓存"""
+        parts = []
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+        if parts:
+            self.cache.set(cache_key, "".join(parts))
+
+    def _generate_uncached(self, messages: list, temperature: float, max_tokens: int,
+                           timeout: int, max_retries: int) -> str:
+        """
+        实际发起请求（不经过缓存），按优先级在健康端点间故障转移
+
+        还有后备端点时当前端点只尝试一次，失败立即切换，避免单个慢网关拖住整个节点；
+        最后一个端点使用完整的重试次数。客户端请求错误（429 以外的 4xx）不计入熔断器，
+        也不切换端点，直接抛出。
         """
+        self.last_used = time.time()
+
+        endpoints = [self] + self.fallback_clients
+        last_error = None
+        attempted = False
+
+        for index, client in enumerate(endpoints):
+            if not client.breaker.allow_request():
+                continue
+
+            attempted = True
+            has_next = index < len(endpoints) - 1
+            start_time = time.time()
+            try:
+                result = client._call_endpoint(messages, temperature, max_tokens, timeout,
+                                               1 if has_next else max_retries)
+            except ClientRequestError:
+                # 请求本身有问题，换端点也一样失败；不能让一个坏请求打开健康端点的熔断器
+                client.breaker.release_probe()
+                raise
+            except Exception as e:
+                client.breaker.record_failure(time.time() - start_time)
+                last_error = e
+                if has_next:
+                    print(f"[LLM] 端点 {client.api_base} ({client.model}) 失败，切换备用端点: {e}")
+                continue
+
+            elapsed = time.time() - start_time
+            client.breaker.record_success(elapsed)
+            self._latency(max_tokens).record(elapsed)
+            return result
+
+        if not attempted:
+            # 所有端点都处于熔断状态：退化为直接请求主端点，而不是直接失败
+            print(f"[LLM] 所有端点均已熔断，强制尝试主端点")
+            return self._call_endpoint(messages, temperature, max_tokens, timeout, max_retries)
+
+        raise last_error
+
+    def _call_endpoint(self, messages: list, temperature: float, max_tokens: int,
+                       timeout: int, max_retries: int) -> str:
+        """向当前端点发起请求"""
         if self.use_sdk:
             # 使用 OpenAI SDK（推荐，自带重试）
-            return self._generate_with_sdk(messages, temperature, max_tokens, timeout)
+            return self._generate_with_sdk(messages, temperature, max_tokens, timeout, max_retries)
         else:
             # 回退到 requests（手动重试）
             return self._generate_with_requests(messages, temperature, max_tokens, timeout, max_retries)
 
-    def _generate_with_sdk(self, messages: list, temperature: float, max_tokens: int, timeout: int) -> str:
+    def generate_stream(self, messages: list, temperature: float = 0.7, max_tokens: int = 300,
+                        timeout: int = 180, max_retries: int = 3) -> Iterator[str]:
+        """
+        流式调用 LLM，按到达顺序产出文本增量
+
+        只有在收到第一个增量之前的失败才会重试；流中途断开直接抛出，
+        避免重复输出已产出的内容。
+
+        返回:
+            文本增量迭代器
+        """
+        self.last_used = time.time()
+        return self._stream_with_failover(messages, temperature, max_tokens, timeout, max_retries)
+
+    def _stream_with_failover(self, messages: list, temperature: float, max_tokens: int,
+                              timeout: int, max_retries: int) -> Iterator[str]:
+        """按优先级在健康端点间故障转移（仅在收到第一个增量之前切换）"""
+        endpoints = [self] + self.fallback_clients
+        candidates = [client for client in endpoints if client.breaker.allow_request()]
+        forced = not candidates
+        if forced:
+            # 所有端点都处于熔断状态：退化为直接请求主端点
+            candidates = [self]
+
+        last_error = None
+        for index, client in enumerate(candidates):
+            has_next = index < len(candidates) - 1
+            started = False
+            start_time = time.time()
+            try:
+                for delta in client._open_stream(messages, temperature, max_tokens, timeout,
+                                                 1 if has_next else max_retries):
+                    started = True
+                    yield delta
+            except ClientRequestError:
+                if not forced:
+                    client.breaker.release_probe()
+                self._release_probes(candidates[index + 1:])
+                raise
+            except Exception as e:
+                if not forced:
+                    client.breaker.record_failure(time.time() - start_time)
+                if started or not has_next:
+                    self._release_probes(candidates[index + 1:])
+                    raise
+                last_error = e
+                print(f"[LLM] 端点 {client.api_base} ({client.model}) 流式失败，切换备用端点: {e}")
+                continue
+
+            if not forced:
+                client.breaker.record_success(time.time() - start_time)
+            self._release_probes(candidates[index + 1:])
+            return
+
+        raise last_error
+
+    @staticmethod
+    def _release_probes(unused: List["LLMClient"]):
+        """归还未实际使用端点的半开探测名额"""
+        for client in unused:
+            client.breaker.release_probe()
+
+    def _open_stream(self, messages: list, temperature: float, max_tokens: int,
+                     timeout: int, max_retries: int) -> Iterator[str]:
+        """向当前端点发起流式请求"""
+        if self.use_sdk:
+            return self._stream_with_sdk(messages, temperature, max_tokens, timeout, max_retries)
+        return self._stream_with_requests(messages, temperature, max_tokens, timeout, max_retries)
+
+    def _sdk_client(self, max_retries: int):
+        """
+        按本次调用的尝试次数配置 SDK 客户端
+
+        SDK 的 max_retries 是首次请求之外的重试次数；with_options 返回共享连接池的浅拷贝。
+        故障转移时非最后端点只尝试一次，避免 SDK 内部重试拖慢切换。
+        """
+        return self.client.with_options(max_retries=max(0, max_retries - 1))
+
+    def _stream_with_sdk(self, messages: list, temperature: float, max_tokens: int, timeout: int,
+                         max_retries: int = 3) -> Iterator[str]:
+        """使用 OpenAI SDK 流式生成"""
+        self._throttle(messages, max_tokens)
+        try:
+            stream = self._sdk_client(max_retries).chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
+        except Exception as e:
+            raise self.friendly_sdk_error(e, timeout)
+
+    def _stream_with_requests(self, messages: list, temperature: float, max_tokens: int,
+                              timeout: int, max_retries: int) -> Iterator[str]:
+        """使用 requests 流式生成（SSE）"""
+        url = f"{self.api_base}/chat/completions"
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+
+        body, headers = encode_json_body(payload, use_gzip=self.gzip_requests)
+        headers["Authorization"] = f"Bearer {self.api_key}"
+        headers["Accept"] = "text/event-stream"
+        session = get_http_session(self.pool_size)
+
+        last_error = None
+
+        for attempt in range(max_retries):
+            started = False
+            try:
+                print(f"[LLM] 流式尝试 {attempt + 1}/{max_retries}，超时: {timeout}s...")
+
+                self._throttle(messages, max_tokens)
+                with session.post(url, headers=headers, data=body, timeout=timeout, stream=True) as response:
+                    # 4xx（429 除外）直接抛出 ClientRequestError，不重试
+                    self._check_response(response)
+                    for content in iter_sse_deltas(response):
+                        started = True
+                        yield content
+                return
+
+            except RetryableError as e:
+                last_error = e
+
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if started:
+                    raise RuntimeError(f"LLM 流式响应中断: {str(e)}")
+                last_error = RetryableError(f"{type(e).__name__}: {str(e)}")
+
+            print(f"[LLM] 流式尝试 {attempt + 1} 失败: {last_error}")
+            if attempt < max_retries - 1:
+                wait_time = apply_retry_after(full_jitter_delay(attempt + 1, max_delay=60.0), last_error)
+                print(f"[LLM] {wait_time:.2f} 秒后重试...")
+                time.sleep(wait_time)
+
+        raise RuntimeError(f"LLM 流式调用失败（已重试 {max_retries} 次）: {last_error}")
+
+    def _generate_with_sdk(self, messages: list, temperature: float, max_tokens: int, timeout: int,
+                           max_retries: int = 3) -> str:
         """使用 OpenAI SDK 生成（推荐方式）"""
+        estimated = self._throttle(messages, max_tokens)
         try:
-            # OpenAI SDK 自动处理重试和超时
-            response = self.client.chat.completions.create(
+            # OpenAI SDK 自动处理重试和超时（重试次数按本次调用配置）
+            response = self._sdk_client(max_retries).chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
@@ -90,34 +648,41 @@ class LLMClient:
                 timeout=timeout
             )
 
+            self._settle_usage(estimated, getattr(response.usage, "total_tokens", None))
             return response.choices[0].message.content
 
         except Exception as e:
-            # OpenAI SDK 的异常已经很详细了
-            error_msg = str(e)
-
-            # 提供更友好的错误提示
-            if "timeout" in error_msg.lower():
-                raise RuntimeError(f"LLM API 调用超时（超过 {timeout} 秒）。建议增加 timeout 参数或检查 API 服务状态。")
-            elif "rate_limit" in error_msg.lower():
-                raise RuntimeError(f"API 速率限制：{error_msg}")
-            elif "authentication" in error_msg.lower() or "api_key" in error_msg.lower():
-                raise RuntimeError(f"API 认证失败，请检查 API Key 是否正确：{error_msg}")
-            elif "connection" in error_msg.lower():
-                raise RuntimeError(f"网络连接失败：{error_msg}")
-            else:
-                raise RuntimeError(f"LLM API 调用失败: {error_msg}")
+            raise self.friendly_sdk_error(e, timeout)
+
+    @staticmethod
+    def friendly_sdk_error(e: Exception, timeout: int) -> RuntimeError:
+        """将 OpenAI SDK 异常转换为更友好的 RuntimeError（429 以外的 4xx 为 ClientRequestError）"""
+        # OpenAI SDK 的异常已经很详细了
+        error_msg = str(e)
+
+        status_code = getattr(e, "status_code", None)
+        if isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 429:
+            if status_code in (401, 403):
+                return ClientRequestError(f"API 认证失败，请检查 API Key 是否正确：{error_msg}", status_code)
+            return ClientRequestError(f"LLM API 调用失败: {error_msg}", status_code)
+
+        # 提供更友好的错误提示
+        if "timeout" in error_msg.lower():
+            return RuntimeError(f"LLM API 调用超时（超过 {timeout} 秒）。建议增加 timeout 参数或检查 API 服务状态。")
+        elif "rate_limit" in error_msg.lower():
+            return RuntimeError(f"API 速率限制：{error_msg}")
+        elif "authentication" in error_msg.lower() or "api_key" in error_msg.lower():
+            return RuntimeError(f"API 认证失败，请检查 API Key 是否正确：{error_msg}")
+        elif "connection" in error_msg.lower():
+            return RuntimeError(f"网络连接失败：{error_msg}")
+        else:
+            return RuntimeError(f"LLM API 调用失败: {error_msg}")
 
     def _generate_with_requests(self, messages: list, temperature: float, max_tokens: int,
                                 timeout: int, max_retries: int) -> str:
-        """使用 requests 生成（回退方式，手动重试）"""
+        """使用 requests 生成（回退方式，共享重试策略：Full Jitter 退避 + Retry-After）"""
         url = f"{self.api_base}/chat/completions"
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         payload = {
             "model": self.model,
             "messages": messages,
@@ -125,79 +690,210 @@ class LLMClient:
             "max_tokens": max_tokens
         }
 
-        last_error = None
+        # 请求体只序列化一次，重试时复用；Session 复用 keep-alive 连接
+        body, headers = encode_json_body(payload, use_gzip=self.gzip_requests)
+        headers["Authorization"] = f"Bearer {self.api_key}"
+        session = get_http_session(self.pool_size)
 
-        for attempt in range(max_retries):
+        # 根据 max_tokens 动态调整超时
+        adjusted_timeout = timeout
+        if max_tokens > 2000:
+            adjusted_timeout = int(timeout * 1.5)
+
+        attempt_number = [0]
+
+        def attempt() -> str:
+            attempt_number[0] += 1
+            print(f"[LLM] 尝试 {attempt_number[0]}/{max_retries}，超时: {adjusted_timeout}s...")
+
+            estimated = self._throttle(messages, max_tokens)
             try:
-                # 根据 max_tokens 动态调整超时
-                adjusted_timeout = timeout
-                if max_tokens > 2000:
-                    adjusted_timeout = int(timeout * 1.5)
+                response = session.post(url, headers=headers, data=body, timeout=adjusted_timeout)
+            except requests.exceptions.Timeout:
+                raise RetryableError(f"请求超时（超过 {adjusted_timeout} 秒）")
+            except requests.exceptions.ConnectionError as e:
+                raise RetryableError(f"网络连接失败: {str(e)}")
+            except requests.exceptions.RequestException as e:
+                raise RetryableError(f"未知错误: {str(e)}")
 
-                print(f"[LLM] 尝试 {attempt + 1}/{max_retries}，超时: {adjusted_timeout}s...")
+            self._check_response(response)
 
-                response = requests.post(url, headers=headers, json=payload, timeout=adjusted_timeout)
-                response.raise_for_status()
+            try:
                 data = response.json()
+                content = data["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                # 响应格式错误重试也无济于事
+                raise RuntimeError(f"LLM API 调用失败: API 响应格式错误，缺少字段: {str(e)}")
+
+            self._settle_usage(estimated, (data.get("usage") or {}).get("total_tokens"))
+            return content
+
+        retry_ctx = RetryContext(
+            max_attempts=max_retries,
+            delay=1.0,
+            backoff=2.0,
+            exceptions=(RetryableError,),
+            max_delay=60.0,
+            jitter=True,
+            name="LLM"
+        )
 
-                # 成功返回
-                return data["choices"][0]["message"]["content"]
+        try:
+            return retry_ctx.execute(attempt)
+        except RetryableError as e:
+            # 所有重试都失败
+            raise RuntimeError(f"LLM API 调用失败（已重试 {max_retries} 次）: {str(e)}")
 
-            except requests.exceptions.Timeout:
-                last_error = f"请求超时（超过 {adjusted_timeout} 秒）"
-                print(f"[LLM] 尝试 {attempt + 1} 超时: {last_error}")
-
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # 指数退避
-                    print(f"[LLM] {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
-
-            except requests.exceptions.HTTPError as e:
-                status_code = e.response.status_code if e.response else "unknown"
-
-                # 4xx 客户端错误通常不需要重试
-                if 400 <= status_code < 500:
-                    try:
-                        error_detail = e.response.json()
-                        last_error = f"HTTP {status_code}: {error_detail.get('error', {}).get('message', str(e))}"
-                    except:
-                        last_error = f"HTTP {status_code}: {str(e)}"
-
-                    print(f"[LLM] 客户端错误（不重试）: {last_error}")
-                    break
-
-                # 5xx 服务器错误可以重试
-                else:
-                    last_error = f"HTTP {status_code}: {str(e)}"
-                    print(f"[LLM] 尝试 {attempt + 1} 失败: {last_error}")
-
-                    if attempt < max_retries - 1:
-                        wait_time = 2 ** attempt
-                        print(f"[LLM] {wait_time} 秒后重试...")
-                        time.sleep(wait_time)
+    def _check_response(self, response: requests.Response):
+        """
+        记录限流响应头并检查状态码
 
-            except requests.exceptions.ConnectionError as e:
-                last_error = f"网络连接失败: {str(e)}"
-                print(f"[LLM] 尝试 {attempt + 1} 连接失败: {last_error}")
+        429 与 5xx 抛出 RetryableError（携带 Retry-After），其他 4xx 直接抛出 ClientRequestError
+        """
+        self._record_rate_limit(response.headers)
+
+        status_code = response.status_code
+        if status_code < 400:
+            return
+
+        try:
+            detail = response.json().get("error", {}).get("message") or response.text[:200]
+        except (ValueError, AttributeError):
+            detail = response.text[:200]
+        error = f"HTTP {status_code}: {detail}"
+
+        if status_code == 429 or status_code >= 500:
+            retry_after = parse_retry_after(response.headers)
+            if status_code == 429 and self.rate_limiter is not None:
+                # 让共享限流器同步暂停，其他进程不再继续撞 429
+                self.rate_limiter.observe({"remaining_requests": 0, "reset_requests": retry_after or 1.0})
+            raise RetryableError(error, retry_after=retry_after)
+
+        # 4xx 客户端错误通常不需要重试
+        print(f"[LLM] 客户端错误（不重试）: {error}")
+        raise ClientRequestError(f"LLM API 调用失败: {error}", status_code)
+
+    def _record_rate_limit(self, headers):
+        """保存服务端返回的 x-ratelimit-* 信息并校准共享限流器"""
+        info = parse_rate_limit_headers(headers)
+        if not info:
+            return
+        info["observed_at"] = time.time()
+        self.last_rate_limit = info
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(info)
+
+    def rate_limit_status(self) -> Dict[str, float]:
+        """
+        最近一次响应中的限流信息（供调用方自行调节节奏）
 
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"[LLM] {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
+        返回:
+            parse_rate_limit_headers 的结果 + observed_at 时间戳；尚无数据时为空字典
+        """
+        return dict(self.last_rate_limit)
 
-            except KeyError as e:
-                last_error = f"API 响应格式错误，缺少字段: {str(e)}"
-                print(f"[LLM] 响应格式错误（不重试）: {last_error}")
-                break
 
-            except Exception as e:
-                last_error = f"未知错误: {str(e)}"
-                print(f"[LLM] 尝试 {attempt + 1} 出现未知错误: {last_error}")
+# ===== 进程级客户端连接池 =====
+
+# 空闲超过该时间（秒）的客户端会被回收
+DEFAULT_CLIENT_IDLE_TTL = 600.0
+
+_client_registry: Dict[tuple, LLMClient] = {}
+_client_registry_lock = threading.Lock()
+
+
+def _api_key_fingerprint(api_key: str) -> str:
+    """计算 API Key 指纹（避免在内存索引中保存明文 Key）"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def get_llm_client(api_key: str, api_base: str = "https://api.openai.com/v1", model: str = "gpt-4",
+                   idle_ttl: Optional[float] = DEFAULT_CLIENT_IDLE_TTL, **options) -> LLMClient:
+    """
+    获取进程内共享的 LLMClient（按 api_base + Key 指纹 + model 复用）
+
+    节点每次执行都新建 LLMClient 会导致新的连接池和 TLS 握手；
+    通过此函数获取的客户端会长期复用 keep-alive 连接。
+
+    参数:
+        api_key: API Key
+        api_base: API 基础 URL
+        model: 模型名称
+        idle_ttl: 空闲回收时间（秒），None 表示不回收
+        **options: 传给 LLMClient 的其他参数（如 gzip_requests），不同取值对应不同实例
+
+    返回:
+        LLMClient 实例（线程安全，可在多个节点间共享）
+    """
+    # 列表 / 字典类参数（如 fallbacks）不可哈希，以 repr 参与 key
+    option_key = tuple(sorted((name, repr(value)) for name, value in options.items()))
+    key = (api_base.rstrip('/'), _api_key_fingerprint(api_key), model, option_key)
+
+    with _client_registry_lock:
+        if idle_ttl is not None:
+            _evict_idle_clients_locked(idle_ttl)
+
+        client = _client_registry.get(key)
+        if client is None:
+            client = LLMClient(api_key, api_base, model, **options)
+            _client_registry[key] = client
+
+        client.last_used = time.time()
+        return client
+
+
+def _evict_idle_clients_locked(idle_ttl: float):
+    """回收空闲客户端（调用方需持有 _client_registry_lock）"""
+    now = time.time()
+    expired = [k for k, c in _client_registry.items() if now - c.last_used > idle_ttl]
+    for k in expired:
+        _client_registry.pop(k).close()
+    if expired:
+        print(f"[LLM Client] 回收 {len(expired)} 个空闲客户端")
+
+
+def evict_idle_clients(idle_ttl: float = DEFAULT_CLIENT_IDLE_TTL) -> int:
+    """
+    回收空闲超过 idle_ttl 秒的客户端
+
+    返回:
+        剩余客户端数量
+    """
+    with _client_registry_lock:
+        _evict_idle_clients_locked(idle_ttl)
+        return len(_client_registry)
+
+
+def close_all_clients():
+    """关闭并清空所有共享客户端"""
+    with _client_registry_lock:
+        for client in _client_registry.values():
+            client.close()
+        _client_registry.clear()
+
+
+def chat_completion(api_key: str, api_base: str, model: str, system_prompt: str, user_prompt: str,
+                    temperature: float = 0.7, max_tokens: int = 300, timeout: int = 180,
+                    max_retries: int = 3, use_cache: bool = True, **options) -> str:
+    """
+    system + user 两条消息的单次调用（persona 节点的统一入口）
+
+    走 get_llm_client 的共享客户端，因此连接池、重试、限流、熔断等对所有节点生效。
 
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"[LLM] {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
+    参数:
+        api_key / api_base / model: 端点配置
+        system_prompt: 系统提示词
+        user_prompt: 用户提示词
+        temperature / max_tokens / timeout / max_retries / use_cache: 同 LLMClient.generate
+        **options: 传给 get_llm_client 的客户端参数（如 cache=True）
 
-        # 所有重试都失败
-        raise RuntimeError(f"LLM API 调用失败（已重试 {max_retries} 次）: {last_error}")
+    返回:
+        生成的文本
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    llm = get_llm_client(api_key, api_base, model, **options)
+    return llm.generate(messages, temperature=temperature, max_tokens=max_tokens,
+                        timeout=timeout, max_retries=max_retries, use_cache=use_cache)
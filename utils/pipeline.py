@@ -0,0 +1,194 @@
+"""阶段依赖图执行器（无依赖关系的阶段并发执行，记录各阶段耗时）"""
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .stage_checkpoint import StageCheckpointStore
+
+
+class StageGraph:
+    """
+    阶段依赖图
+
+    每个阶段声明依赖的阶段名；依赖全部完成后立即提交到线程池执行，
+    因此整体耗时约等于关键路径耗时，而不是所有阶段耗时之和。
+
+    使用方式:
+        graph = StageGraph(max_workers=4)
+        graph.add("core", lambda r: make_core())
+        graph.add("tweets", lambda r: make_tweets(r["core"]), deps=["core"])
+        graph.add("social", lambda r: make_social(r["core"]), deps=["core"])
+        results = graph.run()
+        print(graph.timing_report())
+
+    传入 checkpoints 后，声明了 checkpoint_inputs 的阶段会按输入哈希保存输出；
+    重跑时输入未变的阶段直接复用检查点，只从失败或输入变化的阶段继续执行。
+    """
+
+    def __init__(self, max_workers: int = 4, name: str = "Pipeline",
+                 checkpoints: Optional[StageCheckpointStore] = None):
+        """
+        Args:
+            max_workers: 同时执行的阶段数上限
+            name: 名称（用于日志）
+            checkpoints: 阶段检查点存储，None 表示不使用检查点
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self.checkpoints = checkpoints
+        self._stages: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], Tuple[str, ...],
+                                      Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]]] = {}
+        self.restored: List[str] = []
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Sequence[str] = (),
+            checkpoint_inputs: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        """
+        添加阶段
+
+        Args:
+            name: 阶段名（唯一）
+            func: 阶段函数，参数为已完成阶段的结果字典 {阶段名: 结果}
+            deps: 依赖的阶段名（需先 add）
+            checkpoint_inputs: 返回决定本阶段输出的全部输入（上游输出、模型、参数等），
+                               用于计算检查点 key；None 表示该阶段不做检查点
+        """
+        if name in self._stages:
+            raise ValueError(f"阶段重复: {name}")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"阶段 {name} 依赖未定义的阶段: {', '.join(missing)}")
+        self._stages[name] = (func, tuple(deps), checkpoint_inputs)
+
+    @property
+    def stages(self) -> List[str]:
+        return list(self._stages)
+
+    def run(self, results: Optional[Dict[str, Any]] = None, force: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        执行所有阶段
+
+        Args:
+            results: 已有结果（对应阶段会被跳过，可用于从中间阶段恢复）
+            force: 忽略检查点、强制重新执行的阶段名（下游阶段因输入变化自动重算）
+
+        Returns:
+            {阶段名: 结果}
+
+        Raises:
+            RuntimeError: 任一阶段失败（未开始的阶段不再执行）
+        """
+        results = dict(results or {})
+        force = set(force)
+        unknown = force - set(self._stages)
+        if unknown:
+            raise ValueError(f"未定义的阶段: {', '.join(sorted(unknown))}")
+        pending = {name for name in self._stages if name not in results}
+        running = {}
+        self.timings = {}
+        self.restored = []
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix=self.name.lower()) as executor:
+            while pending or running:
+                ready = [name for name in self._stages
+                         if name in pending and all(dep in results for dep in self._stages[name][1])]
+                for name in ready:
+                    pending.discard(name)
+                    snapshot = dict(results)
+                    running[executor.submit(self._run_stage, name, snapshot, start, name in force)] = name
+
+                if not running:
+                    # 剩余阶段的依赖永远无法满足（理论上 add 已保证不会发生）
+                    raise RuntimeError(f"[{self.name}] 无法执行的阶段: {', '.join(sorted(pending))}")
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        for other in running:
+                            other.cancel()
+                        self.wall_time = time.time() - start
+                        raise RuntimeError(f"[{self.name}] 阶段 {name} 失败: {e}") from e
+
+        self.wall_time = time.time() - start
+        return results
+
+    def _run_stage(self, name: str, results: Dict[str, Any], pipeline_start: float, force: bool) -> Any:
+        func, _, checkpoint_inputs = self._stages[name]
+        stage_start = time.time()
+
+        key = None
+        if self.checkpoints is not None and checkpoint_inputs is not None:
+            key = self.checkpoints.make_key(name, checkpoint_inputs(results))
+            cached = None if force else self.checkpoints.get(name, key)
+            if cached is not None:
+                self._record_timing(name, stage_start, pipeline_start, restored=True)
+                print(f"[{self.name}] ↺ {name} (checkpoint)")
+                return cached
+
+        print(f"[{self.name}] ▶ {name}{' (forced)' if force else ''}")
+        try:
+            output = func(results)
+        finally:
+            self._record_timing(name, stage_start, pipeline_start)
+            print(f"[{self.name}] ✔ {name} ({time.time() - stage_start:.1f}s)")
+
+        if key is not None:
+            self.checkpoints.set(name, key, output)
+        return output
+
+    def _record_timing(self, name: str, stage_start: float, pipeline_start: float, restored: bool = False):
+        stage_end = time.time()
+        with self._lock:
+            self.timings[name] = {
+                "start": stage_start - pipeline_start,
+                "end": stage_end - pipeline_start,
+                "duration": stage_end - stage_start,
+            }
+            if restored:
+                self.restored.append(name)
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        按本次各阶段耗时计算关键路径
+
+        Returns:
+            (阶段名列表, 关键路径总耗时)
+        """
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        # _stages 按 add 顺序保存，依赖总在前面，可直接按顺序递推
+        for name, (_, deps, _) in self._stages.items():
+            duration = self.timings.get(name, {}).get("duration", 0.0)
+            prev = max((best[dep] for dep in deps), key=lambda item: item[0], default=(0.0, []))
+            best[name] = (prev[0] + duration, prev[1] + [name])
+        if not best:
+            return [], 0.0
+        total, path = max(best.values(), key=lambda item: item[0])
+        return path, total
+
+    def timing_report(self) -> str:
+        """生成各阶段耗时报告（开始偏移、耗时、关键路径、并行收益）"""
+        lines = [f"⏱️  {self.name} timing"]
+        for name in self._stages:
+            timing = self.timings.get(name)
+            if timing is None:
+                lines.append(f"   {name:<16} skipped")
+                continue
+            note = "  (checkpoint)" if name in self.restored else ""
+            lines.append(f"   {name:<16} +{timing['start']:6.1f}s  {timing['duration']:6.1f}s{note}")
+
+        serial = sum(timing["duration"] for timing in self.timings.values())
+        path, path_time = self.critical_path()
+        lines.append(f"   Sum of stages:  {serial:.1f}s")
+        lines.append(f"   Critical path:  {path_time:.1f}s ({' → '.join(path)})")
+        lines.append(f"   Wall time:      {self.wall_time:.1f}s")
+        if self.wall_time > 0:
+            lines.append(f"   Speedup:        {serial / self.wall_time:.2f}x")
+        return "\n".join(lines)
@@ -0,0 +1,251 @@
+"""跨进程令牌桶限流器（按端点 + API Key 共享请求数与 token 配额）"""
+import os
+import json
+import time
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+
+# 默认状态目录（项目根目录下 cache/ratelimit），同一目录下的进程共享配额
+DEFAULT_STATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "cache", "ratelimit"
+)
+
+# 单次等待的最长睡眠时间（秒），到期后重新检查桶状态
+MAX_SLEEP_INTERVAL = 5.0
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """
+    粗略估算一次请求消耗的 token 数（输入按 4 字符/token 估算 + 输出上限）
+
+    Args:
+        messages: 消息列表
+        max_tokens: 最大输出 token 数
+
+    Returns:
+        估算 token 数
+    """
+    prompt_chars = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            prompt_chars += len(content)
+        else:
+            # 多模态内容（如图片）只统计文本部分
+            prompt_chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return prompt_chars // 4 + max_tokens
+
+
+class TokenBucketRateLimiter:
+    """
+    基于 fcntl 锁定状态文件的令牌桶
+
+    同时维护两个桶：请求数（RPM）与 token 数（TPM）。调用方在发请求前
+    acquire()，配额不足时在本地等待，而不是把请求打到上游再吃 429。
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, state_dir: str = DEFAULT_STATE_DIR):
+        """
+        初始化限流器
+
+        Args:
+            name: 限流器名称（相同名称 + 目录的实例共享配额）
+            requests_per_minute: 每分钟请求数上限，None 表示不限
+            tokens_per_minute: 每分钟 token 数上限，None 表示不限
+            state_dir: 状态文件目录
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.state_path = os.path.join(state_dir, f"{name}.json")
+
+        self.total_wait = 0.0
+        self.acquired = 0
+        self._stats_lock = threading.Lock()
+
+        os.makedirs(state_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked_state(self):
+        """在排他文件锁内读取状态，退出时写回（跨进程原子的读改写）"""
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            raw = os.read(fd, 4096)
+            try:
+                state = json.loads(raw) if raw else {}
+            except ValueError:
+                state = {}
+
+            yield state
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps(state).encode())
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _buckets(self) -> Dict[str, float]:
+        """已启用的桶及其容量（每分钟配额）"""
+        buckets = {}
+        if self.requests_per_minute:
+            buckets["requests"] = float(self.requests_per_minute)
+        if self.tokens_per_minute:
+            buckets["tokens"] = float(self.tokens_per_minute)
+        return buckets
+
+    def _refill(self, state: Dict, now: float) -> Dict[str, float]:
+        """按流逝时间补充令牌，返回各桶当前余量"""
+        elapsed = max(0.0, now - state.get("updated_at", now))
+        return {
+            bucket: min(capacity, state.get(bucket, capacity) + elapsed * capacity / 60.0)
+            for bucket, capacity in self._buckets().items()
+        }
+
+    def _update(self, request_cost: float, token_cost: float, force: bool = False) -> float:
+        """
+        在文件锁内补充令牌并尝试扣减
+
+        Args:
+            request_cost: 请求数消耗
+            token_cost: token 消耗（负数表示归还）
+            force: 为 True 时无论余量是否足够都扣减（允许桶为负）
+
+        Returns:
+            需要等待的秒数（0 表示已成功扣减）
+        """
+        costs = {"requests": request_cost, "tokens": token_cost}
+
+        with self._locked_state() as state:
+            now = time.time()
+            levels = self._refill(state, now)
+
+            wait = 0.0
+            for bucket, capacity in self._buckets().items():
+                cost = costs[bucket]
+                if force:
+                    continue
+                # 单次消耗不能超过桶容量，否则永远无法满足
+                cost = min(cost, capacity)
+                costs[bucket] = cost
+                if levels[bucket] < cost:
+                    wait = max(wait, (cost - levels[bucket]) / (capacity / 60.0))
+
+            for bucket, capacity in self._buckets().items():
+                level = levels[bucket]
+                if wait == 0.0:
+                    level = min(capacity, level - costs[bucket])
+                state[bucket] = level
+            state["updated_at"] = now
+
+        return wait
+
+    def observe(self, rate_limit_info: Dict[str, float]):
+        """
+        用服务端返回的 x-ratelimit-* 信息校准本地桶
+
+        余量不会高于服务端报告的 remaining；remaining 为 0 时桶被扣成负数，
+        使所有进程至少等到服务端的 reset 时间。
+
+        Args:
+            rate_limit_info: utils.retry.parse_rate_limit_headers 的返回值
+        """
+        if not rate_limit_info:
+            return
+
+        with self._locked_state() as state:
+            now = time.time()
+            levels = self._refill(state, now)
+
+            for bucket, capacity in self._buckets().items():
+                level = levels[bucket]
+                remaining = rate_limit_info.get(f"remaining_{bucket}")
+                if remaining is not None:
+                    level = min(level, remaining)
+                    reset = rate_limit_info.get(f"reset_{bucket}")
+                    if remaining <= 0 and reset:
+                        level = min(level, -reset * capacity / 60.0)
+                state[bucket] = level
+            state["updated_at"] = now
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """
+        获取一次请求的配额（阻塞直到可用）
+
+        Args:
+            tokens: 本次请求估算的 token 数
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            实际等待的秒数
+        """
+        start = time.time()
+        while True:
+            wait = self._update(1, tokens)
+            if wait == 0.0:
+                waited = time.time() - start
+                with self._stats_lock:
+                    self.acquired += 1
+                    self.total_wait += waited
+                return waited
+
+            if timeout is not None and time.time() - start + wait > timeout:
+                raise TimeoutError(f"限流等待超过 {timeout} 秒: {self.name}")
+
+            time.sleep(min(wait, MAX_SLEEP_INTERVAL))
+
+    def adjust(self, token_delta: int):
+        """
+        按实际用量修正 token 桶（正数表示比估算多用，负数表示归还）
+
+        Args:
+            token_delta: 实际 token 数 - 估算 token 数
+        """
+        if not self.tokens_per_minute or not token_delta:
+            return
+        # 多用的部分允许把桶扣成负数，后续请求自然等待；少用的部分归还
+        self._update(0, token_delta, force=True)
+
+    def stats(self) -> Dict[str, float]:
+        """返回本进程内的限流统计"""
+        with self._stats_lock:
+            return {
+                "acquired": self.acquired,
+                "total_wait": round(self.total_wait, 3),
+            }
+
+
+_limiters: Dict[Tuple, TokenBucketRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_base: str, api_key: str, requests_per_minute: Optional[float] = None,
+                     tokens_per_minute: Optional[float] = None) -> Optional[TokenBucketRateLimiter]:
+    """
+    获取端点 + API Key 对应的共享限流器
+
+    未显式传入时读取环境变量 TWITTERCHAT_LLM_RPM / TWITTERCHAT_LLM_TPM，
+    两者都未配置则返回 None（不限流）。
+    """
+    requests_per_minute = requests_per_minute or float(os.environ.get("TWITTERCHAT_LLM_RPM", 0)) or None
+    tokens_per_minute = tokens_per_minute or float(os.environ.get("TWITTERCHAT_LLM_TPM", 0)) or None
+    if not requests_per_minute and not tokens_per_minute:
+        return None
+
+    fingerprint = hashlib.sha256(f"{api_base.rstrip('/')}|{api_key}".encode("utf-8")).hexdigest()[:16]
+    key = (fingerprint, requests_per_minute, tokens_per_minute)
+
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucketRateLimiter(fingerprint, requests_per_minute, tokens_per_minute)
+            _limiters[key] = limiter
+        return limiter
@@ -1,7 +1,128 @@
 """重试装饰器工具"""
+import re
 import time
+import random
 import functools
-from typing import Callable, Tuple, Type, Optional
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Mapping, Tuple, Type, Optional
+
+
+class RetryableError(Exception):
+    """可重试错误（可携带服务端建议的等待时间）"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientRequestError(RuntimeError):
+    """客户端请求错误（429 以外的 4xx，如请求格式错误、超出上下文长度）：重试或切换端点都无济于事"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def full_jitter_delay(attempt: int, initial_delay: float = 1.0, max_delay: float = 60.0,
+                      exponential_base: float = 2.0) -> float:
+    """
+    计算 Full Jitter 退避时间：random(0, min(max_delay, initial * base^(attempt-1)))
+
+    多个 worker 同时失败时，随机化的等待时间可以避免它们同步重试。
+
+    Args:
+        attempt: 第几次尝试（从 1 开始）
+        initial_delay: 初始延迟（秒）
+        max_delay: 最大延迟（秒）
+        exponential_base: 指数基数
+
+    Returns:
+        等待秒数
+    """
+    cap = min(max_delay, initial_delay * (exponential_base ** (attempt - 1)))
+    return random.uniform(0, cap)
+
+
+def apply_retry_after(delay: float, error: Exception) -> float:
+    """若异常携带 retry_after，则至少等待该时间（附加少量抖动避免同步重试）"""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after:
+        return max(delay, retry_after * (1 + random.random() * 0.1))
+    return delay
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """解析时长字符串（如 "1.5"、"20ms"、"6m0s"）为秒"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    parts = re.findall(r'([\d.]+)(ms|s|m|h)', value)
+    if not parts:
+        return None
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    解析 Retry-After / retry-after-ms 响应头
+
+    Args:
+        headers: 响应头（大小写不敏感的映射，如 requests 的 CaseInsensitiveDict）
+
+    Returns:
+        建议等待的秒数，无该响应头时返回 None
+    """
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    # HTTP-date 格式
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> Dict[str, float]:
+    """
+    解析 x-ratelimit-* 响应头
+
+    Returns:
+        包含 limit_requests / limit_tokens / remaining_requests / remaining_tokens /
+        reset_requests / reset_tokens（秒）中已出现字段的字典
+    """
+    info = {}
+    for kind in ("requests", "tokens"):
+        for field in ("limit", "remaining"):
+            value = headers.get(f"x-ratelimit-{field}-{kind}")
+            if value is not None:
+                try:
+                    info[f"{field}_{kind}"] = float(value)
+                except ValueError:
+                    pass
+
+        reset = headers.get(f"x-ratelimit-reset-{kind}")
+        if reset:
+            seconds = _parse_duration(reset)
+            if seconds is not None:
+                info[f"reset_{kind}"] = seconds
+    return info
 
 
 def retry(
@@ -88,17 +209,17 @@ def retry_with_exponential_backoff(
         initial_delay: 初始延迟（秒）
         max_delay: 最大延迟（秒）
         exponential_base: 指数基数
-        jitter: 是否添加随机抖动（避免同时重试）
+        jitter: 是否使用 Full Jitter（在 0 到退避上限之间随机，避免同时重试）
         max_attempts: 最大尝试次数
 
+    异常若带有 retry_after 属性（如 RetryableError），至少等待该时间。
+
     Returns:
         装饰器函数
     """
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            import random
-
             for attempt in range(1, max_attempts + 1):
                 try:
                     return func(*args, **kwargs)
@@ -107,12 +228,13 @@ def retry_with_exponential_backoff(
                         print(f"[RetryBackoff] {func.__name__} 最终失败: {str(e)}")
                         raise
 
-                    # 计算延迟时间（指数退避）
-                    delay = min(initial_delay * (exponential_base ** (attempt - 1)), max_delay)
-
-                    # 添加随机抖动（0-50%）
+                    # 计算延迟时间（指数退避，可选 Full Jitter）
                     if jitter:
-                        delay = delay * (0.5 + random.random() * 0.5)
+                        delay = full_jitter_delay(attempt, initial_delay, max_delay, exponential_base)
+                    else:
+                        delay = min(initial_delay * (exponential_base ** (attempt - 1)), max_delay)
+
+                    delay = apply_retry_after(delay, e)
 
                     print(f"[RetryBackoff] {func.__name__} 尝试 {attempt}/{max_attempts} 失败: {str(e)}")
                     print(f"[RetryBackoff] 等待 {delay:.2f} 秒后重试...")
@@ -131,7 +253,10 @@ class RetryContext:
         max_attempts: int = 3,
         delay: float = 1.0,
         backoff: float = 2.0,
-        exceptions: Tuple[Type[Exception], ...] = (Exception,)
+        exceptions: Tuple[Type[Exception], ...] = (Exception,),
+        max_delay: Optional[float] = None,
+        jitter: bool = False,
+        name: str = "RetryContext"
     ):
         """
         初始化重试上下文
@@ -141,11 +266,19 @@ class RetryContext:
             delay: 初始延迟时间（秒）
             backoff: 退避因子
             exceptions: 需要重试的异常类型
+            max_delay: 单次等待上限（秒），None 表示不限
+            jitter: 是否使用 Full Jitter（在 0 到当前退避时间之间随机）
+            name: 日志前缀
+
+        异常若带有 retry_after 属性（如 RetryableError），至少等待该时间。
         """
         self.max_attempts = max_attempts
         self.delay = delay
         self.backoff = backoff
         self.exceptions = exceptions
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.name = name
         self.attempt = 0
 
     def execute(self, func: Callable, *args, **kwargs):
@@ -174,13 +307,20 @@ class RetryContext:
                 last_exception = e
 
                 if self.attempt == self.max_attempts:
-                    print(f"[RetryContext] 执行失败（已重试 {self.max_attempts-1} 次）: {str(e)}")
+                    print(f"[{self.name}] 执行失败（已重试 {self.max_attempts-1} 次）: {str(e)}")
                     raise
 
-                print(f"[RetryContext] 第 {self.attempt}/{self.max_attempts} 次尝试失败: {str(e)}")
-                print(f"[RetryContext] 等待 {current_delay:.2f} 秒后重试...")
+                sleep_time = current_delay
+                if self.max_delay is not None:
+                    sleep_time = min(sleep_time, self.max_delay)
+                if self.jitter:
+                    sleep_time = random.uniform(0, sleep_time)
+                sleep_time = apply_retry_after(sleep_time, e)
+
+                print(f"[{self.name}] 第 {self.attempt}/{self.max_attempts} 次尝试失败: {str(e)}")
+                print(f"[{self.name}] 等待 {sleep_time:.2f} 秒后重试...")
 
-                time.sleep(current_delay)
+                time.sleep(sleep_time)
                 current_delay *= self.backoff
 
         if last_exception:
@@ -0,0 +1,75 @@
+"""请求合并工具（相同 key 的并发调用只执行一次）"""
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    线程级请求合并
+
+    同一 key 的并发调用中，只有第一个调用者真正执行函数，其余调用者
+    等待并共享其结果（或异常）。调用结束后 key 立即释放，之后的调用会重新执行。
+
+    使用方式:
+        flight = SingleFlight()
+        result = flight.do(key, lambda: expensive_call())
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.shared = 0  # 被合并（未实际执行）的调用次数
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        执行或加入同 key 的进行中调用
+
+        Args:
+            key: 请求标识
+            func: 无参可调用对象
+
+        Returns:
+            func 的返回值
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """当前进行中的不同 key 数量"""
+        with self._lock:
+            return len(self._calls)
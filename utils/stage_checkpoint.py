@@ -0,0 +1,177 @@
+"""流水线阶段检查点（按输入哈希持久化阶段输出，重跑时从最后一个有效阶段继续）"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+# 默认检查点目录（项目根目录下 cache/stages）
+DEFAULT_CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "cache", "stages"
+)
+
+_prompt_versions: Dict[int, str] = {}
+_prompt_versions_lock = threading.Lock()
+
+
+def prompt_version(*sources) -> str:
+    """
+    计算提示词版本指纹（类 / 模块 / 函数源码的哈希）
+
+    提示词写在生成节点类和 prompts 模块里，修改后指纹随之变化，
+    旧检查点自然失效，无需手动维护版本号。
+
+    Args:
+        *sources: 类、模块或函数
+
+    Returns:
+        12 位十六进制指纹
+    """
+    key = hash(sources)
+    with _prompt_versions_lock:
+        cached = _prompt_versions.get(key)
+        if cached is not None:
+            return cached
+
+    digest = hashlib.sha256()
+    for source in sources:
+        try:
+            digest.update(inspect.getsource(source).encode("utf-8"))
+        except (OSError, TypeError):
+            digest.update(repr(source).encode("utf-8"))
+    version = digest.hexdigest()[:12]
+
+    with _prompt_versions_lock:
+        _prompt_versions[key] = version
+    return version
+
+
+class StageCheckpointStore:
+    """
+    阶段检查点存储
+
+    每个条目一个文件: <dir>/<stage>/<key>.json，key 为阶段名 + 输入（上游输出、模型、
+    温度、参数、提示词版本）的规范化哈希。输入不变则直接复用输出；任一上游阶段
+    输出变化，下游 key 随之变化并重新执行。
+    """
+
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR):
+        """
+        Args:
+            checkpoint_dir: 检查点目录
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(stage: str, inputs: Dict[str, Any]) -> str:
+        """计算阶段输入的规范化哈希"""
+        canonical = json.dumps({"stage": stage, "inputs": inputs}, ensure_ascii=False,
+                               sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.checkpoint_dir, stage, f"{key}.json")
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """读取检查点，不存在或已损坏返回 None"""
+        path = self._path(stage, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            output = entry["output"]
+        except FileNotFoundError:
+            output = None
+        except (OSError, ValueError, KeyError):
+            # 写入中断等导致的损坏条目：删除后视为未命中
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            output = None
+
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return output
+
+    def set(self, stage: str, key: str, output: Any):
+        """写入检查点（先写临时文件再原子替换）"""
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"stage": stage, "created_at": time.time(), "output": output}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def memoize(self, stage: str, inputs: Dict[str, Any], func: Callable[[], Any], force: bool = False) -> Any:
+        """
+        命中检查点则直接返回，否则执行 func 并保存结果
+
+        Args:
+            stage: 阶段名
+            inputs: 决定阶段输出的全部输入
+            func: 无参可调用对象
+            force: True 时忽略已有检查点重新执行
+        """
+        key = self.make_key(stage, inputs)
+        if not force:
+            cached = self.get(stage, key)
+            if cached is not None:
+                return cached
+        output = func()
+        self.set(stage, key, output)
+        return output
+
+    def invalidate(self, stage: str) -> int:
+        """
+        删除某个阶段的全部检查点
+
+        Returns:
+            删除的条目数
+        """
+        stage_dir = os.path.join(self.checkpoint_dir, stage)
+        if not os.path.isdir(stage_dir):
+            return 0
+        count = sum(1 for name in os.listdir(stage_dir) if name.endswith(".json"))
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        print(f"[Checkpoint] 已清除阶段 {stage} 的 {count} 个检查点")
+        return count
+
+    def clear(self) -> int:
+        """删除全部检查点"""
+        return sum(self.invalidate(stage) for stage in os.listdir(self.checkpoint_dir)
+                   if os.path.isdir(os.path.join(self.checkpoint_dir, stage)))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计与各阶段条目数"""
+        stages = {}
+        for stage in sorted(os.listdir(self.checkpoint_dir)):
+            stage_dir = os.path.join(self.checkpoint_dir, stage)
+            if os.path.isdir(stage_dir):
+                stages[stage] = sum(1 for name in os.listdir(stage_dir) if name.endswith(".json"))
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stages": stages}
+
+
+_default_store: Optional[StageCheckpointStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_checkpoint_store() -> StageCheckpointStore:
+    """获取共享的默认检查点存储（cache/stages）"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = StageCheckpointStore()
+        return _default_store
@@ -0,0 +1,214 @@
+"""本地视觉档案提取（基于词表的短语频率统计，无需调用 LLM）"""
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+# 服装（多词短语在前，匹配时优先）
+GARMENTS = [
+    "sports bra", "yoga pants", "bike shorts", "crop top", "tank top", "band t-shirt", "t-shirt",
+    "lace bralette", "bralette", "bodysuit", "lingerie set", "lingerie", "babydoll", "slip dress",
+    "sundress", "mini dress", "dress", "mini skirt", "pleated skirt", "pencil skirt", "skirt",
+    "denim shorts", "shorts", "jeans", "leggings", "joggers", "sweatpants", "hoodie", "sweater",
+    "cardigan", "blazer", "button-up shirt", "button-down shirt", "blouse", "shirt", "robe",
+    "pajamas", "pajama shorts", "boy-short panties", "panties", "thong", "bra", "bikini", "swimsuit",
+    "stockings", "thigh-high socks", "thigh-highs", "fishnets", "socks", "heels", "sneakers", "boots",
+    "jacket", "coat", "apron", "corset", "collar", "harness", "choker",
+]
+
+# 服装前可出现的修饰词（颜色、材质、版型）
+MODIFIERS = {
+    "oversized", "tight", "loose", "fitted", "cropped", "sheer", "silk", "satin", "lace", "cotton",
+    "leather", "latex", "denim", "knit", "mesh", "ribbed", "high-waisted", "low-rise", "short", "long",
+    "cozy", "chunky", "vintage", "ex-boyfriend's", "boyfriend's", "matching", "strappy", "white",
+    "black", "grey", "gray", "red", "pink", "purple", "blue", "navy", "green", "beige", "cream",
+    "brown", "lavender", "burgundy", "pastel", "nude", "baby", "light", "dark", "soft", "band",
+}
+
+PROPS = [
+    "phone", "coffee", "mug", "laptop", "book", "headphones", "earbuds", "wine glass", "wine",
+    "candles", "candle", "mirror", "yoga mat", "dumbbells", "kettlebell", "resistance band",
+    "water bottle", "protein shake", "sketchbook", "paintbrush", "canvas", "easel", "camera",
+    "pillow", "blanket", "plushie", "teddy bear", "notebook", "journal", "tea", "cat", "dog",
+    "flowers", "sunglasses", "leash", "cuffs", "rope", "bag", "guitar", "vinyl",
+]
+
+COLORS = [
+    "black", "white", "grey", "red", "pink", "purple", "blue", "navy", "green", "beige", "cream",
+    "brown", "gold", "silver", "lavender", "burgundy", "emerald", "pastel", "nude", "neon", "orange",
+    "yellow", "teal",
+]
+
+# 规范名 → 匹配模式
+LIGHTING = {
+    "golden hour sunlight": r"golden hour",
+    "soft window light": r"window light|light (?:from|through|coming through) (?:the |a |her )?window",
+    "warm lamp light": r"\blamp\b",
+    "neon / LED glow": r"\bneon\b|\bled (?:lights?|strips?|glow)",
+    "candlelight": r"candle",
+    "phone screen glow": r"phone screen|screen (?:light|glow)|light from (?:her |the )?phone",
+    "ring light": r"ring light",
+    "natural daylight": r"daylight|natural light|sunlight|morning light|sun streaming",
+    "moonlight": r"moonlight",
+    "bright gym lighting": r"fluorescent|overhead light|gym light",
+    "fairy lights": r"fairy lights|string lights",
+}
+
+POSES = {
+    "lying on bed": r"\b(?:lying|laying|lies|lays|sprawled)\b",
+    "kneeling": r"\bkneel",
+    "sitting on edge of bed": r"edge of (?:the |her )?bed",
+    "sitting cross-legged": r"cross-legged|legs crossed",
+    "mirror selfie": r"mirror selfie|(?:in|into|at) (?:the |a |her )?(?:\w+ )?mirror|mirror (?:pic|shot|reflection)",
+    "leaning against wall/counter": r"\bleaning\b",
+    "stretching": r"stretch",
+    "back arched": r"arch(?:ed|ing)",
+    "looking over shoulder": r"over (?:her|the) shoulder",
+    "hand in hair": r"hand (?:in|through|running through) (?:her )?hair|playing with (?:her )?hair",
+    "curled up": r"curled up",
+    "standing": r"\bstanding\b",
+}
+
+CAMERA_ANGLES = {
+    "extreme close-up": r"extreme close-up",
+    "close-up": r"close-up|closeup",
+    "medium shot": r"medium shot|waist-up|mid shot",
+    "full body shot": r"full[- ]body",
+    "overhead / top-down": r"overhead (?:shot|angle|view)|top-down|from above",
+    "low angle": r"low angle|from below",
+    "high angle": r"high angle",
+    "POV": r"\bpov\b",
+    "selfie angle": r"selfie",
+    "wide shot": r"wide shot|wide angle",
+}
+
+ATMOSPHERE = [
+    "cozy", "intimate", "sensual", "playful", "moody", "melancholic", "dreamy", "energetic",
+    "relaxed", "romantic", "mysterious", "vulnerable", "confident", "lazy", "flirty", "seductive",
+    "calm", "peaceful", "nostalgic",
+]
+
+# 按人设标签关注的特殊元素
+SPECIAL_ELEMENTS = {
+    "bdsm": ["collar", "leash", "cuffs", "rope", "harness", "choker", "blindfold", "kneeling"],
+    "submissive": ["collar", "leash", "cuffs", "rope", "harness", "choker", "blindfold", "kneeling"],
+    "fitness": ["dumbbells", "yoga mat", "kettlebell", "resistance band", "treadmill", "gym mirror", "protein shake"],
+    "gym": ["dumbbells", "yoga mat", "kettlebell", "resistance band", "treadmill", "gym mirror", "protein shake"],
+    "artist": ["easel", "canvas", "paintbrush", "sketchbook", "paint", "studio"],
+    "creative": ["easel", "canvas", "paintbrush", "sketchbook", "paint", "studio"],
+}
+
+
+def _phrase_pattern(phrases: List[str]) -> re.Pattern:
+    alternatives = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"(?<![\w-])(" + "|".join(re.escape(p) for p in alternatives) + r")s?(?![\w-])")
+
+
+_GARMENT_RE = _phrase_pattern(GARMENTS)
+_PROP_RE = _phrase_pattern(PROPS)
+_COLOR_RE = _phrase_pattern(COLORS + ["gray"])
+_ATMOSPHERE_RE = _phrase_pattern(ATMOSPHERE)
+_LIGHTING_RES = {name: re.compile(pattern) for name, pattern in LIGHTING.items()}
+_POSE_RES = {name: re.compile(pattern) for name, pattern in POSES.items()}
+_CAMERA_RES = {name: re.compile(pattern) for name, pattern in CAMERA_ANGLES.items()}
+
+
+def _garment_phrases(text: str) -> List[str]:
+    """服装短语（带最多两个前置修饰词，如 'oversized grey t-shirt'）"""
+    phrases = []
+    for match in _GARMENT_RE.finditer(text):
+        words = re.findall(r"[\w'-]+", text[max(0, match.start() - 40):match.start()])[-2:]
+        modifiers = []
+        for word in reversed(words):
+            if word not in MODIFIERS:
+                break
+            modifiers.insert(0, "grey" if word == "gray" else word)
+        phrases.append(" ".join(modifiers + [match.group(1)]))
+    return phrases
+
+
+def _extract_sets(hint: str) -> Dict[str, set]:
+    """单条 scene_hint 中各类别出现的元素（同一场景内重复只算一次）"""
+    return {
+        "outfit": set(_garment_phrases(hint)),
+        "garment": {m.group(1) for m in _GARMENT_RE.finditer(hint)},
+        "prop": {m.group(1) for m in _PROP_RE.finditer(hint)},
+        "color": {"grey" if m.group(1) == "gray" else m.group(1) for m in _COLOR_RE.finditer(hint)},
+        "atmosphere": {m.group(1) for m in _ATMOSPHERE_RE.finditer(hint)},
+        "lighting": {name for name, regex in _LIGHTING_RES.items() if regex.search(hint)},
+        "pose": {name for name, regex in _POSE_RES.items() if regex.search(hint)},
+        "camera": {name for name, regex in _CAMERA_RES.items() if regex.search(hint)},
+    }
+
+
+def _recurring(counts: Counter, min_count: int, limit: int) -> List[str]:
+    return [item for item, count in counts.most_common(limit) if count >= min_count]
+
+
+def extract_visual_profile_local(scene_hints: List[str], tags: List[str] = ()) -> Tuple[Dict, float]:
+    """
+    基于词表统计 scene_hint 中反复出现的服装、道具、颜色、光线、姿势与镜头
+
+    Args:
+        scene_hints: 推文的 scene_hint 列表
+        tags: 人设标签（决定 special_elements 关注的词表）
+
+    Returns:
+        (visual_profile, confidence)。confidence 在 0~1 之间，综合各类别的
+        场景覆盖率与是否找到足够的重复元素，偏低时应交给 LLM 提取。
+    """
+    hints = [hint.lower() for hint in scene_hints if hint and hint.strip()]
+    if not hints:
+        return {}, 0.0
+
+    # 只保留在多个场景中出现的元素；场景太少时放宽到 1
+    min_count = 2 if len(hints) >= 4 else 1
+
+    per_hint = [_extract_sets(hint) for hint in hints]
+    counts = {category: Counter() for category in per_hint[0]}
+    for found in per_hint:
+        for category, items in found.items():
+            counts[category].update(items)
+
+    # 服装：优先完整短语（带修饰词），短语不重复时退回到服装类别本身
+    outfits = _recurring(counts["outfit"], min_count, 5)
+    covered = {phrase.split()[-1] for phrase in outfits}
+    outfits += [g for g in _recurring(counts["garment"], min_count, 8) if g.split()[-1] not in covered]
+
+    special_vocab = []
+    for tag in tags:
+        for word in SPECIAL_ELEMENTS.get(str(tag).lower(), []):
+            if word not in special_vocab:
+                special_vocab.append(word)
+    special_counts = Counter()
+    if special_vocab:
+        # 按词边界匹配（collarbone 不算 collar，painted 不算 paint）
+        special_re = _phrase_pattern(special_vocab)
+        for hint in hints:
+            special_counts.update({m.group(1) for m in special_re.finditer(hint)})
+
+    profile = {
+        "common_outfits": outfits[:5],
+        "common_props": _recurring(counts["prop"], min_count, 8),
+        "color_preferences": _recurring(counts["color"], min_count, 6),
+        "lighting_preferences": _recurring(counts["lighting"], min_count, 4),
+        "typical_poses": _recurring(counts["pose"], min_count, 5),
+        "special_elements": [word for word in special_vocab if special_counts[word] >= min_count],
+        "atmosphere_keywords": _recurring(counts["atmosphere"], min_count, 6),
+        "camera_angles": _recurring(counts["camera"], min_count, 4),
+    }
+
+    # 覆盖率：核心类别中至少匹配到一个词表元素的场景比例
+    core_categories = ["garment", "color", "lighting", "pose"]
+    coverage = sum(sum(1 for found in per_hint if found[category]) / len(hints)
+                   for category in core_categories) / len(core_categories)
+
+    # 丰富度：核心类别是否找到足够的重复元素
+    minimums = {"common_outfits": 2, "common_props": 1, "color_preferences": 2,
+                "lighting_preferences": 1, "typical_poses": 1}
+    richness = sum(1 for key, minimum in minimums.items() if len(profile[key]) >= minimum) / len(minimums)
+
+    confidence = 0.5 * coverage + 0.5 * richness
+    if len(hints) < 3:
+        confidence *= len(hints) / 3
+    return profile, round(confidence, 3)